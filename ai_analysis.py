@@ -0,0 +1,168 @@
+"""
+Nexus AI Analysis - Capa de caché delante del LLM (Gemini).
+La frase solo cambia cuando precio, variación o RSI se mueven de forma apreciable, así que:
+  - caché por cubos (precio, variación, RSI) con TTL: una llamada por cubo y TTL
+  - coalescencia: peticiones idénticas simultáneas comparten la misma llamada
+  - limitador de llamadas por minuto y circuit breaker ante fallos seguidos
+  - refresco en segundo plano: el endpoint nunca espera al LLM (texto de reglas o versión anterior)
+"""
+
+import math
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger('NexusAI')
+
+Key = Tuple[int, int, int]
+
+
+def rule_based_analysis(rsi: float) -> str:
+    """Texto de respaldo sin LLM."""
+    if rsi > 70: return "Sobrecompra, posible corrección."
+    if rsi < 30: return "Sobreventa, posible rebote."
+    return "Mercado lateral."
+
+
+class CircuitBreaker:
+    """Cerrado -> abierto tras `threshold` fallos seguidos; semiabierto pasado `reset_timeout` (1 prueba)."""
+
+    def __init__(self, threshold: int = 3, reset_timeout: float = 60.0):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None: return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout: return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed": return True
+        if state == "half-open" and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def success(self):
+        self.failures, self.opened_at, self._probing = 0, None, False
+
+    def failure(self):
+        self.failures += 1
+        self._probing = False
+        if self.failures >= self.threshold or self.opened_at is not None:
+            self.opened_at = time.monotonic()
+
+
+class RateLimiter:
+    """Token bucket: `rate` llamadas por `per` segundos (sin espera: acquire() devuelve False)."""
+
+    def __init__(self, rate: int = 30, per: float = 60.0):
+        self.capacity = float(rate)
+        self.tokens = float(rate)
+        self.fill_rate = rate / per
+        self.updated = time.monotonic()
+
+    def acquire(self) -> bool:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.fill_rate)
+        self.updated = now
+        if self.tokens < 1: return False
+        self.tokens -= 1
+        return True
+
+
+class AIAnalysisService:
+    """
+    fetch(price, change, rsi) -> texto del LLM (lanza excepción si falla).
+    get() responde siempre al momento: caché vigente, versión caducada mientras se
+    refresca, o texto de reglas si aún no hay nada (o el API está caído).
+    """
+
+    def __init__(self, fetch: Callable[[float, float, float], Awaitable[str]],
+                 fallback: Callable[[float], str] = rule_based_analysis,
+                 ttl: float = 300.0, stale_ttl: float = 3600.0,
+                 price_step_pct: float = 0.5, change_step: float = 0.5, rsi_step: float = 5.0,
+                 rate_per_min: int = 30, breaker: Optional[CircuitBreaker] = None,
+                 max_entries: int = 1024):
+        self.fetch = fetch
+        self.fallback = fallback
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._log_step = math.log1p(price_step_pct / 100)
+        self.change_step = change_step
+        self.rsi_step = rsi_step
+        self.limiter = RateLimiter(rate_per_min, 60.0)
+        self.breaker = breaker or CircuitBreaker()
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[Key, Tuple[str, float]]" = OrderedDict()   # key -> (texto, guardado)
+        self._inflight: Dict[Key, asyncio.Task] = {}
+        self.stats = {'hits': 0, 'stale': 0, 'fallbacks': 0, 'calls': 0, 'errors': 0, 'coalesced': 0, 'limited': 0}
+
+    def bucket(self, price: float, change: Optional[float], rsi: float) -> Key:
+        """Cubo de precio relativo (log), variación y RSI."""
+        p = round(math.log(price) / self._log_step) if price and price > 0 else 0
+        return p, round((change or 0.0) / self.change_step), int(rsi // self.rsi_step)
+
+    async def get(self, price: float, change: Optional[float], rsi: float, max_wait: float = 0.0) -> str:
+        """Texto de análisis. `max_wait` > 0 permite esperar al LLM ese tiempo en un fallo de caché."""
+        key = self.bucket(price, change, rsi)
+        cached = self._cache.get(key)
+        age = time.monotonic() - cached[1] if cached else None
+
+        if cached and age < self.ttl:
+            self.stats['hits'] += 1
+            self._cache.move_to_end(key)
+            return cached[0]
+
+        task = self._refresh(key, price, change, rsi)
+        if cached and age < self.stale_ttl:
+            self.stats['stale'] += 1
+            return cached[0]
+        if task is not None and max_wait > 0:
+            try:
+                return await asyncio.wait_for(asyncio.shield(task), max_wait)
+            except Exception:
+                pass
+        self.stats['fallbacks'] += 1
+        return self.fallback(rsi)
+
+    def _refresh(self, key: Key, price, change, rsi) -> Optional[asyncio.Task]:
+        """Lanza (o reutiliza) la llamada en segundo plano para este cubo."""
+        task = self._inflight.get(key)
+        if task is not None:
+            self.stats['coalesced'] += 1
+            return task
+        if not self.breaker.allow(): return None
+        if not self.limiter.acquire():
+            self.stats['limited'] += 1
+            if self.breaker.state == "half-open": self.breaker._probing = False
+            return None
+        task = self._inflight[key] = asyncio.create_task(self._call(key, price, change, rsi))
+        return task
+
+    async def _call(self, key: Key, price, change, rsi) -> str:
+        self.stats['calls'] += 1
+        try:
+            text = await self.fetch(price, change, rsi)
+            self.breaker.success()
+            self._cache[key] = (text, time.monotonic())
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries: self._cache.popitem(last=False)
+            return text
+        except Exception as e:
+            self.stats['errors'] += 1
+            self.breaker.failure()
+            logger.warning(f"Análisis IA no disponible ({self.breaker.state}): {e}")
+            return self.fallback(rsi)
+        finally:
+            self._inflight.pop(key, None)
+
+    def clear(self):
+        self._cache.clear()
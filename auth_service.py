@@ -0,0 +1,165 @@
+"""
+Nexus Auth - Hash de contraseñas fuera del servidor web y sesiones sin estado.
+  - pbkdf2_sha256 (caro a propósito) en un pool de PROCESOS del tamaño de los núcleos:
+    una ráfaga de logins no ocupa el event loop ni el pool de hilos de FastAPI (ni el GIL)
+  - tokens de sesión firmados con HMAC-SHA256 (email + caducidad): las peticiones siguientes
+    se validan sin Mongo ni hash. Rotación: las claves antiguas siguen validando, se firma con la nueva
+"""
+
+import os
+import hmac
+import json
+import time
+import base64
+import secrets
+import asyncio
+import hashlib
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+
+from passlib.context import CryptContext
+
+logger = logging.getLogger('NexusAuth')
+
+# ==========================================
+# ⚙️ 1. CONFIGURACIÓN
+# ==========================================
+HASH_SCHEMES = ["pbkdf2_sha256"]
+HASH_PROCESSES = int(os.getenv("NEXUS_HASH_PROCESSES", os.cpu_count() or 1))   # 0 = en un hilo (sin procesos)
+SESSION_TTL = int(os.getenv("NEXUS_SESSION_TTL", 7 * 24 * 3600))               # segundos
+# Claves de firma: la primera firma, las demás (antiguas, separadas por comas) solo validan.
+# Propias de las sesiones: nunca la clave de cifrado de datos ni un valor por defecto público
+SESSION_SECRET = os.getenv("NEXUS_SESSION_SECRET")
+OLD_SESSION_SECRETS = [k.strip() for k in os.getenv("NEXUS_SESSION_OLD_SECRETS", "").split(",") if k.strip()]
+TOKEN_VERSION = 1
+
+pwd_context = CryptContext(schemes=HASH_SCHEMES, deprecated="auto")
+
+
+# --- HASH EN PROCESOS HIJOS ---
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+def _verify(password: str, hashed: str) -> bool:
+    try:
+        return pwd_context.verify(password, hashed)
+    except (ValueError, TypeError):
+        return False   # hash corrupto o de otro esquema
+
+def _ping() -> int:
+    return os.getpid()
+
+
+# ==========================================
+# 🔐 2. CONTRASEÑAS
+# ==========================================
+
+class PasswordHasher:
+    """hash/verify async sobre un ProcessPoolExecutor creado en el primer uso."""
+
+    def __init__(self, processes: int = HASH_PROCESSES):
+        self.processes = processes
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.stats = {'hashed': 0, 'verified': 0, 'rejected': 0}
+
+    def _executor(self) -> Optional[ProcessPoolExecutor]:
+        if self.processes <= 0: return None
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None: self._pool = ProcessPoolExecutor(self.processes)
+        return self._pool
+
+    async def _run(self, fn, *args):
+        pool = self._executor()
+        if pool is None: return await asyncio.to_thread(fn, *args)
+        return await asyncio.get_running_loop().run_in_executor(pool, fn, *args)
+
+    async def hash(self, password: str) -> str:
+        self.stats['hashed'] += 1
+        return await self._run(_hash, password)
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        ok = await self._run(_verify, password, hashed)
+        self.stats['verified' if ok else 'rejected'] += 1
+        return ok
+
+    async def warm_up(self):
+        """Arranca los procesos (en el lifespan) para que el primer login no pague el fork."""
+        pool = self._executor()
+        if pool is None: return
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(pool, _ping) for _ in range(self.processes)))
+
+    def close(self):
+        if self._pool is not None: self._pool.shutdown(wait=False, cancel_futures=True)
+        self._pool = None
+
+
+# ==========================================
+# 🎟️ 3. TOKENS DE SESIÓN
+# ==========================================
+
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode()
+
+def _unb64(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+def _derive(secret) -> bytes:
+    secret = secret.encode() if isinstance(secret, str) else secret
+    return hmac.new(secret, b"nexus-session-v1", hashlib.sha256).digest()
+
+
+class SessionSigner:
+    """Token `<payload b64>.<firma b64>`; payload = {"sub": email, "iat", "exp", "v"}."""
+
+    def __init__(self, secret=None, old_secrets: Optional[List] = None, ttl: int = SESSION_TTL):
+        if not secret:
+            # Sin NEXUS_SESSION_SECRET: clave aleatoria de este proceso (nadie puede conocerla de antemano)
+            logger.warning("🚨 NEXUS_SESSION_SECRET no configurada: clave de sesión aleatoria. Los tokens "
+                           "caducan al reiniciar y no valen entre workers; configúrala en producción.")
+            secret = secrets.token_bytes(32)
+        self._keys = [_derive(secret)] + [_derive(s) for s in old_secrets or []]
+        self.ttl = ttl
+        self.stats = {'issued': 0, 'valid': 0, 'invalid': 0, 'expired': 0}
+
+    def _sign(self, key: bytes, body: str) -> str:
+        return _b64(hmac.new(key, body.encode(), hashlib.sha256).digest())
+
+    def issue(self, email: str, ttl: Optional[int] = None, now: Optional[float] = None) -> str:
+        now = int(time.time() if now is None else now)
+        payload = {"sub": email, "iat": now, "exp": now + (self.ttl if ttl is None else ttl), "v": TOKEN_VERSION}
+        body = _b64(json.dumps(payload, separators=(',', ':')).encode())
+        self.stats['issued'] += 1
+        return f"{body}.{self._sign(self._keys[0], body)}"
+
+    def verify(self, token: str, now: Optional[float] = None) -> Optional[dict]:
+        """Payload si la firma es válida y no ha caducado; None en otro caso. Sin E/S."""
+        try:
+            body, signature = token.split('.', 1)
+            if not any(hmac.compare_digest(signature, self._sign(k, body)) for k in self._keys):
+                raise ValueError("firma")
+            payload = json.loads(_unb64(body))
+        except (ValueError, AttributeError):
+            self.stats['invalid'] += 1
+            return None
+        if payload.get("exp", 0) < (time.time() if now is None else now):
+            self.stats['expired'] += 1
+            return None
+        self.stats['valid'] += 1
+        return payload
+
+
+def bearer_token(authorization: Optional[str]) -> Optional[str]:
+    """Cabecera `Authorization: Bearer <token>` -> token."""
+    if not authorization: return None
+    scheme, _, token = authorization.partition(' ')
+    return token.strip() if scheme.lower() == 'bearer' and token.strip() else None
+
+
+# Instancias compartidas por main.py
+password_hasher = PasswordHasher()
+session_signer = SessionSigner(SESSION_SECRET, OLD_SESSION_SECRETS)
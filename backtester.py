@@ -0,0 +1,259 @@
+"""
+Nexus Backtester - Repetición offline de la estrategia RSI sobre velas guardadas (CSV/Parquet).
+Indicadores y señales vectorizados sobre toda la serie; el simulador solo itera por
+OPERACIÓN (no por vela): años de velas de 1m se prueban en segundos.
+
+Uso: python backtester.py datos/BTCUSDT_1m.csv [--timeframe 5m] [--fee 0.001]
+"""
+
+import sys
+import time
+import argparse
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+import numpy as np
+
+import strategy
+from candles import Candles, COLUMNS
+from indicators import rsi_batch
+from market_cache import timeframe_to_ms
+
+# Motivos de salida
+EXIT_STOP, EXIT_TARGET, EXIT_SIGNAL, EXIT_END = 0, 1, 2, 3
+EXIT_NAMES = {EXIT_STOP: 'stop_loss', EXIT_TARGET: 'take_profit', EXIT_SIGNAL: 'signal', EXIT_END: 'end'}
+
+TRADE_DTYPE = np.dtype([
+    ('entry_idx', np.int64), ('exit_idx', np.int64), ('side', np.int8),
+    ('entry_price', np.float64), ('exit_price', np.float64),
+    ('pnl', np.float64), ('fees', np.float64), ('reason', np.int8),
+])
+
+
+# ==========================================
+# 📂 1. CARGA DE VELAS
+# ==========================================
+
+def load_candles(path: str) -> Candles:
+    """
+    CSV (timestamp,open,high,low,close,volume; cabecera opcional), Parquet o archivo
+    .ncnd de candle_archive (vistas memmap, sin cargar el fichero en RAM) -> columnas NumPy.
+    """
+    if path.endswith('.ncnd'):
+        from candle_archive import open_file
+        return open_file(path)
+    if path.endswith('.parquet'):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Para leer Parquet instala pyarrow (pip install pyarrow)")
+        table = pq.read_table(path, columns=list(COLUMNS))
+        data = {c: table.column(c).to_numpy() for c in COLUMNS}
+    else:
+        with open(path) as f: first = f.readline()
+        has_header = any(ch.isalpha() for ch in first.replace('e', '').replace('E', ''))
+        raw = np.loadtxt(path, delimiter=',', skiprows=1 if has_header else 0, usecols=range(6), ndmin=2)
+        data = {c: raw[:, i] for i, c in enumerate(COLUMNS)}
+
+    candles = Candles.from_columns(data)
+    if len(candles) > 1 and np.any(np.diff(candles.timestamp) < 0):
+        candles = candles[np.argsort(candles.timestamp, kind='stable')]
+    return candles
+
+
+def resample(candles: Candles, timeframe: str) -> Candles:
+    """Agrega velas finas (p.ej. 1m) a un timeframe mayor, vectorizado con reduceat."""
+    ts = candles['timestamp']
+    if len(ts) == 0: return candles
+    bucket = ts // timeframe_to_ms(timeframe)
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    return Candles(
+        timestamp=bucket[starts] * timeframe_to_ms(timeframe),
+        open=candles['open'][starts],
+        high=np.maximum.reduceat(candles['high'], starts),
+        low=np.minimum.reduceat(candles['low'], starts),
+        close=candles['close'][np.r_[starts[1:] - 1, len(ts) - 1]],
+        volume=np.add.reduceat(candles['volume'], starts),
+    )
+
+
+# ==========================================
+# ⚙️ 2. SIMULACIÓN
+# ==========================================
+
+@dataclass
+class BacktestResult:
+    trades: int
+    wins: int
+    losses: int
+    win_rate: float
+    pnl: float
+    return_pct: float
+    max_drawdown: float
+    max_drawdown_pct: float
+    profit_factor: float
+    fees: float
+    exposure_pct: float
+    bars: int
+    elapsed: float
+    exits: Dict[str, int] = field(default_factory=dict)
+    trade_log: Optional[np.ndarray] = field(default=None, repr=False)
+    equity: Optional[np.ndarray] = field(default=None, repr=False)
+
+    def summary(self) -> Dict[str, float]:
+        return {k: v for k, v in self.__dict__.items() if k not in ('trade_log', 'equity')}
+
+
+def _first_true(mask_fn, start: int, n: int, chunk: int = 64) -> int:
+    """Primer índice >= start donde mask_fn(slice) es True, buscando por bloques crecientes."""
+    i = start
+    while i < n:
+        end = min(n, i + chunk)
+        hits = np.flatnonzero(mask_fn(i, end))
+        if hits.size: return i + int(hits[0])
+        i, chunk = end, chunk * 2
+    return n
+
+
+def run_backtest(candles: Candles, config=None, *, rsi: Optional[np.ndarray] = None,
+                 rsi_period: int = 14, fee_rate: float = 0.001, slippage: float = 0.0,
+                 initial_capital: float = 10_000.0, allow_short: bool = True,
+                 sl_pct: float = strategy.STOP_LOSS_PCT, tp_pct: float = strategy.TAKE_PROFIT_PCT,
+                 keep_details: bool = True) -> BacktestResult:
+    """
+    Reglas (sin mirar al futuro):
+      - señal al cierre de la vela k -> entrada a la apertura de k+1
+      - SL/TP intravela (si ambos caben en la misma vela se asume el SL primero)
+      - señal contraria -> salida a la apertura siguiente
+    `config` es un BotConfig (umbrales y min_trade_amount). `rsi` permite pasar el indicador ya calculado.
+    """
+    t0 = time.perf_counter()
+    if config is None:
+        from nexus_core import BotConfig
+        config = BotConfig()
+
+    o, h, l, c = candles['open'], candles['high'], candles['low'], candles['close']
+    n = len(c)
+    if rsi is None: rsi = rsi_batch(c, rsi_period)
+    codes = strategy.rsi_signal_codes(rsi, config.rsi_oversold, config.rsi_overbought)
+    size = config.min_trade_amount
+
+    # Barras de señal (la acción ocurre en la siguiente)
+    entry_mask = codes == strategy.BUY if not allow_short else codes != strategy.NEUTRAL
+    entry_bars = np.flatnonzero(entry_mask[:-1]) if n > 1 else np.empty(0, dtype=np.int64)
+    buy_bars, sell_bars = np.flatnonzero(codes == strategy.BUY), np.flatnonzero(codes == strategy.SELL)
+
+    def _next(bars, start):
+        p = np.searchsorted(bars, start)
+        return int(bars[p]) if p < len(bars) else n
+
+    trades = []
+    k = 0  # próxima barra de señal permitida
+    while True:
+        pos = np.searchsorted(entry_bars, k)
+        if pos >= len(entry_bars): break
+        sig_bar = int(entry_bars[pos])
+        i = sig_bar + 1
+        side = int(codes[sig_bar])
+        entry = o[i] * (1 + slippage * side)
+        sl, tp = strategy.protective_levels(entry, side, sl_pct, tp_pct)
+
+        if side > 0:
+            hit = _first_true(lambda a, b: (l[a:b] <= sl) | (h[a:b] >= tp), i, n)
+            opp = _next(sell_bars, i)
+        else:
+            hit = _first_true(lambda a, b: (h[a:b] >= sl) | (l[a:b] <= tp), i, n)
+            opp = _next(buy_bars, i)
+
+        if opp + 1 < n and opp + 1 <= hit:
+            j, reason = opp + 1, EXIT_SIGNAL
+            exit_price = o[j]
+        elif hit < n:
+            j = hit
+            stopped = (l[j] <= sl) if side > 0 else (h[j] >= sl)
+            if stopped:
+                reason = EXIT_STOP
+                exit_price = min(sl, o[j]) if side > 0 else max(sl, o[j])   # hueco: peor precio
+            else:
+                reason = EXIT_TARGET
+                exit_price = max(tp, o[j]) if side > 0 else min(tp, o[j])
+        else:
+            j, reason, exit_price = n - 1, EXIT_END, c[n - 1]
+
+        exit_price *= (1 - slippage * side)
+        fees = (entry + exit_price) * size * fee_rate
+        pnl = (exit_price - entry) * size * side - fees
+        trades.append((i, j, side, entry, exit_price, pnl, fees, reason))
+        # Tras una salida por señal, esa misma señal puede abrir la siguiente operación
+        k = j - 1 if reason == EXIT_SIGNAL else j
+        if reason == EXIT_END: break
+
+    log = np.array(trades, dtype=TRADE_DTYPE)
+    return _report(log, c, n, initial_capital, size, t0, keep_details)
+
+
+def _report(log, c, n, initial_capital, size, t0, keep_details) -> BacktestResult:
+    # Curva de capital marcada a mercado: una operación a la vez, por tramos vectorizados
+    steps = np.zeros(n, dtype=np.float64)
+    np.add.at(steps, log['exit_idx'], log['pnl'])
+    realized = initial_capital + np.cumsum(steps)
+    equity = realized.copy()
+    for i, j, side, entry in zip(log['entry_idx'].tolist(), log['exit_idx'].tolist(),
+                                 log['side'].tolist(), log['entry_price'].tolist()):
+        equity[i:j] = realized[i - 1 if i else 0] + (c[i:j] - entry) * size * side
+    in_market = int((log['exit_idx'] - log['entry_idx']).sum())
+
+    peak = np.maximum.accumulate(equity) if n else equity
+    dd = peak - equity
+    dd_idx = int(np.argmax(dd)) if n else 0
+    pnl = log['pnl']
+    gains, losses_ = pnl[pnl > 0].sum(), -pnl[pnl < 0].sum()
+
+    return BacktestResult(
+        trades=len(log),
+        wins=int((pnl > 0).sum()),
+        losses=int((pnl <= 0).sum()),
+        win_rate=round(float((pnl > 0).mean()) * 100, 2) if len(log) else 0.0,
+        pnl=round(float(pnl.sum()), 6),
+        return_pct=round(float(pnl.sum()) / initial_capital * 100, 4),
+        max_drawdown=round(float(dd[dd_idx]) if n else 0.0, 6),
+        max_drawdown_pct=round(float(dd[dd_idx] / peak[dd_idx]) * 100, 4) if n else 0.0,
+        profit_factor=round(float(gains / losses_), 4) if losses_ > 0 else float('inf') if gains > 0 else 0.0,
+        fees=round(float(log['fees'].sum()), 6),
+        exposure_pct=round(in_market / n * 100, 2) if n else 0.0,
+        bars=n,
+        elapsed=round(time.perf_counter() - t0, 4),
+        exits={name: int((log['reason'] == code).sum()) for code, name in EXIT_NAMES.items()},
+        trade_log=log if keep_details else None,
+        equity=equity if keep_details else None,
+    )
+
+
+# ==========================================
+# 🖥️ 3. CLI
+# ==========================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backtest de la estrategia RSI sobre velas guardadas")
+    parser.add_argument("path", help="CSV, Parquet (timestamp,open,high,low,close,volume) o archivo .ncnd")
+    parser.add_argument("--timeframe", help="re-muestrear a este timeframe (p.ej. 5m, 1h)")
+    parser.add_argument("--fee", type=float, default=0.001, help="comisión por lado (0.001 = 0.1%%)")
+    parser.add_argument("--slippage", type=float, default=0.0)
+    parser.add_argument("--capital", type=float, default=10_000.0)
+    parser.add_argument("--long-only", action="store_true")
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    candles = load_candles(args.path)
+    if args.timeframe: candles = resample(candles, args.timeframe)
+    loaded = time.perf_counter() - t0
+
+    result = run_backtest(candles, fee_rate=args.fee, slippage=args.slippage,
+                          initial_capital=args.capital, allow_short=not args.long_only)
+    print(f"📂 {result.bars:,} velas cargadas en {loaded:.2f}s")
+    for k, v in result.summary().items():
+        print(f"   {k:>18}: {v}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
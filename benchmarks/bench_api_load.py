@@ -0,0 +1,146 @@
+"""
+Benchmark de carga de las rutas /api/market/* y /api/auth/* contra un exchange, un Gemini
+y un Mongo falsos.
+Uso: python -m benchmarks.bench_api_load --clients 200 --requests 3000 --latency 0.05 [--routes market auth]
+"""
+
+import os
+import sys
+import time
+import json
+import asyncio
+import argparse
+import threading
+
+# Sin Mongo real: fallar rápido en vez de esperar 30s al importar main
+os.environ.setdefault("MONGO_URI", "mongodb://127.0.0.1:1/?serverSelectionTimeoutMS=100")
+
+import aiohttp
+import uvicorn
+
+from benchmarks.fakes import FakeExchange, AsyncFakeExchange, start_fake_gemini, fake_users, install_fake_mongo
+
+PATHS = ["/api/market/btc", "/api/market/candles", "/api/market/overview"]
+AUTH_PATHS = ["/api/auth/login", "/api/auth/register"]
+ROUTES = {'market': PATHS, 'auth': AUTH_PATHS}
+AUTH_USERS = 1000
+AUTH_PASSWORD = "bench-password"
+
+# Cuerpos de las rutas POST: login de usuarios sembrados, registro con emails nuevos
+BODIES = {
+    "/api/auth/login": lambda i: {"email": f"user{i % AUTH_USERS:05d}@nexus.test", "password": AUTH_PASSWORD},
+    "/api/auth/register": lambda i: {"email": f"new{i:07d}@nexus.test", "password": AUTH_PASSWORD},
+}
+
+
+def percentile(values, p):
+    if not values: return 0.0
+    values = sorted(values)
+    k = min(len(values) - 1, max(0, int(round(p / 100 * (len(values) - 1)))))
+    return values[k]
+
+
+def _run_loop_in_thread(coro_factory):
+    """Arranca un event loop propio en un hilo y devuelve el resultado de coro_factory()."""
+    ready = threading.Event()
+    box = {}
+
+    def runner():
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        box['value'] = loop.run_until_complete(coro_factory())
+        box['loop'] = loop
+        ready.set()
+        loop.run_forever()
+
+    threading.Thread(target=runner, daemon=True).start()
+    ready.wait()
+    return box['value']
+
+
+def start_server(app, port):
+    config = uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", lifespan="on")
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started: time.sleep(0.05)
+    return server
+
+
+async def run_load(base_url, paths, clients, total):
+    stats = {p: {'lat': [], 'errors': 0} for p in paths}
+    counter = iter(range(total))
+
+    async def worker(session):
+        for i in counter:
+            path = paths[i % len(paths)]
+            t0 = time.perf_counter()
+            body = BODIES.get(path)
+            try:
+                request = session.get(base_url + path) if body is None else session.post(base_url + path, json=body(i))
+                async with request as r:
+                    await r.read()
+                    if r.status != 200: stats[path]['errors'] += 1
+            except Exception:
+                stats[path]['errors'] += 1
+            stats[path]['lat'].append(time.perf_counter() - t0)
+
+    connector = aiohttp.TCPConnector(limit=clients)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        t0 = time.perf_counter()
+        await asyncio.gather(*(worker(session) for _ in range(clients)))
+        elapsed = time.perf_counter() - t0
+
+    report = {}
+    for path, s in stats.items():
+        lat = s['lat']
+        report[path] = {
+            'requests': len(lat),
+            'errors': s['errors'],
+            'p50_ms': round(percentile(lat, 50) * 1000, 2),
+            'p99_ms': round(percentile(lat, 99) * 1000, 2),
+        }
+    report['total'] = {'requests': total, 'clients': clients, 'seconds': round(elapsed, 3),
+                       'rps': round(total / elapsed, 1)}
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--latency", type=float, default=0.05, help="latencia simulada del exchange (s)")
+    parser.add_argument("--ai-latency", type=float, default=0.3, help="latencia simulada de Gemini (s)")
+    parser.add_argument("--mongo-latency", type=float, default=0.0005, help="RTT simulado de Mongo (s)")
+    parser.add_argument("--routes", nargs='+', choices=sorted(ROUTES), default=['market'])
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args(argv)
+    return run(args.clients, args.requests, args.latency, args.ai_latency, args.mongo_latency, args.routes, args.port)
+
+
+def run(clients, requests, latency, ai_latency, mongo_latency=0.0005, routes=('market',), port=8765):
+    import main as api
+    from auth_service import pwd_context
+    from market_cache import candle_cache
+
+    _, gemini_url = _run_loop_in_thread(lambda: start_fake_gemini(ai_latency))
+    api.GEMINI_API_BASE = gemini_url
+    candle_cache.exchange = FakeExchange(latency)
+    api.exchange_async = candle_cache.async_exchange = AsyncFakeExchange(latency)
+    # Mismo hash para todos los sembrados: el coste de verify es el de producción
+    users = install_fake_mongo(api.db_manager, fake_users(AUTH_USERS, pwd_context.hash(AUTH_PASSWORD)),
+                               latency=mongo_latency)
+
+    paths = [p for r in routes for p in ROUTES[r]]
+    server = start_server(api.app, port)
+    try:
+        report = asyncio.run(run_load(f"http://127.0.0.1:{port}", paths, clients, requests))
+    finally:
+        server.should_exit = True
+    report['exchange_calls'] = api.exchange_async.calls
+    report['mongo_calls'] = dict(users.calls)
+    print(json.dumps(report, indent=2))
+    return report
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
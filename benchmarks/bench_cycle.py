@@ -0,0 +1,64 @@
+"""
+Benchmark del ciclo completo del bot (NexusTradingBot.execute_trading_cycle vía el scheduler)
+con Mongo en memoria y exchange falso: credenciales, mercado, señal y orden paper por usuario.
+Uso: python -m benchmarks.bench_cycle [--users 1 100 10000] [--latency 0.05] [--mongo-latency 0.0005]
+"""
+
+import os
+import json
+import time
+import logging
+import argparse
+
+os.environ.setdefault("MONGO_URI", "mongodb://127.0.0.1:1/?serverSelectionTimeoutMS=100")
+
+from benchmarks.fakes import FakeExchange, fake_users, install_fake_mongo
+
+
+def run(user_counts, latency: float, mongo_latency: float, workers: int, cycles: int):
+    import bot_executor
+    from database_manager import db_manager
+    from market_cache import candle_cache
+    from metrics import CycleMetrics, Registry
+
+    # Una línea por usuario a stdout falsearía la medida (y el JSON de salida)
+    for name in ('NexusBot', 'NexusScheduler'): logging.getLogger(name).setLevel(logging.WARNING)
+    fake = candle_cache.exchange = FakeExchange(latency)
+    bot = bot_executor.NexusTradingBot(bot_executor.BotConfig(paper_trading=True, workers=workers, cycle_budget=600))
+
+    report = {}
+    for n in user_counts:
+        coll = install_fake_mongo(db_manager, fake_users(n), latency=mongo_latency)
+        candle_cache.invalidate()
+        bot_executor.cycle_metrics = metrics = CycleMetrics(Registry(), max_users=0)
+        runs = []
+        for _ in range(cycles):
+            t0 = time.perf_counter()
+            cycle = bot.scheduler.run_cycle()
+            runs.append((time.perf_counter() - t0, cycle))
+        first, last = runs[0], runs[-1]
+        report[str(n)] = {
+            'cold_s': round(first[0], 4), 'warm_s': round(last[0], 4),
+            'warm_us_per_user': round(last[0] / n * 1e6, 1),
+            'processed': last[1].processed, 'errors': last[1].errors, 'overran': last[1].overran,
+            'stages': metrics.summary(), 'mongo_calls': dict(coll.calls),
+        }
+    report['exchange_calls'] = dict(fake.calls)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, nargs='+', default=[1, 100, 10_000])
+    parser.add_argument("--latency", type=float, default=0.05, help="latencia simulada del exchange (s)")
+    parser.add_argument("--mongo-latency", type=float, default=0.0005, help="RTT simulado de Mongo (s)")
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--cycles", type=int, default=2, help="ciclos por tamaño (el primero descarga velas)")
+    args = parser.parse_args(argv)
+    report = run(args.users, args.latency, args.mongo_latency, args.workers, args.cycles)
+    print(json.dumps(report, indent=2))
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Benchmark de la capa Mongo: arranque en frío (import + NexusDB) y latencia por petición
+sync / async. Contra un mongod local (--uri) o, por defecto, la colección en memoria.
+Uso: python -m benchmarks.bench_db [--uri mongodb://127.0.0.1:27017] [--users 10000]
+"""
+
+import os
+import sys
+import time
+import json
+import asyncio
+import argparse
+import subprocess
+
+os.environ.setdefault("MONGO_URI", "mongodb://127.0.0.1:1/?serverSelectionTimeoutMS=100")
+
+from benchmarks.bench_api_load import percentile
+from benchmarks.fakes import install_fake_mongo
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def cold_start(module: str, runs: int = 3) -> float:
+    """Mediana (ms) de `import <module>` en un proceso nuevo, sin Mongo alcanzable."""
+    code = f"import time; t=time.perf_counter(); import {module}; print((time.perf_counter()-t)*1000)"
+    env = dict(os.environ, MONGO_URI="mongodb://127.0.0.1:1/")
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True)
+        samples.append(float(out.stdout.strip().splitlines()[-1]))
+    return round(sorted(samples)[len(samples) // 2], 1)
+
+
+def summarize(lat, elapsed):
+    return {'ops': len(lat), 'p50_ms': round(percentile(lat, 50) * 1000, 3),
+            'p99_ms': round(percentile(lat, 99) * 1000, 3), 'ops_s': round(len(lat) / elapsed, 1)}
+
+
+def bench_sync(db, emails):
+    lat = []
+    t0 = time.perf_counter()
+    for e in emails:
+        t = time.perf_counter()
+        db.buscar_usuario(e, {"_id": 0, "password": 1})
+        lat.append(time.perf_counter() - t)
+    return summarize(lat, time.perf_counter() - t0)
+
+
+async def bench_async(db, emails, concurrency):
+    lat = []
+    it = iter(emails)
+
+    async def worker():
+        for e in it:
+            t = time.perf_counter()
+            await db.abuscar_usuario(e, {"_id": 0, "password": 1})
+            lat.append(time.perf_counter() - t)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(lat, time.perf_counter() - t0)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--uri", help="mongod local; sin él se usa la colección en memoria")
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--ops", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.0005, help="RTT simulado en memoria (s)")
+    args = parser.parse_args(argv)
+
+    from database_manager import NexusDB
+
+    docs = [{"email": f"user{i}@nexus.com", "password": "x", "subscription_status": "active",
+             "exchange_keys": None} for i in range(args.users)]
+    if args.uri:
+        db = NexusDB(args.uri)
+        coll = db.client["nexus_bench"]["users"]
+        coll.drop()
+        coll.insert_many(docs)
+        coll.create_index("email", unique=True)
+        db.users = coll
+        if db.async_users is not None:  # crea el AsyncMongoClient y lo apunta a la base de pruebas
+            db.async_users = db._async_client["nexus_bench"]["users"]
+    else:
+        db = NexusDB()
+        install_fake_mongo(db, docs, latency=args.latency)
+
+    emails = [docs[(i * 7919) % len(docs)]["email"] for i in range(args.ops)]
+    report = {
+        'backend': args.uri or 'memory',
+        'cold_start_ms': {'database_manager': cold_start('database_manager'), 'main': cold_start('main')},
+        'find_one_sync': bench_sync(db, emails),
+        'find_one_async': asyncio.run(bench_async(db, emails, args.concurrency)),
+    }
+    print(json.dumps(report, indent=2))
+    return report
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
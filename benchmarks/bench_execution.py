@@ -0,0 +1,72 @@
+"""
+Benchmark del envío de órdenes reales contra el exchange con órdenes falso:
+muchos usuarios en paralelo, clientes reutilizados del pool y latencia por etapa.
+Con --brackets cada orden lleva SL/TP en el mismo batch (una llamada por bracket).
+Uso: python -m benchmarks.bench_execution [--users 500] [--orders 4] [--latency 0.02] [--brackets]
+"""
+
+import json
+import time
+import argparse
+
+from benchmarks.fakes import FakeTradingExchange
+from execution_engine import ClientPool, ExecutionService, OrderRequest
+
+
+def run(users: int, orders: int, latency: float, markets_latency: float, workers: int,
+        pool_size: int, order_limit: int, brackets: bool = False):
+    emails = [f"user{i:05d}@nexus.test" for i in range(users)]
+    creds = {e: {'apiKey': f"key-{e}", 'secret': 'secret'} for e in emails}
+    clients = []
+
+    def factory(c):
+        client = FakeTradingExchange(c, latency=latency, order_limit=order_limit, markets_latency=markets_latency)
+        clients.append(client)
+        return client
+
+    pool = ClientPool(factory=factory, credentials=creds.get, max_clients=pool_size,
+                      rate=order_limit, period=10.0)
+    # Precio en caché: nunca se llama a fetch_ticker
+    service = ExecutionService(pool, price=lambda symbol: 65000.0, workers=workers)
+
+    def request(email, k):
+        side = 'buy' if k % 2 else 'sell'
+        if not brackets: return OrderRequest(email, 'BTC/USDT', side, quote_amount=50.0)
+        sl, tp = (63700.0, 67600.0) if side == 'buy' else (66300.0, 62400.0)
+        return OrderRequest(email, 'BTC/USDT', side, quote_amount=50.0, stop_loss=sl, take_profit=tp)
+
+    requests = [request(e, k) for k in range(orders) for e in emails]
+    t0 = time.perf_counter()
+    results = service.submit_many(requests)
+    elapsed = time.perf_counter() - t0
+    service.close()
+
+    calls = {}
+    for c in clients:
+        for name, n in c.calls.items(): calls[name] = calls.get(name, 0) + n
+    return {
+        'users': users, 'orders': len(requests), 'brackets': brackets, 'workers': workers, 'pool_size': pool_size,
+        'elapsed_s': round(elapsed, 3), 'orders_s': round(len(requests) / elapsed, 1),
+        'ok': sum(r.ok for r in results), 'failed': sum(not r.ok for r in results),
+        'service': service.stats, 'pool': pool.stats, 'exchange_calls': calls,
+        'latency': service.latency_report(),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--orders", type=int, default=4, help="órdenes por usuario")
+    parser.add_argument("--latency", type=float, default=0.02, help="segundos por llamada al exchange")
+    parser.add_argument("--markets-latency", type=float, default=0.2, help="segundos de load_markets")
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--pool-size", type=int, default=1024)
+    parser.add_argument("--order-limit", type=int, default=300, help="órdenes por cuenta cada 10 s")
+    parser.add_argument("--brackets", action="store_true", help="entrada + SL + TP por orden")
+    args = parser.parse_args(argv)
+    print(json.dumps(run(args.users, args.orders, args.latency, args.markets_latency, args.workers,
+                         args.pool_size, args.order_limit, args.brackets), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Benchmark del simulador de paper trading (paper_exchange): órdenes a mercado y brackets
+de muchos usuarios con disparos de SL/TP en cada vela del exchange falso.
+Uso: python -m benchmarks.bench_paper [--users 1000] [--orders 1000000] [--bracket-every 10]
+"""
+
+import json
+import time
+import random
+import argparse
+
+from benchmarks.fakes import FakeExchange
+from paper_exchange import PaperExchange
+
+
+def run(users: int, orders: int, bracket_every: int, candle_every: int, symbols: int, seed: int):
+    rng = random.Random(seed)
+    fake = FakeExchange()
+    pairs = list(fake.base_prices)[:symbols]
+    ex = PaperExchange(initial_balance=1e9, price=lambda s: fake.price_at(s, 0))
+    emails = [f"user{i:05d}@nexus.test" for i in range(users)]
+    bar = {s: 0 for s in pairs}
+
+    plan = [(rng.choice(emails), rng.choice(pairs), rng.random() < 0.5) for _ in range(orders)]
+    create = ex.create_order
+    t0 = time.perf_counter()
+    for i, (email, symbol, buy) in enumerate(plan):
+        side = 'buy' if buy else 'sell'
+        if bracket_every and i % bracket_every == 0:
+            # Bracket: entrada + SL/TP closePosition a +-2% / 4%
+            px = ex.last_price(symbol)
+            create(email, symbol, 'market', side, 0.01)
+            exit_side = 'sell' if buy else 'buy'
+            sl, tp = (px * 0.98, px * 1.04) if buy else (px * 1.02, px * 0.96)
+            create(email, symbol, 'STOP_MARKET', exit_side, None, None, {'stopPrice': sl, 'closePosition': True})
+            create(email, symbol, 'TAKE_PROFIT_MARKET', exit_side, None, None, {'stopPrice': tp, 'closePosition': True})
+        else:
+            create(email, symbol, 'market', side, 0.01)
+        if candle_every and i % candle_every == 0:
+            symbol = pairs[i // candle_every % len(pairs)]
+            k = bar[symbol] = bar[symbol] + 1
+            o, c = fake.price_at(symbol, k - 1), fake.price_at(symbol, k)
+            ex.on_candle(symbol, k * 60_000, o, max(o, c) * 1.001, min(o, c) * 0.999, c)
+    elapsed = time.perf_counter() - t0
+
+    t = time.perf_counter()
+    balances = [ex.balance(e) for e in emails[:100]]
+    balance_us = (time.perf_counter() - t) / len(balances) * 1e6
+    return {
+        'users': users, 'symbols': len(pairs), 'orders': ex.stats['orders'], 'elapsed_s': round(elapsed, 3),
+        'orders_per_min': int(ex.stats['orders'] / elapsed * 60), 'us_per_order': round(elapsed / ex.stats['orders'] * 1e6, 3),
+        'stats': ex.stats, 'open_orders': len(ex._orders), 'balance_us': round(balance_us, 2),
+        'sample_balance': balances[0],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--orders", type=int, default=1_000_000)
+    parser.add_argument("--bracket-every", type=int, default=10, help="1 de cada N órdenes es un bracket (0 = ninguna)")
+    parser.add_argument("--candle-every", type=int, default=1000, help="una vela nueva cada N órdenes")
+    parser.add_argument("--symbols", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+    print(json.dumps(run(args.users, args.orders, args.bracket_every, args.candle_every, args.symbols, args.seed),
+                     indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Benchmark del RSI: calculate_rsi (vectorizado, serie completa) por longitud de serie y
+el motor incremental (rsi_engine.sync) con una vela nueva por llamada.
+Uso: python -m benchmarks.bench_rsi [--lengths 100 1000 10000 100000] [--repeat 200]
+"""
+
+import os
+import json
+import time
+import argparse
+
+os.environ.setdefault("MONGO_URI", "mongodb://127.0.0.1:1/?serverSelectionTimeoutMS=100")
+
+import numpy as np
+
+from benchmarks.fakes import FakeExchange
+
+
+def series(n: int, symbol: str = 'BTC/USDT') -> np.ndarray:
+    fake = FakeExchange()
+    return np.array([fake.price_at(symbol, k) for k in range(n)])
+
+
+def per_call_us(fn, repeat: int) -> float:
+    """Mejor de 3 tandas de `repeat` llamadas (µs por llamada)."""
+    best = float('inf')
+    for _ in range(3):
+        t0 = time.perf_counter()
+        for _ in range(repeat): fn()
+        best = min(best, (time.perf_counter() - t0) / repeat)
+    return round(best * 1e6, 3)
+
+
+def run(lengths, repeat: int):
+    from main import calculate_rsi
+    from indicators import RSIEngine
+
+    report = {'calculate_rsi_us': {}, 'incremental_us': {}}
+    for n in lengths:
+        prices = series(n)
+        report['calculate_rsi_us'][str(n)] = per_call_us(lambda: calculate_rsi(prices), max(1, repeat * 1000 // n))
+
+        # Incremental: ventana de `n` velas que avanza una vela por llamada
+        engine, ts = RSIEngine(), np.arange(n + repeat, dtype=np.int64) * 60_000
+        full = series(n + repeat)
+        engine.sync('BTC/USDT', '1m', ts[:n], full[:n])
+        state = {'i': n}
+
+        def step():
+            i = state['i'] = state['i'] + 1
+            engine.sync('BTC/USDT', '1m', ts[i - n:i], full[i - n:i])
+        report['incremental_us'][str(n)] = per_call_us(step, repeat // 3 or 1)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--lengths", type=int, nargs='+', default=[100, 1000, 10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args(argv)
+    report = run(args.lengths, args.repeat)
+    print(json.dumps(report, indent=2))
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Benchmark de arranque en frío: `import <módulo>` en un proceso nuevo (mediana de varias
+ejecuciones) y qué dependencias pesadas quedan cargadas de verdad tras el import.
+Objetivo: los workers del bot (bot_executor) por debajo de --target ms.
+Uso: python -m benchmarks.bench_startup [--modules nexus_core bot_executor main] [--runs 5] [--target 200]
+"""
+
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY = ('ccxt', 'pymongo', 'aiohttp', 'fastapi', 'uvicorn', 'stripe', 'passlib', 'main')
+
+# Un módulo perezoso (nexus_core.lazy) está en sys.modules pero sin cargar: no cuenta
+_PROBE = """
+import sys, time, json
+t = time.perf_counter()
+import {module}
+ms = (time.perf_counter() - t) * 1000
+loaded = [m for m in {heavy!r} if m in sys.modules and type(sys.modules[m]).__name__ == 'module']
+print(json.dumps({{'ms': ms, 'loaded': loaded}}))
+"""
+
+
+def cold_import(module: str, runs: int):
+    env = dict(os.environ, MONGO_URI="mongodb://127.0.0.1:1/?serverSelectionTimeoutMS=100", PYTHONPATH=ROOT,
+               NEXUS_LOG_JSON="1")
+    samples, loaded = [], []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", _PROBE.format(module=module, heavy=HEAVY)],
+                             cwd=ROOT, env=env, capture_output=True, text=True)
+        if out.returncode != 0: raise RuntimeError(f"import {module}: {out.stderr.strip().splitlines()[-1:]}")
+        probe = json.loads(out.stdout.strip().splitlines()[-1])
+        samples.append(probe['ms'])
+        loaded = probe['loaded']
+    samples.sort()
+    return {'median_ms': round(samples[len(samples) // 2], 1), 'min_ms': round(samples[0], 1), 'heavy_loaded': loaded}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--modules", nargs='+', default=['nexus_core', 'bot_executor', 'main'])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--target", type=float, default=200.0, help="ms máximos para bot_executor")
+    args = parser.parse_args(argv)
+
+    report = {m: cold_import(m, args.runs) for m in args.modules}
+    if 'bot_executor' in report:
+        report['bot_executor']['within_target'] = report['bot_executor']['median_ms'] <= args.target
+    report['target_ms'] = args.target
+    print(json.dumps(report, indent=2))
+    return report
+
+
+if __name__ == "__main__":
+    main()
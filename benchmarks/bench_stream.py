@@ -0,0 +1,65 @@
+"""
+Benchmark de la ingesta por WebSocket contra el servidor de streams falso:
+cientos de pares, frescura de los buffers y llamadas REST (solo la siembra inicial).
+Uso: python -m benchmarks.bench_stream [--symbols 300] [--seconds 5] [--interval 1.0]
+"""
+
+import time
+import json
+import asyncio
+import argparse
+
+from benchmarks.bench_api_load import percentile
+from benchmarks.fakes import FakeExchange, AsyncFakeExchange, start_fake_market_ws
+from market_cache import CandleCache
+from market_stream import MarketStream, TickerStore
+
+
+async def run(symbols: int, seconds: float, interval: float, timeframes):
+    pairs = list(FakeExchange().base_prices) + [f"T{i:03d}/USDT" for i in range(max(0, symbols - 5))]
+    pairs = pairs[:symbols]
+    rest = AsyncFakeExchange()
+    cache = CandleCache(exchange=FakeExchange(), async_exchange=rest)
+    tickers = TickerStore()
+    runner, url = await start_fake_market_ws(FakeExchange(), interval=interval)
+    stream = MarketStream(pairs, timeframes, url=url, cache=cache, tickers=tickers)
+    stream.start()
+
+    await asyncio.sleep(seconds)
+    seeded_calls = dict(rest.calls)
+
+    # Lecturas desde memoria (lo que hacen rutas y bot): ni una llamada REST
+    lat = []
+    for sym in pairs:
+        for tf in timeframes:
+            t = time.perf_counter()
+            cache.get(sym, tf, 50)
+            lat.append(time.perf_counter() - t)
+    now = time.time()
+    ages = [now - t['received'] for t in tickers.snapshot(pairs).values()]
+
+    await stream.stop()
+    await runner.cleanup()
+    return {
+        'symbols': len(pairs), 'streams': len(stream.streams()), 'seconds': seconds,
+        'messages': stream.stats['messages'], 'msg_s': round(stream.stats['messages'] / seconds, 1),
+        'reconnects': stream.stats['reconnects'], 'errors': stream.stats['errors'],
+        'live_tickers': len(ages), 'ticker_age_max_s': round(max(ages), 3) if ages else None,
+        'live_buffers': sum(cache.is_live(s, tf) for s in pairs for tf in timeframes),
+        'read_p50_us': round(percentile(lat, 50) * 1e6, 2), 'read_p99_us': round(percentile(lat, 99) * 1e6, 2),
+        'rest_calls_seed': seeded_calls, 'rest_calls_total': dict(rest.calls),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--symbols", type=int, default=300)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--interval", type=float, default=1.0, help="segundos entre mensajes por stream")
+    parser.add_argument("--timeframes", nargs='+', default=['1h', '5m'])
+    args = parser.parse_args(argv)
+    print(json.dumps(asyncio.run(run(args.symbols, args.seconds, args.interval, args.timeframes)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
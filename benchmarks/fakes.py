@@ -0,0 +1,384 @@
+"""
+Dobles locales y deterministas para medir sin red: exchange tipo ccxt
+(sync y async, público y con órdenes), colección Mongo en memoria, un servidor
+Gemini falso y un servidor WebSocket con el formato de los streams combinados de Binance.
+Mismos métodos/forma de datos que ccxt y pymongo.
+"""
+
+import json
+import math
+import time
+import asyncio
+import zlib
+from typing import Dict, List, Optional
+
+import ccxt
+from aiohttp import web
+from pymongo.errors import DuplicateKeyError
+
+from market_cache import timeframe_to_ms
+
+BASE_PRICES = {'BTC/USDT': 65000.0, 'ETH/USDT': 3400.0, 'SOL/USDT': 150.0, 'BNB/USDT': 580.0, 'XRP/USDT': 0.52}
+
+
+class FakeExchange:
+    """Exchange público simulado: precios deterministas por (símbolo, vela) y latencia fija."""
+
+    def __init__(self, latency: float = 0.0, base_prices: Optional[Dict[str, float]] = None):
+        self.latency = latency
+        self.base_prices = dict(BASE_PRICES if base_prices is None else base_prices)
+        self.calls: Dict[str, int] = {}
+
+    # --- Serie de precios determinista ---
+    def _base(self, symbol: str) -> float:
+        if symbol not in self.base_prices:
+            self.base_prices[symbol] = 1.0 + zlib.crc32(symbol.encode()) % 1000
+        return self.base_prices[symbol]
+
+    def price_at(self, symbol: str, k: int) -> float:
+        """Precio de cierre de la vela k (ondas superpuestas -> RSI cruza 30/70)."""
+        h = zlib.crc32(symbol.encode()) % 97
+        return self._base(symbol) * (1 + 0.02 * math.sin(k / 7.0 + h) + 0.01 * math.sin(k / 2.3 + 2 * h))
+
+    def _count(self, name: str):
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    def _ohlcv(self, symbol: str, timeframe: str = '1m', since: Optional[int] = None, limit: Optional[int] = None) -> List[list]:
+        tf_ms = timeframe_to_ms(timeframe)
+        limit = limit or 500
+        last = int(time.time() * 1000) // tf_ms
+        first = since // tf_ms if since is not None else last - limit + 1
+        rows = []
+        for k in range(first, min(first + limit, last + 1)):
+            o, c = self.price_at(symbol, k - 1), self.price_at(symbol, k)
+            rows.append([k * tf_ms, o, max(o, c) * 1.001, min(o, c) * 0.999, c, 10.0 + k % 7])
+        return rows
+
+    def _ticker(self, symbol: str) -> dict:
+        k = int(time.time() * 1000) // 60_000
+        last, prev = self.price_at(symbol, k), self.price_at(symbol, k - 1440)
+        return {'symbol': symbol, 'last': last, 'percentage': (last / prev - 1) * 100,
+                'quoteVolume': 1e6 * self._base(symbol) ** 0.5, 'timestamp': k * 60_000}
+
+    # --- API ccxt (sync) ---
+    def fetch_ohlcv(self, symbol, timeframe='1m', since=None, limit=None, params=None):
+        self._count('fetch_ohlcv')
+        if self.latency: time.sleep(self.latency)
+        return self._ohlcv(symbol, timeframe, since, limit)
+
+    def fetch_ticker(self, symbol, params=None):
+        self._count('fetch_ticker')
+        if self.latency: time.sleep(self.latency)
+        return self._ticker(symbol)
+
+    def fetch_tickers(self, symbols=None, params=None):
+        self._count('fetch_tickers')
+        if self.latency: time.sleep(self.latency)
+        return {s: self._ticker(s) for s in (symbols or list(self.base_prices))}
+
+
+class FakeTradingExchange(FakeExchange):
+    """
+    Cliente autenticado simulado (una instancia por usuario, como ccxt). Rellena las
+    órdenes de mercado al precio de price_at y aplica el límite de órdenes de la cuenta:
+    si se supera lanza ccxt.RateLimitExceeded igual que Binance (-1015).
+    """
+
+    def __init__(self, creds: Optional[dict] = None, latency: float = 0.0, order_limit: int = 300,
+                 order_period: float = 10.0, markets_latency: float = 0.0):
+        super().__init__(latency)
+        self.apiKey = (creds or {}).get('apiKey')
+        self.order_limit, self.order_period = order_limit, order_period
+        self.markets_latency = markets_latency
+        self.markets = None
+        self.currencies = None
+        self.orders: Dict[str, dict] = {}
+        self._sent: List[float] = []
+        self.has = {'createOrders': True}
+        self.reject_types: set = set()      # tipos de orden a rechazar (pruebas de brackets)
+
+    def load_markets(self, reload=False, params=None):
+        self._count('load_markets')
+        if self.markets_latency: time.sleep(self.markets_latency)
+        self.markets = {s: {'symbol': s, 'type': 'future'} for s in self.base_prices}
+        self.currencies = {}
+        return self.markets
+
+    def set_markets(self, markets, currencies=None):
+        self.markets, self.currencies = markets, currencies
+
+    def _check_limit(self):
+        now = time.monotonic()
+        self._sent = [t for t in self._sent if now - t < self.order_period]
+        if len(self._sent) >= self.order_limit:
+            raise ccxt.RateLimitExceeded("binance {\"code\":-1015,\"msg\":\"Too many new orders\"}")
+        self._sent.append(now)
+
+    def _new_order(self, symbol, type, side, amount, price=None, params=None) -> dict:
+        if self.markets is None: raise ccxt.ExchangeError("markets not loaded")
+        if type in self.reject_types: raise ccxt.InvalidOrder(f"binance {type} rejected")
+        self._check_limit()
+        params = params or {}
+        fill = self.price_at(symbol, int(time.time() * 1000) // 60_000) if type == 'market' else price
+        order = {'id': str(len(self.orders) + 1), 'clientOrderId': params.get('clientOrderId'),
+                 'symbol': symbol, 'type': type, 'side': side, 'amount': amount,
+                 'price': fill, 'average': fill if type == 'market' else None,
+                 'stopPrice': params.get('stopPrice'), 'reduceOnly': params.get('reduceOnly', False),
+                 'status': 'closed' if type == 'market' else 'open',
+                 'filled': amount if type == 'market' else 0.0, 'timestamp': int(time.time() * 1000)}
+        self.orders[order['id']] = order
+        return order
+
+    def create_order(self, symbol, type, side, amount, price=None, params=None):
+        self._count('create_order')
+        if self.latency: time.sleep(self.latency)
+        return self._new_order(symbol, type, side, amount, price, params)
+
+    def create_orders(self, orders, params=None):
+        """Batch de hasta 5 órdenes en un round-trip; las rechazadas vuelven sin id (como ccxt)."""
+        self._count('create_orders')
+        if self.latency: time.sleep(self.latency)
+        if len(orders) > 5: raise ccxt.BadRequest("binance batchOrders: max 5 orders")
+        out = []
+        for o in orders:
+            try:
+                out.append(self._new_order(o['symbol'], o['type'], o['side'], o.get('amount'), o.get('price'),
+                                           o.get('params')))
+            except ccxt.RateLimitExceeded:
+                raise
+            except ccxt.BaseError as e:
+                out.append({'id': None, 'status': 'rejected', 'info': {'msg': str(e)}})
+        return out
+
+    def cancel_order(self, id, symbol=None, params=None):
+        self._count('cancel_order')
+        if self.latency: time.sleep(self.latency)
+        order = self.orders.get(id)
+        if order is None: raise ccxt.OrderNotFound(f"binance order {id} not found")
+        if order['status'] == 'open': order['status'] = 'canceled'
+        return order
+
+    def fetch_order(self, id, symbol=None, params=None):
+        self._count('fetch_order')
+        if self.latency: time.sleep(self.latency)
+        order = self.orders.get(id)
+        if order is None: raise ccxt.OrderNotFound(f"binance order {id} not found")
+        return dict(order)
+
+    def trigger(self, id):
+        """Simula que se dispara una orden condicional (SL/TP)."""
+        self.orders[id].update(status='closed', filled=self.orders[id]['amount'])
+
+
+class AsyncFakeExchange(FakeExchange):
+    """Misma simulación con la interfaz de ccxt.async_support."""
+
+    async def fetch_ohlcv(self, symbol, timeframe='1m', since=None, limit=None, params=None):
+        self._count('fetch_ohlcv')
+        await asyncio.sleep(self.latency)
+        return self._ohlcv(symbol, timeframe, since, limit)
+
+    async def fetch_ticker(self, symbol, params=None):
+        self._count('fetch_ticker')
+        await asyncio.sleep(self.latency)
+        return self._ticker(symbol)
+
+    async def fetch_tickers(self, symbols=None, params=None):
+        self._count('fetch_tickers')
+        await asyncio.sleep(self.latency)
+        return {s: self._ticker(s) for s in (symbols or list(self.base_prices))}
+
+    async def close(self):
+        pass
+
+
+async def start_fake_gemini(latency: float = 0.3, host: str = '127.0.0.1', port: int = 0):
+    """Servidor generateContent falso. Devuelve (runner, base_url) para GEMINI_API_BASE."""
+    async def generate(request):
+        await asyncio.sleep(latency)
+        return web.json_response({'candidates': [{'content': {'parts': [{'text': 'Consolidación en rango. '}]}}]})
+
+    app = web.Application()
+    app.router.add_post('/models/{model}', generate)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://{host}:{port}"
+
+
+async def start_fake_market_ws(exchange: Optional[FakeExchange] = None, interval: float = 1.0,
+                               host: str = '127.0.0.1', port: int = 0):
+    """
+    Servidor de streams combinados tipo Binance (/stream?streams=btcusdt@kline_5m/btcusdt@ticker/...).
+    Cada `interval` envía una vela en curso y un ticker por stream, con los precios de `exchange`.
+    Devuelve (runner, url) para MarketStream(url=...).
+    """
+    exchange = exchange or FakeExchange()
+    clients = {'connections': 0, 'sent': 0}
+
+    def to_symbol(name: str) -> str:
+        for sym in exchange.base_prices:
+            if sym.replace('/', '').lower() == name: return sym
+        return name[:-4].upper() + '/USDT' if name.endswith('usdt') else name.upper()
+
+    def message(stream: str) -> dict:
+        name, kind = stream.split('@', 1)
+        symbol, now = to_symbol(name), int(time.time() * 1000)
+        if kind.startswith('kline_'):
+            tf = kind[len('kline_'):]
+            ts, o, h, l, c, v = exchange._ohlcv(symbol, tf, limit=1)[-1]
+            data = {'e': 'kline', 'E': now, 's': name.upper(),
+                    'k': {'t': ts, 'i': tf, 'o': str(o), 'h': str(h), 'l': str(l), 'c': str(c), 'v': str(v), 'x': False}}
+        elif kind == 'aggTrade':
+            t = exchange._ticker(symbol)
+            data = {'e': 'aggTrade', 'E': now, 's': name.upper(), 'p': str(t['last']), 'q': '0.01', 'T': now}
+        else:
+            t = exchange._ticker(symbol)
+            data = {'e': '24hrTicker', 'E': now, 's': name.upper(), 'c': str(t['last']),
+                    'P': str(t['percentage']), 'q': str(t['quoteVolume'])}
+        return {'stream': stream, 'data': data}
+
+    async def stream(request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        clients['connections'] += 1
+        streams = [s for s in request.query.get('streams', '').split('/') if s]
+        try:
+            while not ws.closed:
+                for name in streams:
+                    await ws.send_str(json.dumps(message(name)))
+                    clients['sent'] += 1
+                await asyncio.sleep(interval)
+        except (ConnectionResetError, RuntimeError):
+            pass
+        return ws
+
+    app = web.Application()
+    app.router.add_get('/stream', stream)
+    app['clients'] = clients
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://{host}:{port}/stream"
+
+
+# ==========================================
+# 🍃 MONGO EN MEMORIA
+# ==========================================
+
+def _match_value(value, cond) -> bool:
+    if isinstance(cond, dict) and cond and all(k.startswith('$') for k in cond):
+        for op, arg in cond.items():
+            if op == '$ne' and value == arg: return False
+            if op == '$in' and value not in arg: return False
+            if op == '$exists' and (value is not None) != bool(arg): return False
+        return True
+    return value == cond
+
+
+class FakeCollection:
+    """Colección `users` en memoria indexada por email (subconjunto de la API de pymongo)."""
+
+    def __init__(self, docs: Optional[List[dict]] = None, latency: float = 0.0):
+        self.latency = latency
+        self._by_email: Dict[str, dict] = {}
+        self.calls: Dict[str, int] = {}
+        for d in docs or []: self._by_email[d['email']] = dict(d)
+
+    def _op(self, name: str, sleep: bool = True):
+        self.calls[name] = self.calls.get(name, 0) + 1
+        if sleep and self.latency: time.sleep(self.latency)
+
+    def _candidates(self, filtro: dict):
+        email = filtro.get('email')
+        if isinstance(email, str):
+            doc = self._by_email.get(email)
+            return [doc] if doc is not None else []
+        if isinstance(email, dict) and '$in' in email:
+            return [self._by_email[e] for e in email['$in'] if e in self._by_email]
+        return list(self._by_email.values())
+
+    @staticmethod
+    def _matches(doc: dict, filtro: dict) -> bool:
+        return all(_match_value(doc.get(k), v) for k, v in filtro.items())
+
+    @staticmethod
+    def _project(doc: dict, proyeccion: Optional[dict]) -> dict:
+        if not proyeccion: return dict(doc)
+        keep = {k for k, v in proyeccion.items() if v and k != '_id'}
+        out = {k: doc[k] for k in keep if k in doc}
+        if proyeccion.get('_id', 1) and '_id' in doc: out['_id'] = doc['_id']
+        return out
+
+    def find_one(self, filtro=None, proyeccion=None, _sleep=True):
+        self._op('find_one', _sleep)
+        filtro = filtro or {}
+        for doc in self._candidates(filtro):
+            if self._matches(doc, filtro): return self._project(doc, proyeccion)
+        return None
+
+    def find(self, filtro=None, proyeccion=None, batch_size=None):
+        self._op('find')
+        filtro = filtro or {}
+        return iter([self._project(d, proyeccion) for d in self._candidates(filtro) if self._matches(d, filtro)])
+
+    def count_documents(self, filtro):
+        return sum(1 for d in self._candidates(filtro) if self._matches(d, filtro))
+
+    def insert_one(self, doc, _sleep=True):
+        self._op('insert_one', _sleep)
+        if doc['email'] in self._by_email: raise DuplicateKeyError(f"E11000 duplicate key: {doc['email']}")
+        doc.setdefault('_id', len(self._by_email) + 1)
+        self._by_email[doc['email']] = dict(doc)
+
+    def update_one(self, filtro, update, upsert=False, _sleep=True):
+        self._op('update_one', _sleep)
+        for doc in self._candidates(filtro):
+            if self._matches(doc, filtro):
+                doc.update(update.get('$set', {}))
+                return
+
+    def create_index(self, keys, **kwargs):
+        return f"{keys}_1"
+
+
+class AsyncFakeCollection:
+    """Misma colección con la interfaz de AsyncMongoClient (la latencia no bloquea el loop)."""
+
+    def __init__(self, sync: FakeCollection, latency: float = 0.0):
+        self.sync = sync
+        self.latency = latency
+
+    async def find_one(self, filtro=None, proyeccion=None):
+        await asyncio.sleep(self.latency)
+        return self.sync.find_one(filtro, proyeccion, _sleep=False)
+
+    async def insert_one(self, doc):
+        await asyncio.sleep(self.latency)
+        return self.sync.insert_one(doc, _sleep=False)
+
+    async def update_one(self, filtro, update, upsert=False):
+        await asyncio.sleep(self.latency)
+        return self.sync.update_one(filtro, update, upsert, _sleep=False)
+
+    async def create_index(self, keys, **kwargs):
+        return self.sync.create_index(keys, **kwargs)
+
+
+def fake_users(n: int, password_hash: str = "x", with_keys: bool = True, prefix: str = "user") -> List[dict]:
+    """Documentos `users` deterministas (user00000@nexus.test, ...). Claves cifradas de mentira: solo cuenta que existan."""
+    keys = {"api_key": "enc-api", "secret_key": "enc-secret"} if with_keys else None
+    return [{"email": f"{prefix}{i:05d}@nexus.test", "password": password_hash, "subscription_status": "active",
+             "exchange_keys": keys} for i in range(n)]
+
+
+def install_fake_mongo(db, docs: List[dict], latency: float = 0.0) -> FakeCollection:
+    """Apunta un NexusDB (p.ej. database_manager.db_manager) a la colección en memoria, sync y async."""
+    db.users = FakeCollection(docs, latency=latency)
+    db.async_users = AsyncFakeCollection(db.users, latency=latency)
+    db.creds_cache.invalidate()
+    return db.users
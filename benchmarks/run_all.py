@@ -0,0 +1,151 @@
+"""
+Suite de benchmarks reproducible (sin red: exchange, Gemini y Mongo falsos).
+Ejecuta cada benchmark en su propio proceso, junta los JSON en una línea base y, con
+--compare, marca las métricas que empeoran más de --threshold respecto a otra línea base.
+Uso: python -m benchmarks.run_all [--profile quick|full] [--out benchmarks/baseline.json] [--compare old.json]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_OUT = os.path.join(ROOT, "benchmarks", "baseline.json")
+
+# nombre -> (módulo, argumentos por perfil)
+SUITES: Dict[str, Tuple[str, Dict[str, List[str]]]] = {
+    'rsi': ('benchmarks.bench_rsi', {
+        'quick': ['--lengths', '100', '1000', '10000', '--repeat', '100'],
+        'full': ['--lengths', '100', '1000', '10000', '100000', '--repeat', '300']}),
+    'cycle': ('benchmarks.bench_cycle', {
+        'quick': ['--users', '1', '100', '1000', '--latency', '0.01'],
+        'full': ['--users', '1', '100', '10000']}),
+    'api': ('benchmarks.bench_api_load', {
+        'quick': ['--routes', 'market', 'auth', '--clients', '20', '--requests', '300', '--latency', '0.01',
+                  '--ai-latency', '0.05', '--port', '8781'],
+        'full': ['--routes', 'market', 'auth', '--clients', '200', '--requests', '3000', '--port', '8781']}),
+    'db': ('benchmarks.bench_db', {
+        'quick': ['--users', '1000', '--ops', '1000'],
+        'full': []}),
+    'execution': ('benchmarks.bench_execution', {
+        'quick': ['--users', '50', '--orders', '2', '--latency', '0.005', '--markets-latency', '0.02', '--brackets'],
+        'full': ['--brackets']}),
+    'paper': ('benchmarks.bench_paper', {
+        'quick': ['--orders', '100000'],
+        'full': []}),
+    'startup': ('benchmarks.bench_startup', {
+        'quick': ['--runs', '3'],
+        'full': ['--runs', '9']}),
+}
+
+# Sufijos de métricas donde más es peor (tiempos) o mejor (rendimiento); el resto se ignora al comparar
+LOWER_IS_BETTER = ('_ms', '_us', '_s', 'us_per_order', 'us_per_user')
+HIGHER_IS_BETTER = ('rps', 'ops_s', 'orders_s', 'orders_per_min')
+
+
+def _git_commit() -> str:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True)
+        return out.stdout.strip()
+    except OSError:
+        return ""
+
+
+def _parse_report(stdout: str) -> dict:
+    """Los benchmarks imprimen un JSON indentado al final (puede haber logs antes)."""
+    lines = stdout.splitlines()
+    for i, line in enumerate(lines):
+        if line == '{':
+            try:
+                return json.loads('\n'.join(lines[i:]))
+            except ValueError:
+                continue
+    raise ValueError("el benchmark no imprimió un JSON")
+
+
+def run_suite(name: str, profile: str, timeout: float) -> dict:
+    module, profiles = SUITES[name]
+    cmd = [sys.executable, "-m", module, *profiles[profile]]
+    t0 = time.perf_counter()
+    proc = subprocess.run(cmd, cwd=ROOT, capture_output=True, text=True, timeout=timeout,
+                          env=dict(os.environ, PYTHONPATH=ROOT))
+    elapsed = round(time.perf_counter() - t0, 2)
+    if proc.returncode != 0:
+        return {'error': proc.stderr.strip().splitlines()[-1:] or ['exit %d' % proc.returncode], 'wall_s': elapsed}
+    try:
+        return {'report': _parse_report(proc.stdout), 'wall_s': elapsed}
+    except ValueError as e:
+        return {'error': [str(e)], 'wall_s': elapsed}
+
+
+def flatten(report, prefix: str = '') -> Dict[str, float]:
+    out: Dict[str, float] = {}
+    if isinstance(report, dict):
+        for k, v in report.items(): out.update(flatten(v, f"{prefix}.{k}" if prefix else str(k)))
+    elif isinstance(report, (int, float)) and not isinstance(report, bool):
+        out[prefix] = float(report)
+    return out
+
+
+def _direction(key: str) -> int:
+    """+1 si subir es empeorar, -1 si subir es mejorar, 0 si no es una métrica de rendimiento."""
+    # La hoja manda; si no dice nada, el grupo (p.ej. rsi.calculate_rsi_us.1000)
+    for part in reversed(key.split('.')):
+        if part.endswith(HIGHER_IS_BETTER): return -1
+        if part.endswith(LOWER_IS_BETTER): return 1
+    return 0
+
+
+def compare(old: dict, new: dict, threshold: float) -> List[dict]:
+    """Métricas comparables que empeoran más de `threshold` (0.2 = 20 %)."""
+    before = flatten({k: v.get('report', {}) for k, v in old.get('suites', {}).items()})
+    after = flatten({k: v.get('report', {}) for k, v in new.get('suites', {}).items()})
+    regressions = []
+    for key, value in after.items():
+        direction, base = _direction(key), before.get(key)
+        if not direction or not base: continue
+        change = (value - base) / base * direction
+        if change > threshold:
+            regressions.append({'metric': key, 'baseline': base, 'current': value, 'worse_pct': round(change * 100, 1)})
+    return sorted(regressions, key=lambda r: -r['worse_pct'])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--profile", choices=('quick', 'full'), default='quick')
+    parser.add_argument("--only", nargs='+', choices=sorted(SUITES), help="solo estos benchmarks")
+    parser.add_argument("--out", default=DEFAULT_OUT, help="línea base a escribir")
+    parser.add_argument("--compare", help="línea base anterior contra la que comparar")
+    parser.add_argument("--threshold", type=float, default=0.2, help="empeoramiento tolerado (0.2 = 20%%)")
+    parser.add_argument("--timeout", type=float, default=900, help="segundos máximos por benchmark")
+    args = parser.parse_args(argv)
+
+    baseline = {
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()), 'profile': args.profile,
+        'commit': _git_commit(), 'python': platform.python_version(), 'platform': platform.platform(),
+        'cpus': os.cpu_count(), 'suites': {},
+    }
+    for name in args.only or SUITES:
+        print(f"▶ {name} ...", file=sys.stderr, flush=True)
+        baseline['suites'][name] = result = run_suite(name, args.profile, args.timeout)
+        print(f"  {'ERROR ' + result['error'][0] if 'error' in result else 'ok'} ({result['wall_s']}s)",
+              file=sys.stderr, flush=True)
+
+    with open(args.out, 'w') as f: json.dump(baseline, f, indent=2)
+    print(f"Línea base escrita en {args.out}", file=sys.stderr)
+
+    failed = [n for n, r in baseline['suites'].items() if 'error' in r]
+    regressions = []
+    if args.compare:
+        with open(args.compare) as f: regressions = compare(json.load(f), baseline, args.threshold)
+        print(json.dumps({'regressions': regressions}, indent=2))
+    return 1 if failed or regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
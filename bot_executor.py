@@ -4,103 +4,69 @@ Ejecuta todo el ciclo real, pero simula la orden final para evitar bloqueos de A
 """
 
 import time
-import ccxt
-import numpy as np
 import logging
 import sys
-from datetime import datetime
-from typing import Dict, Any, Optional, List
-from dataclasses import dataclass
-from enum import Enum
-import uuid # Para generar IDs de órdenes simuladas
+from typing import Optional, List
 
 # --- FIX WINDOWS ---
 if sys.stdout.encoding != 'utf-8':
     sys.stdout = open(sys.stdout.fileno(), mode='w', encoding='utf-8', buffering=1)
     
 # --- IMPORTACIONES ---
+# Solo el núcleo ligero (nexus_core) y los servicios del bot: sin main.py (FastAPI, stripe, passlib...).
+# ccxt, pymongo y aiohttp se cargan en el primer uso.
 try:
+    from nexus_core import BotConfig, MarketData, OrderStatus, TradeSignal, TradingSignal, rsi_from_ohlcv
     from database_manager import db_manager
-    from main import calculate_rsi, get_ai_analysis 
+    from market_cache import candle_cache
+    from indicators import indicator_pipeline
+    from metrics import cycle_metrics
+    from logging_setup import setup_logging
+    from market_stream import MarketStream
+    from execution_engine import execution_service, OrderRequest
+    from paper_exchange import paper_exchange, paper_execution_service
+    from scheduler import BotScheduler, PROCESSED, SKIPPED, ERROR
+    import strategy
 except ImportError:
     sys.exit(1)
 
 # Configuración Log
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s | %(levelname)-8s | %(name)s | %(message)s',
-    handlers=[logging.StreamHandler(sys.stdout)]
-)
+# Cola + hilo escritor: el bucle de usuarios solo encola (y los mensajes repetidos se resumen)
+setup_logging(stream=sys.stdout)
 logger = logging.getLogger('NexusBot')
 
-# --- CONFIGURACIÓN ---
-class TradingSignal(Enum):
-    STRONG_BUY = "STRONG_BUY"
-    BUY = "BUY"
-    NEUTRAL = "NEUTRAL"
-    SELL = "SELL"
-    STRONG_SELL = "STRONG_SELL"
-
-class OrderStatus(Enum):
-    SUCCESS = "SUCCESS"
-    FAILED = "FAILED"
-
-@dataclass
-class BotConfig:
-    timeframe: str = '5m'
-    limit: int = 100
-    cycle_interval: int = 60
-    # 🔥 ACTIVAMOS MODO PAPER TRADING (Simulación)
-    # Esto hará que el bot funcione SIN necesitar permisos de escritura en Binance
-    paper_trading: bool = True 
-    
-    rsi_oversold: int = 30
-    rsi_overbought: int = 70
-    rsi_strong_oversold: int = 20
-    rsi_strong_overbought: int = 80
-    min_trade_amount: float = 0.001
-
-@dataclass
-class MarketData:
-    symbol: str
-    current_price: float
-    rsi: float
-    timestamp: datetime = datetime.now()
-
-@dataclass
-class TradeSignal:
-    signal: TradingSignal
-    confidence: float
-    entry_price: float
-    stop_loss: float
-    take_profit: float
-    position_size: float
-    reasoning: str
-    indicators: Dict[str, float]
-
 class AIAnalyzer:
-    def __init__(self, config: BotConfig): self.config = config
+    name = 'rsi-demo'
+
+    def __init__(self, config: BotConfig):
+        self.config = config
+        indicator_pipeline.subscribe(self.name, config.indicators)
     
     def analyze_market(self, market_data: MarketData) -> TradeSignal:
-        # Lógica simple para forzar una señal si el mercado lo permite
-        if market_data.rsi < self.config.rsi_oversold:
+        # Mismas reglas que el backtester (strategy.py)
+        code = strategy.rsi_signal_codes(market_data.rsi, self.config.rsi_oversold, self.config.rsi_overbought)
+        if code == strategy.BUY:
             signal = TradingSignal.BUY
-        elif market_data.rsi > self.config.rsi_overbought:
+        elif code == strategy.SELL:
             signal = TradingSignal.SELL
+        elif self.config.paper_trading:
+            # 🔥 TRUCO (solo paper trading): si es neutral, forzamos COMPRA para que veas el bot funcionar
+            # en esta demo. Con órdenes reales un neutral nunca llega al exchange.
+            signal = TradingSignal.BUY
         else:
-            # 🔥 TRUCO: Si es neutral, forzamos COMPRA para que veas el bot funcionar en esta demo
-            # En producción real, quitarías esta línea
-            signal = TradingSignal.BUY 
-            
+            signal = TradingSignal.NEUTRAL
+
+        side = strategy.SELL if signal == TradingSignal.SELL else strategy.BUY
+        stop_loss, take_profit = strategy.protective_levels(market_data.current_price, side)
         return TradeSignal(
             signal=signal,
             confidence=0.88,
             entry_price=market_data.current_price,
-            stop_loss=market_data.current_price * 0.98,
-            take_profit=market_data.current_price * 1.02,
+            stop_loss=stop_loss,
+            take_profit=take_profit,
             position_size=self.config.min_trade_amount,
             reasoning="Estrategia de RSI (Modo Demo)",
-            indicators={'rsi': market_data.rsi}
+            indicators={**indicator_pipeline.view(market_data.indicators, self.name), 'rsi': market_data.rsi}
         )
 
 class NexusTradingBot:
@@ -108,64 +74,116 @@ class NexusTradingBot:
         self.config = config
         self.ai_analyzer = AIAnalyzer(config)
         self.running = False
-        self.market_exchange = ccxt.binance() # Solo lectura (pública)
+        self.market_data = candle_cache # Velas compartidas entre usuarios (solo lectura)
+        if config.paper_trading:
+            # Simulador en proceso: mismas órdenes y brackets, SL/TP disparados por las velas de la caché
+            paper_exchange.timeframe = config.timeframe
+            self.paper = paper_exchange.attach(candle_cache)
+            self.execution = paper_execution_service(paper_exchange)
+        else:
+            self.paper = None
+            self.execution = execution_service # Clientes ccxt por usuario (pool)
+        self.stream: Optional[MarketStream] = None
+        self.scheduler = BotScheduler(
+            evaluate=lambda user, market: self.execute_trading_cycle(user['email'], market),
+            load_market=self.fetch_market_data,
+            users=lambda: db_manager.iterar_usuarios_activos(config.user_batch_size),
+            default_timeframe=config.timeframe,
+            workers=config.workers,
+            budget=config.cycle_budget,
+            # Operativa real: credenciales del lote en una sola consulta $in
+            prepare_batch=None if config.paper_trading else
+                lambda batch: db_manager.precargar_credenciales([u['email'] for u in batch]),
+        )
 
-    def fetch_market_data(self, symbol: str) -> Optional[MarketData]:
+    def fetch_market_data(self, symbol: str, timeframe: Optional[str] = None) -> Optional[MarketData]:
+        timeframe = timeframe or self.config.timeframe
         try:
-            ohlcv = self.market_exchange.fetch_ohlcv(symbol, self.config.timeframe, self.config.limit)
-            closes = np.array([x[4] for x in ohlcv])
-            # Usamos la función importada de main.py
-            rsi = calculate_rsi(closes)
-            return MarketData(symbol=symbol, current_price=float(closes[-1]), rsi=rsi)
+            with cycle_metrics.stage('market', symbol):
+                ohlcv = self.market_data.get(symbol, timeframe, self.config.limit)
+                # RSI incremental compartido (indicators.rsi_engine) vía nexus_core.signals
+                rsi = rsi_from_ohlcv(symbol, timeframe, ohlcv)
+                # Unión de los indicadores de todas las estrategias, memorizada por vela
+                indicators = indicator_pipeline.compute(symbol, timeframe, ohlcv)
+                return MarketData(symbol=symbol, current_price=float(ohlcv.close[-1]), rsi=rsi, indicators=indicators)
         except Exception as e:
             logger.error(f"Error datos: {e}")
             return None
 
-    def execute_trading_cycle(self, user_email: str):
+    def execute_trading_cycle(self, user_email: str, market_data: Optional[MarketData] = None):
+        """Ciclo de un usuario. `market_data` llega ya descargado desde el scheduler."""
         logger.info(f"🔄 Procesando estrategia para: {user_email}")
         
+        symbol = market_data.symbol if market_data is not None else 'BTC/USDT'
+
         # 1. VERIFICAR SEGURIDAD (Desencriptar claves)
         # Aunque sea Paper Trading, verificamos que el usuario tenga claves guardadas
-        credentials = db_manager.obtener_credenciales_usuario(user_email)
-        if not credentials:
+        with cycle_metrics.stage('credentials', symbol, user_email):
+            if self.config.paper_trading:
+                has_keys = db_manager.tiene_keys(user_email)  # Sin desencriptar
+            else:
+                has_keys = db_manager.obtener_credenciales_usuario(user_email) is not None
+        if not has_keys:
             logger.error(f"❌ El usuario {user_email} no ha configurado sus API Keys.")
-            return
+            return SKIPPED, f"Skipped {user_email}: No keys"
+
+        # Brackets anteriores: si saltó el SL o el TP se cancela la otra pata (OCO) antes de operar
+        with cycle_metrics.stage('reconcile', symbol, user_email):
+            try:
+                self.execution.reconcile(user_email)
+            except Exception as e:
+                logger.warning(f"⚠️ No se pudieron reconciliar los brackets de {user_email}: {e}")
 
         # 2. ANALIZAR MERCADO
-        symbol = 'BTC/USDT'
-        market_data = self.fetch_market_data(symbol)
-        if not market_data: return
+        if market_data is None:
+            market_data = self.fetch_market_data(symbol)
+            if not market_data: return ERROR, f"Error fetching data for {user_email}"
 
         logger.info(f"📊 {symbol} | Precio: ${market_data.current_price:,.2f} | RSI: {market_data.rsi:.2f}")
 
         # 3. GENERAR SEÑAL
-        signal = self.ai_analyzer.analyze_market(market_data)
+        with cycle_metrics.stage('signal', symbol, user_email):
+            signal = self.ai_analyzer.analyze_market(market_data)
         logger.info(f"🧠 Señal IA: {signal.signal.value}")
 
-        # 4. EJECUCIÓN (PAPER TRADING)
+        # 4. EJECUCIÓN: entrada + SL + TP en un batch (simulador en paper trading, exchange en real)
         if signal.signal != TradingSignal.NEUTRAL:
-            if self.config.paper_trading:
-                # Simulación de éxito
-                fake_order_id = str(uuid.uuid4())[:8]
-                logger.info(f"✅ [PAPER TRADE] ORDEN EJECUTADA EXITOSAMENTE")
-                logger.info(f"   🆔 ID Orden: {fake_order_id}")
-                logger.info(f"   💰 Acción: {signal.signal.value} {signal.position_size} BTC")
-                logger.info(f"   🎯 Entrada: ${signal.entry_price}")
-            else:
-                # Aquí iría la llamada real a ccxt
-                pass
+            with cycle_metrics.stage('execution', symbol, user_email):
+                if self.paper is not None: self.paper.update_price(symbol, market_data.current_price)
+                side = 'sell' if signal.signal in (TradingSignal.SELL, TradingSignal.STRONG_SELL) else 'buy'
+                result = self.execution.submit(OrderRequest(user_email, symbol, side, amount=signal.position_size,
+                                                            price=signal.entry_price, stop_loss=signal.stop_loss,
+                                                            take_profit=signal.take_profit))
+            if not result.ok:
+                cycle_metrics.error('execution', symbol, 'rejected')
+                logger.error(f"❌ Orden rechazada para {user_email}: {result.error}")
+                return ERROR, f"Order failed for {user_email}: {result.error}"
+            mode = "PAPER TRADE" if self.paper is not None else "ORDEN REAL"
+            logger.info(f"✅ [{mode}] {signal.signal.value} {signal.position_size} {symbol} a ${result.order.get('average')} "
+                        f"| 🆔 {result.order.get('id')} | SL ${signal.stop_loss:,.2f} | TP ${signal.take_profit:,.2f}",
+                        extra={'dedup': False})
+            return PROCESSED, f"Executed {signal.signal.value} for {user_email}"
         else:
             logger.info("💤 Mercado Neutral. Esperando.")
+            return PROCESSED, f"Neutral for {user_email} (RSI: {market_data.rsi:.2f})"
 
-    def start(self, users):
+    def start(self, users: Optional[List[dict]] = None):
+        """Sin `users` recorre los usuarios activos de Mongo en cada ciclo."""
         self.running = True
         logger.info("🚀 NEXUS BOT: INICIANDO MOTOR DE PAPER TRADING")
+        db_manager.crear_indices()
+        if self.config.stream_market_data and self.stream is None:
+            # Buffers alimentados por el stream: fetch_market_data lee de memoria
+            self.stream = MarketStream(self.config.stream_symbols or ('BTC/USDT',), (self.config.timeframe,),
+                                       cache=self.market_data, seed_limit=self.config.limit)
+            self.stream.start_in_thread()
         while self.running:
-            for user in users:
-                self.execute_trading_cycle(user['email'])
+            report = self.scheduler.run_cycle([users] if users is not None else None)
+            self.execution.expire_stale()   # brackets caducados de usuarios que ya no pasan por el ciclo
             
-            logger.info("⏳ Esperando 60s...")
-            time.sleep(60)
+            wait = max(0.0, self.config.cycle_interval - report.elapsed)
+            logger.info(f"⏳ Esperando {wait:.0f}s...")
+            time.sleep(wait)
 
 def main():
     # Configuración en modo Paper Trading
@@ -0,0 +1,273 @@
+"""
+Nexus Candle Archive - Archivo de velas en disco, append-only y mapeado en memoria.
+Un fichero por (símbolo, timeframe): cabecera fija de 64 bytes + registros de 48 bytes
+(timestamp int64, OHLCV float64, little-endian). Los lectores obtienen vistas NumPy
+sobre np.memmap (cero copias): historiales de varios GB se recorren sin cargarlos en RAM.
+El grabador se engancha a las descargas de ccxt de la caché (market_cache) y añade
+solo velas cerradas y posteriores a la última guardada.
+
+Uso:
+  python candle_archive.py record --symbols BTC/USDT ETH/USDT --timeframes 1m 5m
+  python candle_archive.py backfill BTC/USDT 1m --since 2024-01-01
+  python candle_archive.py info
+"""
+
+import os
+import sys
+import time
+import queue
+import struct
+import logging
+import argparse
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, Iterator, Optional, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:   # Windows
+    fcntl = None
+    import msvcrt
+
+from candles import Candles, COLUMNS
+from market_cache import candle_cache, CandleCache, timeframe_to_ms
+
+logger = logging.getLogger('NexusArchive')
+
+ARCHIVE_DIR = os.getenv("NEXUS_ARCHIVE_DIR", os.path.join("data", "archive"))
+MAGIC = b'NXCNDL01'
+HEADER = struct.Struct('<8sII24s8s16x')   # magic, tamaño de registro, reservado, símbolo, timeframe
+HEADER_SIZE = 64
+RECORD = np.dtype([(c, '<i8' if c == 'timestamp' else '<f8') for c in COLUMNS])
+EXT = '.ncnd'
+
+assert HEADER.size == HEADER_SIZE and RECORD.itemsize == 48
+
+
+def _file_name(symbol: str, timeframe: str) -> str:
+    return f"{symbol.replace('/', '-')}_{timeframe}{EXT}"
+
+
+@contextmanager
+def _locked(path: str):
+    """Lock exclusivo entre procesos (API con NEXUS_ARCHIVE=1 y CLI `record` sobre el mismo fichero)."""
+    with open(path + '.lock', 'a+b') as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def read_header(path: str) -> Tuple[str, str]:
+    with open(path, 'rb') as f:
+        magic, rec_size, _, symbol, timeframe = HEADER.unpack(f.read(HEADER_SIZE))
+    if magic != MAGIC or rec_size != RECORD.itemsize:
+        raise ValueError(f"{path} no es un archivo de velas Nexus")
+    return symbol.rstrip(b'\0').decode(), timeframe.rstrip(b'\0').decode()
+
+
+def open_file(path: str) -> Candles:
+    """Vistas de solo lectura sobre el fichero (np.memmap, sin copias)."""
+    read_header(path)
+    n = (os.path.getsize(path) - HEADER_SIZE) // RECORD.itemsize   # ignora un registro a medio escribir
+    if n <= 0: return Candles.empty()
+    records = np.memmap(path, dtype=RECORD, mode='r', offset=HEADER_SIZE, shape=(n,))
+    return Candles(*(records[c] for c in COLUMNS))
+
+
+class CandleArchive:
+    """
+    Lectura y escritura del directorio de archivos. Varios procesos pueden escribir el mismo
+    fichero: cada append toma un lock de fichero y relee la última vela del disco.
+    """
+
+    def __init__(self, root: str = ARCHIVE_DIR):
+        self.root = root
+        self._lock = threading.Lock()
+
+    def path(self, symbol: str, timeframe: str) -> str:
+        return os.path.join(self.root, _file_name(symbol, timeframe))
+
+    # --- ESCRITURA (con el lock de fichero tomado) ---
+    def _prepare(self, symbol: str, timeframe: str) -> Optional[int]:
+        """Crea el fichero si no existe, recorta un registro incompleto y devuelve el último ts del disco."""
+        path = self.path(symbol, timeframe)
+        if not os.path.exists(path):
+            with open(path, 'wb') as f:
+                f.write(HEADER.pack(MAGIC, RECORD.itemsize, 0, symbol.encode()[:24], timeframe.encode()[:8]))
+            return None
+        read_header(path)
+        size = os.path.getsize(path)
+        extra = (size - HEADER_SIZE) % RECORD.itemsize
+        if extra:
+            with open(path, 'r+b') as f: f.truncate(size - extra)
+        n = (size - extra - HEADER_SIZE) // RECORD.itemsize
+        if not n: return None
+        with open(path, 'rb') as f:
+            f.seek(HEADER_SIZE + (n - 1) * RECORD.itemsize)
+            return int(np.frombuffer(f.read(RECORD.itemsize), dtype=RECORD)['timestamp'][0])
+
+    def append(self, symbol: str, timeframe: str, candles: Candles) -> int:
+        """Añade las velas posteriores a la última guardada (orden ascendente). Devuelve cuántas."""
+        path = self.path(symbol, timeframe)
+        os.makedirs(self.root, exist_ok=True)
+        with self._lock, _locked(path):
+            last = self._prepare(symbol, timeframe)
+            new = candles if last is None else candles.between(last + 1)
+            if not len(new): return 0
+            records = np.empty(len(new), dtype=RECORD)
+            for c in COLUMNS: records[c] = getattr(new, c)
+            with open(path, 'ab') as f:
+                f.write(records.tobytes())
+            return len(new)
+
+    def last_ts(self, symbol: str, timeframe: str) -> Optional[int]:
+        path = self.path(symbol, timeframe)
+        if not os.path.exists(path): return None
+        with self._lock, _locked(path):
+            return self._prepare(symbol, timeframe)
+
+    # --- LECTURA ---
+    def read(self, symbol: str, timeframe: str, since: Optional[int] = None, until: Optional[int] = None) -> Candles:
+        """Vistas cero-copia del rango pedido (búsqueda binaria sobre el timestamp mapeado)."""
+        path = self.path(symbol, timeframe)
+        if not os.path.exists(path): return Candles.empty()
+        return open_file(path).between(since, until)
+
+    def catalog(self) -> Iterator[Tuple[str, str, int, str]]:
+        """(símbolo, timeframe, velas, ruta) de cada fichero del archivo."""
+        if not os.path.isdir(self.root): return
+        for name in sorted(os.listdir(self.root)):
+            if not name.endswith(EXT): continue
+            path = os.path.join(self.root, name)
+            symbol, timeframe = read_header(path)
+            yield symbol, timeframe, (os.path.getsize(path) - HEADER_SIZE) // RECORD.itemsize, path
+
+
+class CandleRecorder:
+    """
+    Escucha las descargas de la caché (CandleCache.add_listener) y las vuelca al archivo
+    desde un hilo propio: el camino de la petición solo encola.
+    """
+
+    def __init__(self, archive: CandleArchive, max_queue: int = 10_000):
+        self.archive = archive
+        self._queue: "queue.Queue[Tuple[str, str, Candles]]" = queue.Queue(max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {'received': 0, 'written': 0, 'dropped': 0, 'errors': 0}
+
+    def __call__(self, symbol: str, timeframe: str, candles: Candles):
+        # Solo velas cerradas: la vela en curso todavía cambia
+        closed = candles.between(until=(int(time.time() * 1000) // timeframe_to_ms(timeframe) - 1)
+                                 * timeframe_to_ms(timeframe))
+        if not len(closed): return
+        self.stats['received'] += 1
+        try:
+            self._queue.put_nowait((symbol, timeframe, closed))
+        except queue.Full:
+            self.stats['dropped'] += 1
+
+    def attach(self, cache: CandleCache = candle_cache) -> 'CandleRecorder':
+        cache.add_listener(self)
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='nexus-archive', daemon=True)
+            self._thread.start()
+        return self
+
+    def detach(self, cache: CandleCache = candle_cache, timeout: float = 5.0):
+        cache.remove_listener(self)
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None: break
+            try:
+                self.stats['written'] += self.archive.append(*item)
+            except Exception as e:
+                self.stats['errors'] += 1
+                logger.error(f"No se pudo archivar {item[0]} {item[1]}: {e}")
+
+
+# ==========================================
+# 🖥️ CLI (proceso grabador)
+# ==========================================
+
+def backfill(archive: CandleArchive, exchange, symbol: str, timeframe: str, since: int, page: int = 1000) -> int:
+    """Histórico desde `since` (o desde la última vela guardada) en páginas de `page` velas."""
+    tf_ms = timeframe_to_ms(timeframe)
+    last = archive.last_ts(symbol, timeframe)
+    since = max(since, last + tf_ms) if last is not None else since
+    closed_end = int(time.time() * 1000) // tf_ms * tf_ms - tf_ms
+    total = 0
+    while since <= closed_end:
+        rows = exchange.fetch_ohlcv(symbol, timeframe, since, page)
+        if not rows: break
+        total += archive.append(symbol, timeframe, Candles.from_rows(rows).between(since, closed_end))
+        if int(rows[-1][0]) < since: break
+        since = int(rows[-1][0]) + tf_ms
+    return total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Archivo de velas mapeado en memoria")
+    parser.add_argument("--root", default=ARCHIVE_DIR)
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    rec = sub.add_parser("record", help="graba las velas cerradas de forma continua")
+    rec.add_argument("--symbols", nargs='+', default=['BTC/USDT'])
+    rec.add_argument("--timeframes", nargs='+', default=['1m'])
+    rec.add_argument("--interval", type=float, default=30.0)
+    bf = sub.add_parser("backfill", help="descarga histórico por páginas")
+    bf.add_argument("symbol")
+    bf.add_argument("timeframe")
+    bf.add_argument("--since", required=True, help="YYYY-MM-DD")
+    sub.add_parser("info", help="lista los ficheros del archivo")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    archive = CandleArchive(args.root)
+
+    if args.cmd == "info":
+        for symbol, timeframe, n, path in archive.catalog():
+            span = open_file(path).timestamp
+            first = datetime.fromtimestamp(span[0] / 1000, timezone.utc).isoformat() if n else '-'
+            last = datetime.fromtimestamp(span[-1] / 1000, timezone.utc).isoformat() if n else '-'
+            print(f"{symbol:>12} {timeframe:>4} {n:>12,} velas  {first} -> {last}  {path}")
+    elif args.cmd == "backfill":
+        since = int(datetime.strptime(args.since, "%Y-%m-%d").replace(tzinfo=timezone.utc).timestamp() * 1000)
+        n = backfill(archive, candle_cache.exchange, args.symbol, args.timeframe, since)
+        print(f"📦 {n:,} velas añadidas a {archive.path(args.symbol, args.timeframe)}")
+    else:
+        # Mismo camino que la API: descargas de candle_cache -> grabador
+        recorder = CandleRecorder(archive).attach(candle_cache)
+        logger.info(f"🎙️ Grabando {args.symbols} x {args.timeframes} cada {args.interval}s en {archive.root}")
+        try:
+            while True:
+                for symbol in args.symbols:
+                    for tf in args.timeframes:
+                        try:
+                            candle_cache.get(symbol, tf, candle_cache.capacity)
+                        except Exception as e:
+                            logger.warning(f"{symbol} {tf}: {e}")
+                time.sleep(args.interval)
+        except KeyboardInterrupt:
+            recorder.detach(candle_cache)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
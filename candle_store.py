@@ -0,0 +1,227 @@
+"""
+Nexus Candle Store - Histórico de velas persistente en SQLite.
+Guarda velas CERRADAS por (símbolo, timeframe) junto con los rangos ya descargados:
+un rango repetido se sirve desde disco y los huecos se rellenan del exchange en
+páginas de 1000 velas. La vela en curso sale de la caché en memoria (candle_cache).
+Paginación por cursor opaco (hacia atrás para el gráfico, hacia delante con `since`).
+"""
+
+import os
+import time
+import base64
+import sqlite3
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from candles import Candles
+from market_cache import candle_cache, CandleCache, timeframe_to_ms
+
+logger = logging.getLogger('NexusCandleStore')
+
+CANDLE_DB_PATH = os.getenv("NEXUS_CANDLE_DB", os.path.join("data", "candles.sqlite3"))
+PAGE_SIZE = 1000          # máximo de velas por llamada fetch_ohlcv en Binance
+MAX_LIMIT = 5000          # máximo de velas por petición a la API
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS candles (
+    symbol TEXT NOT NULL, timeframe TEXT NOT NULL, ts INTEGER NOT NULL,
+    open REAL, high REAL, low REAL, close REAL, volume REAL,
+    PRIMARY KEY (symbol, timeframe, ts)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS coverage (
+    symbol TEXT NOT NULL, timeframe TEXT NOT NULL, start INTEGER NOT NULL, "end" INTEGER NOT NULL,
+    PRIMARY KEY (symbol, timeframe, start)
+) WITHOUT ROWID;
+"""
+
+
+def encode_cursor(direction: str, ts: int) -> str:
+    return base64.urlsafe_b64encode(f"{direction}:{ts}".encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[str, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        direction, ts = raw.split(':')
+        if direction not in ('asc', 'desc'): raise ValueError(direction)
+        return direction, int(ts)
+    except Exception:
+        raise ValueError("Cursor no válido")
+
+
+class CandleStore:
+    """
+    range(symbol, timeframe, since, until, limit, cursor) -> (Candles, next_cursor)
+    Sin `since`: las `limit` velas que terminan en `until` (o ahora) y cursor hacia atrás.
+    Con `since`: las `limit` velas desde `since` y cursor hacia delante.
+    """
+
+    def __init__(self, path: str = CANDLE_DB_PATH, cache: CandleCache = candle_cache, exchange=None,
+                 page_size: int = PAGE_SIZE):
+        self.path = path
+        self.cache = cache
+        self._exchange = exchange
+        self.page_size = page_size
+        self._local = threading.local()
+        self._key_locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        self.stats = {'requests': 0, 'disk_hits': 0, 'backfills': 0, 'pages': 0, 'rows_fetched': 0}
+
+    @property
+    def exchange(self):
+        # Por defecto el mismo cliente público que la caché
+        return self._exchange if self._exchange is not None else self.cache.exchange
+
+    # --- CONEXIÓN (una por hilo, WAL: lectores concurrentes) ---
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def _key_lock(self, key: Tuple[str, str]) -> threading.Lock:
+        with self._locks_guard:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    # --- COBERTURA ---
+    def _coverage(self, symbol: str, timeframe: str) -> List[Tuple[int, int]]:
+        rows = self._conn().execute(
+            'SELECT start, "end" FROM coverage WHERE symbol=? AND timeframe=? ORDER BY start',
+            (symbol, timeframe)).fetchall()
+        return [(int(a), int(b)) for a, b in rows]
+
+    def missing_ranges(self, symbol: str, timeframe: str, start: int, end: int) -> List[Tuple[int, int]]:
+        """Sub-rangos [a, b] de [start, end] aún no descargados."""
+        if end < start: return []
+        tf_ms = timeframe_to_ms(timeframe)
+        gaps, cursor = [], start
+        for a, b in self._coverage(symbol, timeframe):
+            if b < cursor: continue
+            if a > end: break
+            if a > cursor: gaps.append((cursor, min(a - tf_ms, end)))
+            cursor = max(cursor, b + tf_ms)
+            if cursor > end: break
+        if cursor <= end: gaps.append((cursor, end))
+        return gaps
+
+    def _add_coverage(self, conn: sqlite3.Connection, symbol: str, timeframe: str, start: int, end: int):
+        """Inserta [start, end] fusionando con los rangos solapados o contiguos."""
+        tf_ms = timeframe_to_ms(timeframe)
+        overlapping = conn.execute(
+            'SELECT start, "end" FROM coverage WHERE symbol=? AND timeframe=? AND start<=? AND "end">=?',
+            (symbol, timeframe, end + tf_ms, start - tf_ms)).fetchall()
+        for a, b in overlapping:
+            start, end = min(start, a), max(end, b)
+        conn.execute('DELETE FROM coverage WHERE symbol=? AND timeframe=? AND start<=? AND "end">=?',
+                     (symbol, timeframe, end + tf_ms, start - tf_ms))
+        conn.execute('INSERT INTO coverage VALUES (?, ?, ?, ?)', (symbol, timeframe, start, end))
+
+    # --- DESCARGA ---
+    def backfill(self, symbol: str, timeframe: str, start: int, end: int) -> int:
+        """Rellena desde el exchange los huecos de [start, end] (velas cerradas). Devuelve velas nuevas."""
+        key = (symbol, timeframe)
+        tf_ms = timeframe_to_ms(timeframe)
+        added = 0
+        with self._key_lock(key):   # dos vistas del mismo rango -> una descarga
+            for a, b in self.missing_ranges(symbol, timeframe, start, end):
+                self.stats['backfills'] += 1
+                since = a
+                while since <= b:
+                    rows = self.exchange.fetch_ohlcv(symbol, timeframe, since, self.page_size)
+                    self.stats['pages'] += 1
+                    batch = Candles.from_rows(rows).between(since, b)
+                    if len(batch):
+                        self._insert(symbol, timeframe, batch)
+                        self.cache.publish(symbol, timeframe, batch)
+                        added += len(batch)
+                    if not rows or int(rows[-1][0]) < since: break
+                    since = max(int(rows[-1][0]) + tf_ms, since + tf_ms)
+                conn = self._conn()
+                with conn:
+                    self._add_coverage(conn, symbol, timeframe, a, b)
+        self.stats['rows_fetched'] += added
+        return added
+
+    def _insert(self, symbol: str, timeframe: str, candles: Candles):
+        conn = self._conn()
+        params = zip([symbol] * len(candles), [timeframe] * len(candles), candles.timestamp.tolist(),
+                     candles.open.tolist(), candles.high.tolist(), candles.low.tolist(),
+                     candles.close.tolist(), candles.volume.tolist())
+        with conn:
+            conn.executemany('INSERT OR REPLACE INTO candles VALUES (?, ?, ?, ?, ?, ?, ?, ?)', params)
+
+    def _select(self, symbol: str, timeframe: str, start: int, end: int) -> Candles:
+        rows = self._conn().execute(
+            'SELECT ts, open, high, low, close, volume FROM candles '
+            'WHERE symbol=? AND timeframe=? AND ts BETWEEN ? AND ? ORDER BY ts',
+            (symbol, timeframe, start, end)).fetchall()
+        return Candles.from_rows(rows)
+
+    # --- CONSULTA ---
+    def range(self, symbol: str, timeframe: str, since: Optional[int] = None, until: Optional[int] = None,
+              limit: int = 100, cursor: Optional[str] = None) -> Tuple[Candles, Optional[str]]:
+        self.stats['requests'] += 1
+        tf_ms = timeframe_to_ms(timeframe)
+        limit = max(1, min(int(limit), MAX_LIMIT))
+        now_ms = int(time.time() * 1000)
+        live_ts = now_ms // tf_ms * tf_ms          # vela en curso (no se persiste)
+        closed_end = live_ts - tf_ms
+
+        if cursor is not None:
+            direction, ts = decode_cursor(cursor)
+            if direction == 'asc': since = ts
+            else: until, since = ts, None
+        else:
+            direction = 'asc' if since is not None else 'desc'
+        until = live_ts if until is None else min(int(until) // tf_ms * tf_ms, live_ts)
+
+        if direction == 'asc':
+            start = -(-int(since) // tf_ms) * tf_ms          # primera vela >= since
+            end = min(start + (limit - 1) * tf_ms, until)
+        else:
+            end = until
+            start = end - (limit - 1) * tf_ms
+        if end < start: return Candles.empty(), None
+
+        # 1. Velas cerradas: disco, rellenando huecos por páginas
+        closed = Candles.empty()
+        if start <= closed_end:
+            stored_end = min(end, closed_end)
+            if self.missing_ranges(symbol, timeframe, start, stored_end):
+                self.backfill(symbol, timeframe, start, stored_end)
+            else:
+                self.stats['disk_hits'] += 1
+            closed = self._select(symbol, timeframe, start, stored_end)
+
+        # 2. Vela en curso: de la caché en memoria (stream o REST)
+        live = Candles.empty()
+        if end >= live_ts:
+            try:
+                live = self.cache.get(symbol, timeframe, 2).between(max(start, closed_end + 1), end)
+            except Exception as e:
+                logger.warning(f"Sin vela en curso para {symbol} {timeframe}: {e}")
+        candles = Candles.concat([closed, live])
+
+        # 3. Cursor a la página siguiente
+        next_cursor = None
+        if direction == 'desc':
+            if len(candles): next_cursor = encode_cursor('desc', int(candles.timestamp[0]) - tf_ms)
+        elif end < until:
+            next_cursor = encode_cursor('asc', end + tf_ms)
+        return candles, next_cursor
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+# Instancia compartida (API)
+candle_store = CandleStore()
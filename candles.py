@@ -0,0 +1,197 @@
+"""
+Nexus Candles - Contenedor columnar de velas OHLCV.
+Una columna NumPy contigua por campo (timestamp int64, OHLCV float64): 48 bytes por
+vela frente a ~200 de una lista de floats de Python, y los indicadores leen `close`
+sin reconstruir arrays. Mantiene el acceso por filas de ccxt (`ohlcv[-1][4]`) para
+el código que aún trabaja con filas.
+"""
+
+import json
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+COLUMNS = ('timestamp', 'open', 'high', 'low', 'close', 'volume')
+PRICE_COLUMNS = COLUMNS[1:]
+
+
+class Candles:
+    """Velas en columnas. Índice entero -> fila (tupla ccxt); slice -> Candles; str -> columna."""
+    __slots__ = COLUMNS
+
+    def __init__(self, timestamp, open, high, low, close, volume):
+        self.timestamp = np.asarray(timestamp, dtype=np.int64)
+        self.open = np.asarray(open, dtype=np.float64)
+        self.high = np.asarray(high, dtype=np.float64)
+        self.low = np.asarray(low, dtype=np.float64)
+        self.close = np.asarray(close, dtype=np.float64)
+        self.volume = np.asarray(volume, dtype=np.float64)
+
+    # --- CONSTRUCCIÓN ---
+    @classmethod
+    def empty(cls) -> 'Candles':
+        return cls(*(np.empty(0, dtype=np.int64 if c == 'timestamp' else np.float64) for c in COLUMNS))
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[Sequence[float]]) -> 'Candles':
+        """Filas ccxt [[ts, o, h, l, c, v], ...] -> columnas (una sola conversión)."""
+        if isinstance(rows, Candles): return rows
+        if len(rows) == 0: return cls.empty()
+        arr = np.asarray(rows, dtype=np.float64)
+        if arr.ndim != 2 or arr.shape[1] < 6: raise ValueError("Se esperaban filas [ts, o, h, l, c, v]")
+        # El timestamp pasa por float64: exacto hasta 2^53 ms
+        return cls(arr[:, 0].astype(np.int64), arr[:, 1], arr[:, 2], arr[:, 3], arr[:, 4], arr[:, 5])
+
+    @classmethod
+    def from_columns(cls, columns: Dict[str, Iterable]) -> 'Candles':
+        return cls(*(columns[c] for c in COLUMNS))
+
+    @classmethod
+    def concat(cls, parts: Sequence['Candles']) -> 'Candles':
+        parts = [p for p in parts if len(p)]
+        if not parts: return cls.empty()
+        if len(parts) == 1: return parts[0]
+        return cls(*(np.concatenate([getattr(p, c) for p in parts]) for c in COLUMNS))
+
+    # --- ACCESO ---
+    def __len__(self) -> int:
+        return len(self.timestamp)
+
+    def __bool__(self) -> bool:
+        return len(self.timestamp) > 0
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return getattr(self, key)
+        if isinstance(key, slice) or isinstance(key, np.ndarray):
+            return Candles(*(getattr(self, c)[key] for c in COLUMNS))
+        return self.row(key)
+
+    def row(self, i: int) -> Tuple[int, float, float, float, float, float]:
+        return (int(self.timestamp[i]), float(self.open[i]), float(self.high[i]),
+                float(self.low[i]), float(self.close[i]), float(self.volume[i]))
+
+    def __iter__(self) -> Iterator[Tuple]:
+        return iter(self.to_rows())
+
+    def __repr__(self) -> str:
+        span = f"{self.timestamp[0]}..{self.timestamp[-1]}" if len(self) else "vacío"
+        return f"Candles({len(self)} velas, {span})"
+
+    def keys(self):
+        return COLUMNS
+
+    def tail(self, n: int) -> 'Candles':
+        return self[-n:] if n < len(self) else self
+
+    def copy(self) -> 'Candles':
+        return Candles(*(getattr(self, c).copy() for c in COLUMNS))
+
+    def between(self, since: Optional[int] = None, until: Optional[int] = None) -> 'Candles':
+        """Velas con since <= ts <= until (búsqueda binaria, columnas ordenadas)."""
+        lo = 0 if since is None else int(np.searchsorted(self.timestamp, since, 'left'))
+        hi = len(self) if until is None else int(np.searchsorted(self.timestamp, until, 'right'))
+        return self[lo:hi]
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, c).nbytes for c in COLUMNS)
+
+    # --- SERIALIZACIÓN ---
+    def to_rows(self) -> List[list]:
+        """Filas ccxt (listas de Python)."""
+        return [list(r) for r in zip(self.timestamp.tolist(), self.open.tolist(), self.high.tolist(),
+                                     self.low.tolist(), self.close.tolist(), self.volume.tolist())]
+
+    def to_chart(self) -> List[dict]:
+        """Formato de lightweight-charts (una dict por vela, tiempo en segundos)."""
+        return [{"time": t, "open": o, "high": h, "low": l, "close": c}
+                for t, o, h, l, c in zip((self.timestamp // 1000).tolist(), self.open.tolist(),
+                                         self.high.tolist(), self.low.tolist(), self.close.tolist())]
+
+    def to_columns(self, time_unit: str = 'ms') -> Dict[str, list]:
+        """{"time": [...], "open": [...], ...}: una lista por columna."""
+        ts = self.timestamp // 1000 if time_unit == 's' else self.timestamp
+        out = {'time': ts.tolist()}
+        for c in PRICE_COLUMNS: out[c] = getattr(self, c).tolist()
+        return out
+
+    def to_json_columns(self, time_unit: str = 'ms') -> str:
+        return json.dumps(self.to_columns(time_unit), separators=(',', ':'))
+
+    def to_bytes(self) -> bytes:
+        """
+        Binario sin dependencias: columnas little-endian una tras otra en el orden de
+        COLUMNS (timestamp int64 y OHLCV float64), n * 48 bytes. En JS se lee con
+        BigInt64Array / Float64Array sobre el mismo ArrayBuffer.
+        """
+        return b''.join(getattr(self, c).astype(getattr(self, c).dtype.newbyteorder('<'), copy=False).tobytes()
+                        for c in COLUMNS)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'Candles':
+        n = len(data) // (8 * len(COLUMNS))
+        cols = [np.frombuffer(data, dtype='<i8' if c == 'timestamp' else '<f8', count=n, offset=8 * n * i)
+                for i, c in enumerate(COLUMNS)]
+        return cls(*cols)
+
+
+class CandleBuffer:
+    """
+    Buffer circular columnar de capacidad fija para la caché. Añadir o re-escribir la
+    vela en curso es O(1) in-place; se compacta cada `capacity` velas nuevas.
+    Las lecturas devuelven copias (el buffer sigue mutando por el stream).
+    """
+    __slots__ = ('capacity', '_cols', '_start', '_end')
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._cols = [np.empty(2 * capacity, dtype=np.int64 if c == 'timestamp' else np.float64) for c in COLUMNS]
+        self._start = 0
+        self._end = 0
+
+    def __len__(self) -> int:
+        return self._end - self._start
+
+    @property
+    def last_ts(self) -> Optional[int]:
+        return int(self._cols[0][self._end - 1]) if self._end > self._start else None
+
+    def clear(self):
+        self._start = self._end = 0
+
+    def _compact(self):
+        keep = len(self)
+        for col in self._cols: col[:keep] = col[self._end - keep:self._end]
+        self._start, self._end = 0, keep
+
+    def append(self, row: Sequence[float]):
+        if self._end == 2 * self.capacity: self._compact()
+        for col, v in zip(self._cols, row): col[self._end] = v
+        self._end += 1
+        if self._end - self._start > self.capacity: self._start += 1
+
+    def replace_last(self, row: Sequence[float]):
+        for col, v in zip(self._cols, row): col[self._end - 1] = v
+
+    def truncate_from(self, ts: int):
+        """Descarta las velas con timestamp >= ts (van a re-escribirse)."""
+        ts_col = self._cols[0][self._start:self._end]
+        self._end = self._start + int(np.searchsorted(ts_col, ts, 'left'))
+
+    def extend(self, candles: Candles):
+        n = len(candles)
+        if n == 0: return
+        if n >= self.capacity:
+            candles = candles[-self.capacity:]
+            n = self.capacity
+            self._start = self._end = 0
+        elif self._end + n > 2 * self.capacity:
+            self._compact()
+        for col, name in zip(self._cols, COLUMNS): col[self._end:self._end + n] = getattr(candles, name)
+        self._end += n
+        if self._end - self._start > self.capacity: self._start = self._end - self.capacity
+
+    def tail(self, limit: int) -> Candles:
+        start = max(self._start, self._end - limit)
+        return Candles(*(col[start:self._end].copy() for col in self._cols))
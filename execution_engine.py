@@ -1,26 +1,621 @@
-import ccxt
+"""
+Nexus Execution Engine - Envío de órdenes reales por usuario.
+  - pool acotado de clientes ccxt autenticados (uno por usuario, LRU + expulsión por
+    inactividad) construidos con obtener_credenciales_usuario; los mercados se cargan
+    una vez y se comparten entre clientes
+  - precio de la última lectura en memoria (señal, ticker_store o candle_cache), sin fetch_ticker
+  - envío concurrente para muchos usuarios con límite de órdenes por cuenta (ventana deslizante)
+  - latencia por etapa: credenciales, precio, espera por límite, exchange y total
+  - brackets: entrada + stop loss + take profit en UNA llamada batch (create_orders) y
+    grupo de órdenes en memoria (BracketBook); si una protección falla se reintenta y,
+    en último caso, se cierra la posición para no dejarla sin stop
+Probable contra benchmarks.fakes.FakeTradingExchange (factory=...).
+"""
+
 import os
 import json
+import time
+import uuid
+import logging
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from nexus_core.lazy import lazy_import
+
+ccxt = lazy_import('ccxt')   # se carga al crear el primer cliente real
+
+logger = logging.getLogger('NexusExecution')
+
+# Cuenta por defecto de ejecutar_orden_ia (claves del entorno, p.ej. testnet)
+DEFAULT_ACCOUNT = "__default__"
+BINANCE_API_KEY = os.getenv("BINANCE_API_KEY")
+BINANCE_SECRET_KEY = os.getenv("BINANCE_SECRET_KEY")
+SANDBOX_MODE = os.getenv("NEXUS_EXCHANGE_SANDBOX", "0").lower() in ("1", "true", "yes")
+
+# Pool de clientes y límites (Binance futuros: 300 órdenes / 10 s por cuenta)
+CLIENT_POOL_SIZE = int(os.getenv("NEXUS_CLIENT_POOL_SIZE", 256))
+CLIENT_IDLE_TTL = float(os.getenv("NEXUS_CLIENT_IDLE_TTL", 600))
+ORDER_RATE = int(os.getenv("NEXUS_ORDER_RATE", 300))
+ORDER_RATE_PERIOD = float(os.getenv("NEXUS_ORDER_RATE_PERIOD", 10))
+ORDER_MAX_WAIT = float(os.getenv("NEXUS_ORDER_MAX_WAIT", 2.0))   # espera máxima por límite antes de rechazar
+EXECUTION_WORKERS = int(os.getenv("NEXUS_EXECUTION_WORKERS", 32))
+# Brackets abiertos: pasada esta edad (s) o este número por usuario se cancelan sus patas y se cierran
+BRACKET_MAX_AGE = float(os.getenv("NEXUS_BRACKET_MAX_AGE", 7 * 24 * 3600))
+BRACKET_MAX_OPEN = int(os.getenv("NEXUS_BRACKET_MAX_OPEN", 20))
+
+STAGES = ('credentials', 'price', 'throttle', 'exchange', 'total')
+
+
+def binance_futures_client(creds: Dict[str, str]):
+    """Cliente autenticado de Binance Futuros (el límite por cuenta lo lleva ClientPool)."""
+    client = ccxt.binance({
+        'apiKey': creds['apiKey'],
+        'secret': creds['secret'],
+        'enableRateLimit': False,
+        'options': {'defaultType': 'future'},
+    })
+    if SANDBOX_MODE: client.set_sandbox_mode(True)
+    return client
+
+
+def user_credentials(email: str) -> Optional[Dict[str, str]]:
+    """Claves de Mongo (con caché en database_manager); DEFAULT_ACCOUNT -> entorno."""
+    if email == DEFAULT_ACCOUNT:
+        if not (BINANCE_API_KEY and BINANCE_SECRET_KEY): return None
+        return {'apiKey': BINANCE_API_KEY, 'secret': BINANCE_SECRET_KEY}
+    from database_manager import db_manager
+    return db_manager.obtener_credenciales_usuario(email)
+
 
-# --- CONFIGURACIÓN ---
-# ¡IMPORTANTE! Usa claves de TESTNET primero para no perder dinero real probando
-API_KEY = 'TU_BINANCE_API_KEY'
-SECRET_KEY = 'TU_BINANCE_SECRET_KEY'
+def cached_price(symbol: str, timeframe: str = '1m') -> float:
+    """Último precio conocido: ticker del stream y, si no hay, cierre de la vela en caché."""
+    from market_stream import ticker_store
+    from market_cache import candle_cache
+    ticker = ticker_store.get(symbol)
+    if ticker is not None and ticker.get('last'): return float(ticker['last'])
+    return float(candle_cache.get(symbol, timeframe, 1).close[-1])
 
-# Inicializamos la conexión (Usamos Binance Futures para poder hacer Short y Long)
-exchange = ccxt.binance({
-    'apiKey': API_KEY,
-    'secret': SECRET_KEY,
-    'enableRateLimit': True,
-    'options': {'defaultType': 'future'} # Operar futuros
-})
 
-# Si usas Testnet (dinero ficticio), descomenta esta línea:
-# exchange.set_sandbox_mode(True) 
+# ==========================================
+# 🔑 1. POOL DE CLIENTES POR USUARIO
+# ==========================================
 
-def ejecutar_orden_ia(decision_json, symbol="BTC/USDT", cantidad_usdt=50):
+class OrderWindow:
+    """Ventana deslizante de órdenes por cuenta: como cuenta el exchange (`rate` cada `period` s)."""
+    __slots__ = ('rate', 'period', 'sent')
+
+    def __init__(self, rate: int, period: float):
+        self.rate, self.period = rate, period
+        self.sent: Deque[float] = deque()
+
+    def acquire(self, orders: int = 1) -> float:
+        """0 si las `orders` órdenes caben (y las anota); si no, segundos hasta que quepan."""
+        if orders > self.rate: return float('inf')
+        now = time.monotonic()
+        while self.sent and now - self.sent[0] >= self.period: self.sent.popleft()
+        if len(self.sent) + orders <= self.rate:
+            self.sent.extend([now] * orders)
+            return 0.0
+        return self.sent[len(self.sent) + orders - self.rate - 1] + self.period - now
+
+
+class Account:
+    """Cliente ccxt de un usuario + su contabilidad de órdenes."""
+    __slots__ = ('email', 'client', 'creds', 'window', 'lock', 'in_use', 'last_used')
+
+    def __init__(self, email: str, client, creds: Dict[str, str], rate: int, period: float):
+        self.email = email
+        self.client = client
+        self.creds = (creds['apiKey'], creds['secret'])
+        self.window = OrderWindow(rate, period)
+        self.lock = threading.Lock()      # creación del cliente y ventana de órdenes
+        self.in_use = 0
+        self.last_used = time.monotonic()
+
+    def throttle(self, max_wait: float, orders: int = 1) -> float:
+        """Reserva hueco para `orders` órdenes esperando hasta `max_wait`. Devuelve la espera o -1 si no llega."""
+        start = time.monotonic()
+        while True:
+            with self.lock:
+                wait = self.window.acquire(orders)
+            if wait == 0.0: return time.monotonic() - start
+            if time.monotonic() - start + wait > max_wait: return -1.0
+            time.sleep(wait)
+
+
+class ClientPool:
+    """
+    Máximo `max_clients` clientes vivos (LRU). Los que llevan `idle_ttl` segundos sin
+    usarse se cierran; si el pool está lleno y todos están en uso, acquire() espera.
     """
-    Recibe el JSON de la IA (Gemini) y ejecuta la orden en Binance.
+
+    def __init__(self, factory: Callable[[Dict[str, str]], Any] = binance_futures_client,
+                 credentials: Callable[[str], Optional[Dict[str, str]]] = user_credentials,
+                 max_clients: int = CLIENT_POOL_SIZE, idle_ttl: float = CLIENT_IDLE_TTL,
+                 rate: int = ORDER_RATE, period: float = ORDER_RATE_PERIOD):
+        self.factory = factory
+        self.credentials = credentials
+        self.max_clients = max_clients
+        self.idle_ttl = idle_ttl
+        self.rate, self.period = rate, period
+        self._accounts: "OrderedDict[str, Account]" = OrderedDict()
+        self._cond = threading.Condition()
+        self._markets = None              # (markets, currencies) compartidos entre clientes
+        self._markets_lock = threading.Lock()
+        self._last_sweep = time.monotonic()
+        self.stats = {'created': 0, 'reused': 0, 'evicted': 0, 'rotated': 0}
+
+    def __len__(self) -> int:
+        return len(self._accounts)
+
+    def acquire(self, email: str) -> Account:
+        """Cliente del usuario (reutilizado si existe). Lanza PermissionError sin claves."""
+        creds = self.credentials(email)
+        if not creds: raise PermissionError(f"{email} no tiene API Keys configuradas")
+        key = (creds['apiKey'], creds['secret'])
+        with self._cond:
+            self._maybe_sweep()
+            account = self._accounts.get(email)
+            if account is not None and account.creds != key and account.in_use == 0:
+                self._close(self._accounts.pop(email))       # claves cambiadas
+                self.stats['rotated'] += 1
+                account = None
+            if account is not None:
+                self._accounts.move_to_end(email)
+                self.stats['reused'] += 1
+            else:
+                while len(self._accounts) >= self.max_clients and not self._evict_lru():
+                    self._cond.wait()
+                account = self._accounts[email] = Account(email, None, creds, self.rate, self.period)
+                self.stats['created'] += 1
+            account.in_use += 1
+        if account.client is None:
+            with account.lock:   # dos órdenes simultáneas del mismo usuario -> un solo cliente
+                try:
+                    if account.client is None: account.client = self._build(creds)
+                except BaseException:
+                    self.release(account)
+                    with self._cond:
+                        if self._accounts.get(email) is account and account.in_use == 0: del self._accounts[email]
+                    raise
+        return account
+
+    def release(self, account: Account):
+        with self._cond:
+            account.in_use -= 1
+            account.last_used = time.monotonic()
+            self._cond.notify()
+
+    def _build(self, creds: Dict[str, str]):
+        client = self.factory(creds)
+        with self._markets_lock:
+            if self._markets is None:
+                client.load_markets()   # una vez por proceso, no por usuario
+                self._markets = (client.markets, getattr(client, 'currencies', None))
+            else:
+                client.set_markets(*self._markets)
+        return client
+
+    # --- EXPULSIÓN (con self._cond tomado) ---
+    def _evict_lru(self) -> bool:
+        for email, account in self._accounts.items():
+            if account.in_use == 0:
+                self._close(self._accounts.pop(email))
+                self.stats['evicted'] += 1
+                return True
+        return False
+
+    def _maybe_sweep(self):
+        now = time.monotonic()
+        if now - self._last_sweep < self.idle_ttl / 4: return
+        self._last_sweep = now
+        for email in [e for e, a in self._accounts.items() if a.in_use == 0 and now - a.last_used > self.idle_ttl]:
+            self._close(self._accounts.pop(email))
+            self.stats['evicted'] += 1
+
+    def evict_idle(self):
+        with self._cond:
+            self._last_sweep = 0.0
+            self._maybe_sweep()
+
+    @staticmethod
+    def _close(account: Account):
+        session = getattr(account.client, 'session', None)
+        if session is not None and hasattr(session, 'close'): session.close()
+
+    def close(self):
+        with self._cond:
+            for account in self._accounts.values(): self._close(account)
+            self._accounts.clear()
+
+
+# ==========================================
+# 🛡️ 2. BRACKETS (ENTRADA + SL + TP)
+# ==========================================
+
+@dataclass
+class OrderRequest:
+    email: str
+    symbol: str
+    side: str                            # 'buy' | 'sell'
+    amount: Optional[float] = None       # en la moneda base
+    quote_amount: Optional[float] = None # en USDT (se convierte con el precio en caché)
+    price: Optional[float] = None        # precio ya conocido (p.ej. el de la señal)
+    stop_loss: Optional[float] = None    # con stop_loss y take_profit -> bracket
+    take_profit: Optional[float] = None
+    client_order_id: str = field(default_factory=lambda: f"nx{uuid.uuid4().hex[:20]}")
+
+    @property
+    def is_bracket(self) -> bool:
+        return self.stop_loss is not None and self.take_profit is not None
+
+
+def bracket_legs(req: OrderRequest, amount: float) -> List[Dict[str, Any]]:
+    """
+    Órdenes del bracket en formato create_orders de ccxt. SL/TP son condicionales
+    closePosition: se aceptan aunque la entrada aún no se haya casado (el batch de
+    Binance no garantiza el orden) y cierran la posición entera al dispararse.
+    """
+    exit_side = 'sell' if req.side == 'buy' else 'buy'
+    cid = req.client_order_id
+    return [
+        {'symbol': req.symbol, 'type': 'market', 'side': req.side, 'amount': amount, 'price': None,
+         'params': {'clientOrderId': cid}},
+        {'symbol': req.symbol, 'type': 'STOP_MARKET', 'side': exit_side, 'amount': amount, 'price': None,
+         'params': {'clientOrderId': f"{cid}-sl", 'stopPrice': req.stop_loss, 'closePosition': True,
+                    'workingType': 'MARK_PRICE'}},
+        {'symbol': req.symbol, 'type': 'TAKE_PROFIT_MARKET', 'side': exit_side, 'amount': amount, 'price': None,
+         'params': {'clientOrderId': f"{cid}-tp", 'stopPrice': req.take_profit, 'closePosition': True,
+                    'workingType': 'MARK_PRICE'}},
+    ]
+
+
+LEGS = ('entry', 'stop_loss', 'take_profit')
+
+
+@dataclass
+class BracketGroup:
+    group_id: str
+    email: str
+    symbol: str
+    side: str
+    amount: float
+    stop_loss: float
+    take_profit: float
+    orders: Dict[str, Optional[dict]] = field(default_factory=dict)   # pata -> orden ccxt (None si falló)
+    status: str = 'pending'     # open | failed | flattened | closed | expired
+    exit: Optional[str] = None  # pata que cerró la posición
+    created_at: float = field(default_factory=time.time)
+
+    def order_id(self, leg: str) -> Optional[str]:
+        order = self.orders.get(leg)
+        return order.get('id') if order else None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'group_id': self.group_id, 'email': self.email, 'symbol': self.symbol, 'side': self.side,
+                'amount': self.amount, 'stop_loss': self.stop_loss, 'take_profit': self.take_profit,
+                'status': self.status, 'exit': self.exit, 'created_at': self.created_at,
+                'orders': {leg: self.order_id(leg) for leg in LEGS}}
+
+
+class BracketBook:
+    """
+    Grupos de órdenes en memoria por id y por usuario (los cerrados se olvidan pasado `max_closed`).
+    Los abiertos que superan `max_age` o `max_open` por usuario los expira ExecutionService.reconcile.
+    """
+
+    def __init__(self, max_closed: int = 10_000, max_age: float = BRACKET_MAX_AGE, max_open: int = BRACKET_MAX_OPEN):
+        self._groups: Dict[str, BracketGroup] = {}
+        self._by_user: Dict[str, List[str]] = {}
+        self._closed: Deque[str] = deque()
+        self.max_closed = max_closed
+        self.max_age = max_age
+        self.max_open = max_open
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._groups)
+
+    def add(self, group: BracketGroup):
+        with self._lock:
+            self._groups[group.group_id] = group
+            self._by_user.setdefault(group.email, []).append(group.group_id)
+            if group.status != 'open': self._retire(group)
+
+    def get(self, group_id: str) -> Optional[BracketGroup]:
+        return self._groups.get(group_id)
+
+    def by_user(self, email: str, status: Optional[str] = None) -> List[BracketGroup]:
+        with self._lock:
+            groups = [self._groups[g] for g in self._by_user.get(email, ()) if g in self._groups]
+        return [g for g in groups if status is None or g.status == status]
+
+    def overdue(self, groups: List[BracketGroup], now: Optional[float] = None) -> List[BracketGroup]:
+        """De los grupos abiertos de un usuario: los demasiado viejos y los que sobran del cupo (los más antiguos)."""
+        now = time.time() if now is None else now
+        groups = sorted(groups, key=lambda g: g.created_at)
+        excess = max(0, len(groups) - self.max_open)
+        return [g for i, g in enumerate(groups) if i < excess or now - g.created_at > self.max_age]
+
+    def stale_users(self, now: Optional[float] = None) -> List[str]:
+        """Usuarios con grupos abiertos caducados (p.ej. que ya no pasan por el bot)."""
+        now = time.time() if now is None else now
+        with self._lock:
+            return sorted({g.email for g in self._groups.values()
+                           if g.status == 'open' and now - g.created_at > self.max_age})
+
+    def close(self, group: BracketGroup, status: str, exit: Optional[str] = None):
+        with self._lock:
+            group.status, group.exit = status, exit
+            self._retire(group)
+
+    def _retire(self, group: BracketGroup):
+        self._closed.append(group.group_id)
+        while len(self._closed) > self.max_closed:
+            old = self._groups.pop(self._closed.popleft(), None)
+            if old is not None:
+                ids = self._by_user.get(old.email, [])
+                if old.group_id in ids: ids.remove(old.group_id)
+                if not ids: self._by_user.pop(old.email, None)
+
+
+def _placed(order) -> bool:
+    return isinstance(order, dict) and order.get('id') is not None
+
+
+# ==========================================
+# 🚀 3. SERVICIO DE EJECUCIÓN
+# ==========================================
+
+@dataclass
+class ExecutionResult:
+    request: OrderRequest
+    ok: bool
+    order: Optional[dict] = None
+    error: Optional[str] = None
+    timings: Dict[str, float] = field(default_factory=dict)   # segundos por etapa
+    group: Optional[BracketGroup] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        out = {'email': self.request.email, 'symbol': self.request.symbol, 'side': self.request.side,
+               'ok': self.ok, 'order_id': (self.order or {}).get('id'), 'error': self.error,
+               'timings_ms': {k: round(v * 1000, 3) for k, v in self.timings.items()}}
+        if self.group is not None: out['group'] = self.group.to_dict()
+        return out
+
+
+class ExecutionService:
+    """submit(request) -> ExecutionResult; submit_many(requests) en paralelo entre cuentas."""
+
+    def __init__(self, pool: Optional[ClientPool] = None, price: Callable[[str], float] = cached_price,
+                 workers: int = EXECUTION_WORKERS, max_wait: float = ORDER_MAX_WAIT, history: int = 10_000,
+                 brackets: Optional[BracketBook] = None):
+        self.pool = pool if pool is not None else ClientPool()
+        self.brackets = brackets if brackets is not None else BracketBook()
+        self.price = price
+        self.workers = workers
+        self.max_wait = max_wait
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        self.latency: Dict[str, Deque[float]] = {s: deque(maxlen=history) for s in STAGES}
+        self.stats = {'submitted': 0, 'filled': 0, 'rejected': 0, 'throttled': 0, 'errors': 0,
+                      'brackets': 0, 'batch_calls': 0, 'leg_retries': 0, 'flattened': 0, 'expired': 0}
+
+    def _pool_executor(self) -> ThreadPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix='nexus-exec')
+            return self._executor
+
+    def submit(self, req: OrderRequest) -> ExecutionResult:
+        """Orden de mercado, o bracket completo si la petición trae stop_loss y take_profit."""
+        timings: Dict[str, float] = {}
+        t0 = time.perf_counter()
+        self.stats['submitted'] += 1
+        try:
+            account = self.pool.acquire(req.email)
+        except Exception as e:
+            self.stats['rejected'] += 1
+            return ExecutionResult(req, False, error=str(e), timings={'total': time.perf_counter() - t0})
+        timings['credentials'] = time.perf_counter() - t0
+        try:
+            t = time.perf_counter()
+            amount = req.amount
+            if amount is None:
+                price = req.price or self.price(req.symbol)
+                amount = req.quote_amount / price
+            timings['price'] = time.perf_counter() - t
+
+            legs = bracket_legs(req, amount) if req.is_bracket else None
+            waited = account.throttle(self.max_wait, len(legs) if legs else 1)
+            timings['throttle'] = max(waited, 0.0)
+            if waited < 0:
+                self.stats['throttled'] += 1
+                return self._finish(req, False, None, "Límite de órdenes de la cuenta alcanzado", timings, t0)
+
+            t = time.perf_counter()
+            if legs:
+                group = self._place_bracket(account, req, amount, legs)
+                timings['exchange'] = time.perf_counter() - t
+                entry = group.orders.get('entry')
+                if group.status == 'failed':
+                    return self._finish(req, False, entry, "Entrada rechazada por el exchange", timings, t0, group)
+                self.stats['filled'] += 1
+                error = "Sin protección: posición cerrada" if group.status == 'flattened' else None
+                return self._finish(req, group.status == 'open', entry, error, timings, t0, group)
+
+            order = account.client.create_order(req.symbol, 'market', req.side, amount, None,
+                                                 {'clientOrderId': req.client_order_id})
+            timings['exchange'] = time.perf_counter() - t
+            self.stats['filled'] += 1
+            return self._finish(req, True, order, None, timings, t0)
+        except Exception as e:
+            self.stats['errors'] += 1
+            logger.error(f"❌ Orden {req.side} {req.symbol} de {req.email}: {e}")
+            return self._finish(req, False, None, str(e), timings, t0)
+        finally:
+            self.pool.release(account)
+
+    def _finish(self, req, ok, order, error, timings, t0, group=None) -> ExecutionResult:
+        timings['total'] = time.perf_counter() - t0
+        for stage, value in timings.items(): self.latency[stage].append(value)
+        return ExecutionResult(req, ok, order, error, timings, group)
+
+    # --- BRACKETS ---
+    def _batch(self, client, legs: List[Dict[str, Any]]) -> List[Optional[dict]]:
+        """Un round-trip con create_orders si el exchange lo soporta; si no, órdenes sueltas."""
+        if (getattr(client, 'has', None) or {}).get('createOrders'):
+            self.stats['batch_calls'] += 1
+            return list(client.create_orders(legs))
+        out = []
+        for leg in legs:
+            try:
+                out.append(client.create_order(leg['symbol'], leg['type'], leg['side'], leg['amount'],
+                                               leg['price'], leg['params']))
+            except Exception as e:
+                logger.warning(f"Pata {leg['type']} rechazada: {e}")
+                out.append(None)
+        return out
+
+    def _place_bracket(self, account: Account, req: OrderRequest, amount: float,
+                       legs: List[Dict[str, Any]]) -> BracketGroup:
+        client = account.client
+        group = BracketGroup(req.client_order_id, req.email, req.symbol, req.side, amount,
+                             req.stop_loss, req.take_profit)
+        try:
+            results = self._batch(client, legs)
+        except Exception as e:
+            logger.error(f"❌ Bracket {req.symbol} de {req.email}: {e}")
+            results = [None] * len(legs)
+        group.orders = {leg: (o if _placed(o) else None) for leg, o in zip(LEGS, results)}
+        self.stats['brackets'] += 1
+
+        if group.orders['entry'] is None:
+            # Sin entrada: las protecciones sobran
+            self._cancel(client, group, ('stop_loss', 'take_profit'))
+            group.status = 'failed'
+        else:
+            # Entrada casada: una pata de protección fallida se reintenta una vez sola
+            for i, leg in enumerate(LEGS[1:], 1):
+                if group.orders[leg] is not None: continue
+                self.stats['leg_retries'] += 1
+                if account.throttle(self.max_wait) < 0: continue
+                group.orders[leg] = self._place_one(client, legs[i])
+            if all(group.orders[leg] is not None for leg in LEGS[1:]):
+                group.status = 'open'
+            else:
+                # Nunca dejamos una posición sin stop: se cierra a mercado
+                self._flatten(account, group)
+        self.brackets.add(group)
+        return group
+
+    def _place_one(self, client, leg: Dict[str, Any]) -> Optional[dict]:
+        try:
+            order = client.create_order(leg['symbol'], leg['type'], leg['side'], leg['amount'], leg['price'],
+                                        leg['params'])
+            return order if _placed(order) else None
+        except Exception as e:
+            logger.warning(f"Reintento de {leg['type']} fallido: {e}")
+            return None
+
+    def _cancel(self, client, group: BracketGroup, legs) -> None:
+        for leg in legs:
+            order_id = group.order_id(leg)
+            if order_id is None: continue
+            try:
+                client.cancel_order(order_id, group.symbol)
+            except Exception as e:
+                logger.warning(f"No se pudo cancelar {leg} {order_id}: {e}")
+
+    def _flatten(self, account: Account, group: BracketGroup):
+        self.stats['flattened'] += 1
+        exit_side = 'sell' if group.side == 'buy' else 'buy'
+        self._cancel(account.client, group, ('stop_loss', 'take_profit'))
+        try:
+            account.throttle(self.max_wait)
+            group.orders['exit'] = account.client.create_order(group.symbol, 'market', exit_side, group.amount,
+                                                               None, {'reduceOnly': True})
+        except Exception as e:
+            logger.critical(f"🚨 Posición SIN PROTECCIÓN {group.symbol} de {group.email}: {e}")
+        group.status = 'flattened'
+
+    def reconcile(self, email: str, now: Optional[float] = None) -> List[BracketGroup]:
+        """
+        Revisa los brackets abiertos del usuario: si SL o TP se ha ejecutado, cancela la
+        otra pata (OCO) y cierra el grupo. Los caducados o fuera de cupo se cancelan y
+        quedan 'expired'. Devuelve los grupos cerrados en esta pasada.
+        """
+        groups = self.brackets.by_user(email, 'open')
+        if not groups: return []
+        closed = []
+        account = self.pool.acquire(email)
+        try:
+            overdue = {g.group_id for g in self.brackets.overdue(groups, now)}
+            for group in groups:
+                if group.group_id in overdue:
+                    self._cancel(account.client, group, ('stop_loss', 'take_profit'))
+                    self.brackets.close(group, 'expired')
+                    self.stats['expired'] += 1
+                    closed.append(group)
+                    continue
+                for leg, other in (('stop_loss', 'take_profit'), ('take_profit', 'stop_loss')):
+                    order_id = group.order_id(leg)
+                    try:
+                        status = account.client.fetch_order(order_id, group.symbol).get('status')
+                    except Exception as e:
+                        logger.warning(f"No se pudo consultar {leg} {order_id}: {e}")
+                        continue
+                    if status == 'closed':
+                        self._cancel(account.client, group, (other,))
+                        self.brackets.close(group, 'closed', leg)
+                        closed.append(group)
+                        break
+        finally:
+            self.pool.release(account)
+        return closed
+
+    def expire_stale(self, now: Optional[float] = None) -> int:
+        """Reconcilia a los usuarios con brackets caducados (una vez por ciclo, no por usuario)."""
+        closed = 0
+        for email in self.brackets.stale_users(now):
+            try:
+                closed += len(self.reconcile(email, now))
+            except Exception as e:
+                logger.warning(f"No se pudieron expirar los brackets de {email}: {e}")
+        return closed
+
+    def submit_many(self, requests: List[OrderRequest]) -> List[ExecutionResult]:
+        """Envía en paralelo (mismo orden que `requests`). El límite se contabiliza por cuenta."""
+        if len(requests) <= 1: return [self.submit(r) for r in requests]
+        return list(self._pool_executor().map(self.submit, requests))
+
+    def latency_report(self) -> Dict[str, Dict[str, float]]:
+        """p50/p99/máx en ms por etapa sobre las últimas órdenes."""
+        report = {}
+        for stage, values in self.latency.items():
+            if not values: continue
+            ordered = sorted(values)
+            pick = lambda p: ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+            report[stage] = {'count': len(ordered), 'p50_ms': round(pick(50) * 1000, 3),
+                             'p99_ms': round(pick(99) * 1000, 3), 'max_ms': round(ordered[-1] * 1000, 3)}
+        return report
+
+    def close(self):
+        if self._executor is not None: self._executor.shutdown(wait=True)
+        self._executor = None
+        self.pool.close()
+
+
+# Instancia compartida (bot y ejecutar_orden_ia); los clientes se crean en el primer uso
+execution_service = ExecutionService()
+
+
+def ejecutar_orden_ia(decision_json, symbol="BTC/USDT", cantidad_usdt=50, email=DEFAULT_ACCOUNT, precio=None):
+    """
+    Recibe el JSON de la IA (Gemini) y ejecuta la orden en Binance con el cliente de `email`.
     """
     try:
         data = json.loads(decision_json) # Convertimos el texto de Gemini a objeto
@@ -32,39 +627,28 @@ def ejecutar_orden_ia(decision_json, symbol="BTC/USDT", cantidad_usdt=50):
         if confianza < 80:
             return f"⚠️ Orden cancelada: Confianza IA insuficiente ({confianza}%)"
 
-        # Calculamos cantidad de cripto a comprar basada en USDT
-        ticker = exchange.fetch_ticker(symbol)
-        precio_actual = ticker['last']
-        amount = cantidad_usdt / precio_actual 
-
-        print(f"🤖 IA Dice: {accion} | Confianza: {confianza}% | Precio: {precio_actual}")
-
-        order = None
-        
-        if accion == "COMPRAR":
-            # Orden de Mercado (Market Order)
-            order = exchange.create_market_buy_order(symbol, amount)
-            
-            # --- PROTECCIÓN AUTOMÁTICA (Stop Loss / Take Profit) ---
-            # Configuración OCO (One Cancels the Other) básica
-            sl_price = precio_actual * 0.98 # Stop Loss 2% abajo
-            tp_price = precio_actual * 1.04 # Take Profit 4% arriba
-            
-            # Nota: En futuros, configurar SL/TP requiere órdenes condicionales separadas
-            print(f"✅ COMPRA Ejecutada. SL: {sl_price} | TP: {tp_price}")
-
-        elif accion == "VENDER":
-            order = exchange.create_market_sell_order(symbol, amount)
-            print("✅ VENTA (Short) Ejecutada.")
-        
-        else:
-            return "⏸️ La IA decidió ESPERAR. Mercado incierto."
+        if accion == "COMPRAR": side = 'buy'
+        elif accion == "VENDER": side = 'sell'
+        else: return "⏸️ La IA decidió ESPERAR. Mercado incierto."
 
-        return order
+        # Cantidad a partir de USDT con el precio en memoria (sin fetch_ticker)
+        precio = precio or execution_service.price(symbol)
+
+        # --- PROTECCIÓN AUTOMÁTICA (Stop Loss / Take Profit) en el mismo batch que la entrada ---
+        if side == 'buy':
+            sl_price, tp_price = precio * 0.98, precio * 1.04   # SL 2% abajo, TP 4% arriba
+        else:
+            sl_price, tp_price = precio * 1.02, precio * 0.96
+        result = execution_service.submit(OrderRequest(email, symbol, side, quote_amount=cantidad_usdt, price=precio,
+                                                       stop_loss=sl_price, take_profit=tp_price))
+        if not result.ok: return f"❌ Error en ejecución: {result.error}"
+        logger.info(f"🤖 IA Dice: {accion} | Confianza: {confianza}% | SL: {sl_price} | TP: {tp_price} "
+                    f"| Latencia: {result.to_dict()['timings_ms']}")
+        return result.group.to_dict()
 
     except Exception as e:
         return f"❌ Error en ejecución: {str(e)}"
 
 # Prueba rápida (Simulación)
 # json_falso = '{"decision": "COMPRAR", "confianza": 85}'
-# print(ejecutar_orden_ia(json_falso))
\ No newline at end of file
+# print(ejecutar_orden_ia(json_falso))
@@ -1,10 +1,12 @@
 "use client";
-import { createChart, ColorType } from 'lightweight-charts';
+import { createChart, ColorType, ISeriesApi } from 'lightweight-charts';
 import React, { useEffect, useRef } from 'react';
 
 export const ChartComponent = (props: { data: any[] }) => {
     const { data } = props;
     const chartContainerRef = useRef<HTMLDivElement>(null);
+    const seriesRef = useRef<ISeriesApi<'Candlestick'> | null>(null);
+    const renderedRef = useRef<{ first: number; last: number } | null>(null); // rango ya dibujado
 
     useEffect(() => {
         // Verificación de seguridad
@@ -46,15 +48,36 @@ export const ChartComponent = (props: { data: any[] }) => {
             wickDownColor: '#ef4444',
         });
 
-        candlestickSeries.setData(data);
+        seriesRef.current = candlestickSeries;
 
         window.addEventListener('resize', handleResize);
 
         // Limpieza al desmontar
         return () => {
             window.removeEventListener('resize', handleResize);
+            seriesRef.current = null;
+            renderedRef.current = null;
             chart.remove();
         };
+    }, []);
+
+    // El gráfico se crea una vez; los diffs del WebSocket solo tocan la vela en curso y las nuevas
+    useEffect(() => {
+        const series = seriesRef.current;
+        if (!series) return;
+        const prev = renderedRef.current;
+        let start = -1;
+        if (prev && data.length && data[0].time >= prev.first) {
+            for (let i = data.length - 1; i >= 0 && data[i].time >= prev.last; i--) {
+                if (data[i].time === prev.last) start = i;
+            }
+        }
+        if (start >= 0) {
+            for (const candle of data.slice(start)) series.update(candle);
+        } else {
+            series.setData(data); // primera carga, cambio de serie o huecos
+        }
+        renderedRef.current = data.length ? { first: data[0].time, last: data[data.length - 1].time } : null;
     }, [data]);
 
     return (
@@ -1,23 +1,33 @@
 "use client";
 import { useEffect, useState } from 'react';
 import { TrendingUp, TrendingDown, Activity } from 'lucide-react';
+import type { Ticker } from './useMarketStream';
 
-export const MarketList = () => {
-    const [markets, setMarkets] = useState<any[]>([]);
+// Con `tickers` (WebSocket del dashboard) no hay polling
+export const MarketList = (props: { tickers?: Record<string, Ticker> }) => {
+    const { tickers } = props;
+    const live = tickers !== undefined;
+    const [polled, setPolled] = useState<any[]>([]);
+    const markets = tickers
+        ? Object.entries(tickers)
+              .filter(([, t]) => t.p !== undefined)
+              .map(([sym, t]) => ({ symbol: sym.replace('/USDT', ''), price: t.p ?? 0, change: t.c ?? 0, volume: t.v ?? 0 }))
+        : polled;
 
     useEffect(() => {
+        if (live) return;
         const fetchMarkets = async () => {
             try {
                 const res = await fetch('http://127.0.0.1:8000/api/market/overview');
                 const data = await res.json();
-                if (Array.isArray(data)) setMarkets(data);
+                if (Array.isArray(data)) setPolled(data.filter((m: any) => m.status !== 'error'));
             } catch (e) { console.error(e); }
         };
 
         fetchMarkets();
         const interval = setInterval(fetchMarkets, 5000); // Actualiza cada 5s
         return () => clearInterval(interval);
-    }, []);
+    }, [live]);
 
     return (
         <div className="bg-slate-900 border border-slate-800 rounded-xl p-6 overflow-hidden flex flex-col shadow-lg h-full">
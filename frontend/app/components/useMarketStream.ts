@@ -0,0 +1,77 @@
+"use client";
+import { useEffect, useState } from 'react';
+
+// Mensajes de /ws/market: snapshot al conectar y después diffs compactos
+export type Ticker = { p?: number; c?: number; v?: number };   // precio, variación 24h, volumen
+export type Signal = { r?: number; s?: string };                // RSI, señal
+export type Candle = { time: number; open: number; high: number; low: number; close: number };
+
+const MAX_CANDLES = 500;
+
+const mergeFields = <T,>(prev: Record<string, T>, diff: Record<string, T>) => {
+    const next = { ...prev };
+    for (const [key, fields] of Object.entries(diff)) next[key] = { ...(prev[key] || {}), ...fields } as T;
+    return next;
+};
+
+// Reemplaza la vela en curso o añade las nuevas ([t, o, h, l, c])
+const applyCandles = (prev: Candle[], rows: number[][]) => {
+    const next = prev.slice();
+    for (const [time, open, high, low, close] of rows) {
+        const candle = { time, open, high, low, close };
+        const last = next[next.length - 1];
+        if (last && last.time === time) next[next.length - 1] = candle;
+        else if (!last || time > last.time) next.push(candle);
+        else {
+            const i = next.findIndex((c) => c.time === time);
+            if (i >= 0) next[i] = candle;
+        }
+    }
+    return next.slice(-MAX_CANDLES);
+};
+
+export const useMarketStream = (apiBase: string) => {
+    const [tickers, setTickers] = useState<Record<string, Ticker>>({});
+    const [signals, setSignals] = useState<Record<string, Signal>>({});
+    const [candles, setCandles] = useState<Record<string, Candle[]>>({});
+    const [connected, setConnected] = useState(false);
+
+    useEffect(() => {
+        let ws: WebSocket | null = null;
+        let retry: ReturnType<typeof setTimeout> | undefined;
+        let closed = false;
+
+        const connect = () => {
+            ws = new WebSocket(`${apiBase.replace(/^http/, 'ws')}/ws/market`);
+            ws.onopen = () => setConnected(true);
+            ws.onclose = () => {
+                setConnected(false);
+                if (!closed) retry = setTimeout(connect, 3000); // Reconexión
+            };
+            ws.onmessage = (event) => {
+                const msg = JSON.parse(event.data);
+                const full = msg.type === 'snapshot';
+                if (full || msg.tickers) setTickers((prev) => mergeFields(full ? {} : prev, msg.tickers || {}));
+                if (full || msg.signals) setSignals((prev) => mergeFields(full ? {} : prev, msg.signals || {}));
+                if (full || msg.candles) {
+                    setCandles((prev) => {
+                        const next: Record<string, Candle[]> = full ? {} : { ...prev };
+                        for (const [key, rows] of Object.entries(msg.candles || {})) {
+                            next[key] = applyCandles(full ? [] : prev[key] || [], rows as number[][]);
+                        }
+                        return next;
+                    });
+                }
+            };
+        };
+
+        connect();
+        return () => {
+            closed = true;
+            clearTimeout(retry);
+            ws?.close();
+        };
+    }, [apiBase]);
+
+    return { tickers, signals, candles, connected };
+};
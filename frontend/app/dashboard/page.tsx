@@ -4,6 +4,7 @@ import { Activity, Cpu, Wallet, LogOut, TrendingUp, AlertTriangle, ShieldCheck,
 import { useRouter } from 'next/navigation';
 import { ChartComponent } from '../components/Chart';     // Asegúrate de tener este componente
 import { MarketList } from '../components/MarketList';   // Asegúrate de tener este componente
+import { useMarketStream } from '../components/useMarketStream';
 
 // URL de tu API en Render
 const API_BASE_URL = process.env.NEXT_PUBLIC_API_URL || "https://nexus-ai-trading-1.onrender.com";
@@ -23,6 +24,23 @@ export default function Dashboard() {
   // Datos del Gráfico
   const [candleData, setCandleData] = useState<any[]>([]);
 
+  // --- DATOS EN VIVO (WebSocket /ws/market: diffs de precio, RSI, señal y velas) ---
+  const live = useMarketStream(API_BASE_URL);
+
+  useEffect(() => {
+    const btc = live.tickers['BTC/USDT'];
+    if (btc?.p) {
+      setPrice(btc.p);
+      if (btc.c !== undefined) setChange24h(btc.c);
+      setLoading(false);
+    }
+    const sig = live.signals['BTC/USDT'];
+    if (sig?.r !== undefined) setRsi(sig.r);
+    if (sig?.s) setSignal(sig.s);
+    const candles = live.candles['BTC/USDT|1h'];
+    if (candles && candles.length > 0) setCandleData(candles);
+  }, [live.tickers, live.signals, live.candles]);
+
   // --- CONEXIÓN AL CEREBRO (BACKEND) ---
   useEffect(() => {
     
@@ -63,19 +81,19 @@ export default function Dashboard() {
         }
     };
 
-    // Llamadas iniciales
+    // Llamadas iniciales (el resto llega por el WebSocket)
     fetchMarketData();
-    fetchCandles();
+    if (!live.connected) fetchCandles();
 
-    // Loops de actualización (Polling)
-    const intervalPrice = setInterval(fetchMarketData, 4000); // Precio cada 4s
-    const intervalChart = setInterval(fetchCandles, 60000);   // Gráfico cada 1min
+    // Con WebSocket solo se refresca el texto IA; sin él, polling como antes
+    const intervalPrice = setInterval(fetchMarketData, live.connected ? 30000 : 4000);
+    const intervalChart = live.connected ? undefined : setInterval(fetchCandles, 60000);
 
     return () => {
         clearInterval(intervalPrice);
-        clearInterval(intervalChart);
+        if (intervalChart) clearInterval(intervalChart);
     };
-  }, []);
+  }, [live.connected]);
 
   return (
     <div className="min-h-screen bg-black text-white flex font-sans overflow-hidden">
@@ -214,7 +232,7 @@ export default function Dashboard() {
 
           {/* LISTA MULTI-ACTIVOS (MARKET WATCH) */}
           <div className="h-full bg-slate-900 border border-slate-800 rounded-xl overflow-hidden shadow-lg">
-             <MarketList />
+             <MarketList tickers={live.connected ? live.tickers : undefined} />
           </div>
 
         </div>
@@ -0,0 +1,405 @@
+"""
+Nexus Indicators - Motor de indicadores técnicos.
+Modo batch (matriz símbolos x velas en NumPy vectorizado) y modo incremental
+con estado por (símbolo, timeframe) que se actualiza en O(1) por vela nueva.
+Pipeline compartido (EMA, MACD, Bollinger, ATR, VWAP, RSI): una vez por
+(símbolo, timeframe, vela) para todas las estrategias y usuarios suscritos.
+"""
+
+import math
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Máximo factor de escala dentro de un bloque del scan (evita overflow y pérdida de precisión)
+_MAX_BLOCK_SCALE = 1e12
+_MAX_BLOCK = 256
+
+
+# ==========================================
+# 🧮 1. NÚCLEO VECTORIZADO (WILDER)
+# ==========================================
+
+def _wilder_smooth(x: np.ndarray, period: int, init: np.ndarray) -> np.ndarray:
+    """
+    Media suavizada de Wilder sobre el último eje:
+        y[t] = (y[t-1] * (period - 1) + x[t]) / period,  con y[-1] = init
+    """
+    return _ewm(x, 1.0 / period, init)
+
+
+def _ewm(x: np.ndarray, alpha: float, init: np.ndarray) -> np.ndarray:
+    """
+    Media exponencial y[t] = (1 - alpha) * y[t-1] + alpha * x[t] con y[-1] = init.
+    Se resuelve por bloques con forma cerrada (cumsum), sin bucle por vela.
+    """
+    a = 1.0 - alpha
+    b = alpha
+    n = x.shape[-1]
+    out = np.empty_like(x, dtype=np.float64)
+    if n == 0: return out
+    if a == 0.0:
+        out[...] = x
+        return out
+
+    block = max(1, min(_MAX_BLOCK, int(math.log(_MAX_BLOCK_SCALE) / -math.log(a))))
+    j = np.arange(block, dtype=np.float64)
+    pow_j = a ** j              # a^j
+    inv_pow_j = a ** -j         # a^-j
+    prev = np.asarray(init, dtype=np.float64)
+
+    for start in range(0, n, block):
+        chunk = x[..., start:start + block]
+        m = chunk.shape[-1]
+        acc = np.cumsum(chunk * inv_pow_j[:m], axis=-1)
+        y = pow_j[:m] * (a * prev[..., None] + b * acc)
+        out[..., start:start + m] = y
+        prev = y[..., -1]
+    return out
+
+
+def _rsi_from_avgs(avg_up, avg_down):
+    """RSI a partir de las medias. Sin pérdidas -> 100 (o 50 si tampoco hay ganancias)."""
+    avg_up = np.asarray(avg_up, dtype=np.float64)
+    avg_down = np.asarray(avg_down, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = 100. - 100. / (1. + avg_up / avg_down)
+    flat = avg_down == 0
+    return np.where(flat, np.where(avg_up > 0, 100.0, 50.0), rsi)
+
+
+def _wilder_avgs(prices: np.ndarray, period: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Series de (avg_up, avg_down) alineadas con prices[period:]."""
+    deltas = np.diff(prices, axis=-1)
+    gains = np.clip(deltas, 0, None)
+    losses = np.clip(-deltas, 0, None)
+
+    seed_up = gains[..., :period].mean(axis=-1)
+    seed_down = losses[..., :period].mean(axis=-1)
+    rest_up = _wilder_smooth(gains[..., period:], period, seed_up)
+    rest_down = _wilder_smooth(losses[..., period:], period, seed_down)
+
+    avg_up = np.concatenate([seed_up[..., None], rest_up], axis=-1)
+    avg_down = np.concatenate([seed_down[..., None], rest_down], axis=-1)
+    return avg_up, avg_down
+
+
+def rsi_batch(prices, period: int = 14) -> np.ndarray:
+    """
+    RSI de Wilder para una serie (1-D) o una matriz (símbolos x velas).
+    Devuelve un array de la misma forma; las primeras `period` velas son NaN.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    if period < 1: raise ValueError("period debe ser >= 1")
+    out = np.full(prices.shape, np.nan)
+    if prices.shape[-1] <= period: return out
+
+    avg_up, avg_down = _wilder_avgs(prices, period)
+    out[..., period:] = _rsi_from_avgs(avg_up, avg_down)
+    return out
+
+
+def rsi_last(prices, period: int = 14) -> np.ndarray:
+    """Último valor del RSI por fila (escalar para series 1-D)."""
+    return rsi_batch(prices, period)[..., -1]
+
+
+def ema_batch(prices, period: int) -> np.ndarray:
+    """EMA (alpha = 2 / (period + 1)) sembrada con la media simple de las primeras `period` velas."""
+    prices = np.asarray(prices, dtype=np.float64)
+    out = np.full(prices.shape, np.nan)
+    if prices.shape[-1] < period: return out
+    seed = prices[..., :period].mean(axis=-1)
+    out[..., period - 1] = seed
+    out[..., period:] = _ewm(prices[..., period:], 2.0 / (period + 1), seed)
+    return out
+
+
+def macd_batch(prices, fast: int = 12, slow: int = 26, signal: int = 9) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(macd, señal, histograma). La señal es la EMA del MACD desde que éste existe."""
+    prices = np.asarray(prices, dtype=np.float64)
+    macd = ema_batch(prices, fast) - ema_batch(prices, slow)
+    sig = np.full(prices.shape, np.nan)
+    if prices.shape[-1] >= slow - 1 + signal:
+        sig[..., slow - 1:] = ema_batch(macd[..., slow - 1:], signal)
+    return macd, sig, macd - sig
+
+
+def bollinger_batch(prices, period: int = 20, k: float = 2.0) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(media, banda superior, banda inferior) con desviación típica poblacional en ventana móvil."""
+    prices = np.asarray(prices, dtype=np.float64)
+    mid = np.full(prices.shape, np.nan)
+    std = np.full(prices.shape, np.nan)
+    if prices.shape[-1] >= period:
+        windows = np.lib.stride_tricks.sliding_window_view(prices, period, axis=-1)
+        mid[..., period - 1:] = windows.mean(axis=-1)
+        std[..., period - 1:] = windows.std(axis=-1)
+    return mid, mid + k * std, mid - k * std
+
+
+def atr_batch(high, low, close, period: int = 14) -> np.ndarray:
+    """ATR de Wilder: media suavizada del rango verdadero, sembrada con la media simple."""
+    high, low, close = (np.asarray(a, dtype=np.float64) for a in (high, low, close))
+    out = np.full(close.shape, np.nan)
+    if close.shape[-1] <= period: return out
+    prev = close[..., :-1]
+    tr = np.maximum(high[..., 1:] - low[..., 1:],
+                    np.maximum(np.abs(high[..., 1:] - prev), np.abs(low[..., 1:] - prev)))
+    seed = tr[..., :period].mean(axis=-1)
+    out[..., period] = seed
+    out[..., period + 1:] = _wilder_smooth(tr[..., period:], period, seed)
+    return out
+
+
+def vwap_batch(high, low, close, volume, timestamps, session_ms: int = 86_400_000) -> np.ndarray:
+    """VWAP (precio típico) acumulado por sesión; se reinicia cada `session_ms` (día UTC)."""
+    tp = (np.asarray(high, dtype=np.float64) + np.asarray(low, dtype=np.float64)
+          + np.asarray(close, dtype=np.float64)) / 3
+    vol = np.asarray(volume, dtype=np.float64)
+    session = np.asarray(timestamps, dtype=np.int64) // session_ms
+    if len(session) == 0: return tp
+    starts = np.flatnonzero(np.r_[True, session[1:] != session[:-1]])
+    pv, vv = np.cumsum(tp * vol), np.cumsum(vol)
+    # Restamos lo acumulado antes de cada sesión
+    idx = np.repeat(starts, np.diff(np.r_[starts, len(session)]))
+    base_pv = np.where(idx > 0, pv[idx - 1], 0.0)
+    base_v = np.where(idx > 0, vv[idx - 1], 0.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out = (pv - base_pv) / (vv - base_v)
+    return np.where(vv - base_v > 0, out, tp)
+
+
+# ==========================================
+# ⚡ 2. MODO INCREMENTAL (ESTADO POR SÍMBOLO)
+# ==========================================
+
+@dataclass
+class RSIState:
+    period: int
+    avg_up: float
+    avg_down: float
+    last_close: float
+    last_ts: Optional[int] = None
+    # Estado anterior a la última vela: permite re-calcular la vela en curso
+    prev_avg_up: float = 0.0
+    prev_avg_down: float = 0.0
+    prev_close: float = 0.0
+
+    @property
+    def rsi(self) -> float:
+        # Camino escalar puro Python: evita el overhead de NumPy en el O(1)
+        if self.avg_down == 0: return 100.0 if self.avg_up > 0 else 50.0
+        return 100. - 100. / (1. + self.avg_up / self.avg_down)
+
+    def update(self, close: float, ts: Optional[int] = None) -> float:
+        """Aplica una vela en O(1). Si `ts` coincide con la última, la re-calcula."""
+        if ts is not None and ts == self.last_ts:
+            self.avg_up, self.avg_down, self.last_close = self.prev_avg_up, self.prev_avg_down, self.prev_close
+        else:
+            self.prev_avg_up, self.prev_avg_down, self.prev_close = self.avg_up, self.avg_down, self.last_close
+
+        delta = close - self.last_close
+        upval = delta if delta > 0 else 0.
+        downval = -delta if delta < 0 else 0.
+        p = self.period
+        self.avg_up = (self.avg_up * (p - 1) + upval) / p
+        self.avg_down = (self.avg_down * (p - 1) + downval) / p
+        self.last_close = float(close)
+        self.last_ts = ts
+        return self.rsi
+
+
+class RSIEngine:
+    """Mantiene el estado (avg_up, avg_down) por (símbolo, timeframe)."""
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        self._states: Dict[Tuple[str, str], RSIState] = {}
+        self._lock = threading.Lock()
+
+    def seed(self, symbol: str, timeframe: str, closes: Sequence[float],
+             timestamps: Optional[Sequence[int]] = None) -> float:
+        """Inicializa el estado con el histórico (batch) y devuelve el RSI actual."""
+        closes = np.asarray(closes, dtype=np.float64)
+        if closes.shape[-1] < self.period + 2:
+            raise ValueError(f"Se necesitan al menos {self.period + 2} velas")
+
+        # Estado hasta la penúltima vela; la última entra por update() para poder revisarla
+        avg_up, avg_down = _wilder_avgs(closes[:-1], self.period)
+        state = RSIState(
+            period=self.period,
+            avg_up=float(avg_up[-1]),
+            avg_down=float(avg_down[-1]),
+            last_close=float(closes[-2]),
+            last_ts=int(timestamps[-2]) if timestamps is not None else None,
+        )
+        last_ts = int(timestamps[-1]) if timestamps is not None else None
+        rsi = state.update(float(closes[-1]), last_ts)
+        with self._lock:
+            self._states[(symbol, timeframe)] = state
+        return rsi
+
+    def update(self, symbol: str, timeframe: str, close: float, ts: Optional[int] = None) -> float:
+        """Actualización O(1) con una vela nueva (o la vela en curso si repite `ts`)."""
+        with self._lock:
+            state = self._states.get((symbol, timeframe))
+            if state is None: raise KeyError(f"Sin estado para {symbol} {timeframe}, llama a seed() primero")
+            return state.update(float(close), ts)
+
+    def sync(self, symbol: str, timeframe: str, timestamps: Sequence[int], closes: Sequence[float]) -> float:
+        """
+        Avanza el estado con un bloque OHLCV recién descargado: solo aplica las
+        velas posteriores a la última vista. Si hay hueco o no hay estado, re-siembra.
+        """
+        timestamps = np.asarray(timestamps, dtype=np.int64)   # columnas (candles.Candles) sin copia
+        with self._lock:
+            state = self._states.get((symbol, timeframe))
+            if state is not None and state.last_ts is not None and len(timestamps):
+                i = int(np.searchsorted(timestamps, state.last_ts))
+                if i < len(timestamps) and timestamps[i] == state.last_ts:
+                    rsi = state.rsi
+                    new_ts, new_closes = timestamps[i:].tolist(), np.asarray(closes, dtype=np.float64)[i:].tolist()
+                    for ts, close in zip(new_ts, new_closes):
+                        rsi = state.update(close, ts)
+                    return rsi
+        return self.seed(symbol, timeframe, closes, timestamps)
+
+    def get(self, symbol: str, timeframe: str) -> Optional[float]:
+        with self._lock:   # sync() puede estar avanzando el estado desde otro hilo
+            state = self._states.get((symbol, timeframe))
+            return state.rsi if state else None
+
+    def reset(self, symbol: Optional[str] = None, timeframe: Optional[str] = None):
+        with self._lock:
+            if symbol is None:
+                self._states.clear()
+            else:
+                self._states.pop((symbol, timeframe), None)
+
+
+# Instancia compartida por la API y el bot
+rsi_engine = RSIEngine()
+
+
+# ==========================================
+# 🧩 3. PIPELINE COMPARTIDO
+# ==========================================
+
+def _spec_key(spec: str) -> str:
+    return spec.replace(':', '_')
+
+
+def _ind_ema(c, period=20):
+    return {'': ema_batch(c.close, int(period))[-1]}
+
+
+def _ind_macd(c, fast=12, slow=26, signal=9):
+    macd, sig, hist = macd_batch(c.close, int(fast), int(slow), int(signal))
+    return {'': macd[-1], '_signal': sig[-1], '_hist': hist[-1]}
+
+
+def _ind_bb(c, period=20, k=2.0):
+    mid, upper, lower = bollinger_batch(c.close, int(period), float(k))
+    return {'_mid': mid[-1], '_upper': upper[-1], '_lower': lower[-1]}
+
+
+def _ind_atr(c, period=14):
+    return {'': atr_batch(c.high, c.low, c.close, int(period))[-1]}
+
+
+def _ind_vwap(c):
+    return {'': vwap_batch(c.high, c.low, c.close, c.volume, c.timestamp)[-1]}
+
+
+def _ind_rsi(c, period=14):
+    return {'': rsi_batch(c.close, int(period))[-1]}
+
+
+# Tipo -> función(Candles, *parámetros) -> {sufijo: último valor}
+INDICATORS: Dict[str, Callable[..., Dict[str, float]]] = {
+    'ema': _ind_ema, 'macd': _ind_macd, 'bb': _ind_bb, 'atr': _ind_atr, 'vwap': _ind_vwap, 'rsi': _ind_rsi,
+}
+
+
+class IndicatorPipeline:
+    """
+    Las estrategias declaran qué indicadores usan ('ema:20', 'macd', 'bb:20:2', 'atr', 'vwap', ...);
+    el pipeline calcula la UNIÓN una vez por (símbolo, timeframe, vela) y la memoriza.
+    Más estrategias o usuarios con los mismos indicadores no añaden cálculo.
+    Claves del resultado: 'ema_20', 'macd', 'macd_signal', 'macd_hist', 'bb_mid', 'bb_upper', ...
+    """
+
+    def __init__(self, max_entries: int = 4096):
+        self._subs: Dict[str, Tuple[str, ...]] = {}
+        self._specs: Tuple[str, ...] = ()
+        self._memo: Dict[Tuple[str, str], Tuple[Any, Dict[str, float]]] = {}
+        self._keys: Dict[str, Tuple[str, ...]] = {}     # spec -> claves que produce
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'computed': 0}
+
+    @staticmethod
+    def _parse(spec: str) -> Tuple[str, List[str]]:
+        kind, *params = spec.split(':')
+        if kind not in INDICATORS: raise ValueError(f"Indicador desconocido: {spec}")
+        return kind, params
+
+    def subscribe(self, subscriber: str, specs: Iterable[str]) -> Tuple[str, ...]:
+        """Registra (o reemplaza) los indicadores de un suscriptor. Devuelve sus claves de resultado."""
+        specs = tuple(dict.fromkeys(specs))
+        for spec in specs: self._parse(spec)
+        with self._lock:
+            self._subs[subscriber] = specs
+            union = tuple(dict.fromkeys(s for subs in self._subs.values() for s in subs))
+            if union != self._specs:
+                self._specs = union
+                self._memo.clear()      # el conjunto cambió: se recalcula en la próxima vela
+        return specs
+
+    def unsubscribe(self, subscriber: str):
+        with self._lock:
+            self._subs.pop(subscriber, None)
+
+    @property
+    def specs(self) -> Tuple[str, ...]:
+        return self._specs
+
+    def compute(self, symbol: str, timeframe: str, candles) -> Dict[str, float]:
+        """Indicadores de la última vela de `candles` (Candles). Memorizado por vela y su contenido."""
+        if not len(candles): return {}
+        # La vela en curso cambia: la firma incluye su fila completa y la longitud de la ventana
+        signature = (len(candles), candles.row(-1), self._specs)
+        key = (symbol, timeframe)
+        with self._lock:
+            memo = self._memo.get(key)
+            if memo is not None and memo[0] == signature:
+                self.stats['hits'] += 1
+                return memo[1]
+        values: Dict[str, float] = {}
+        for spec in signature[2]:
+            kind, params = self._parse(spec)
+            base = _spec_key(spec)
+            out = {base + suffix: float(v) for suffix, v in INDICATORS[kind](candles, *params).items()}
+            self._keys[spec] = tuple(out)
+            values.update(out)
+        with self._lock:
+            self.stats['computed'] += 1
+            if len(self._memo) >= self.max_entries and key not in self._memo:
+                self._memo.pop(next(iter(self._memo)))
+            self._memo[key] = (signature, values)
+        return values
+
+    def view(self, values: Dict[str, float], subscriber: str) -> Dict[str, float]:
+        """Solo las claves que declaró `subscriber` (sin NaN de ventanas cortas)."""
+        keys = (k for spec in self._subs.get(subscriber, ()) for k in self._keys.get(spec, ()))
+        return {k: values[k] for k in keys if k in values and not math.isnan(values[k])}
+
+    def get(self, symbol: str, timeframe: str, candles, subscriber: Optional[str] = None) -> Dict[str, float]:
+        values = self.compute(symbol, timeframe, candles)
+        return values if subscriber is None else self.view(values, subscriber)
+
+
+# Instancia compartida por la API y el bot
+indicator_pipeline = IndicatorPipeline()
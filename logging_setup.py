@@ -0,0 +1,221 @@
+"""
+Nexus Logging - Logs sin bloquear el bucle del bot.
+  - QueueHandler en el hilo que loguea (solo encola); un QueueListener en segundo plano formatea y escribe
+  - registros JSON de una línea (ts, nivel, logger, mensaje, excepción y campos `extra`)
+  - extra={"dedup": False} fuerza la salida de un registro (órdenes ejecutadas)
+  - supresión de duplicados: el primer mensaje de cada tipo sale, los idénticos dentro de la ventana
+    se cuentan y se resumen como "repetido N× en los últimos 300s". Emails, números e ids se normalizan,
+    así el mismo error de 5.000 usuarios es UN tipo de mensaje y el coste no crece con los usuarios.
+Uso: from logging_setup import setup_logging; setup_logging()
+"""
+
+import os
+import re
+import sys
+import copy
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, List, Optional, Tuple
+
+# ==========================================
+# ⚙️ 1. CONFIGURACIÓN
+# ==========================================
+LOG_LEVEL = os.getenv("NEXUS_LOG_LEVEL", "INFO").upper()
+LOG_JSON = os.getenv("NEXUS_LOG_JSON", "1").lower() in ("1", "true", "yes")
+LOG_FILE = os.getenv("NEXUS_LOG_FILE")                                  # además de stdout (p.ej. nexus_bot.log)
+LOG_DEDUP_WINDOW = float(os.getenv("NEXUS_LOG_DEDUP_WINDOW", 300))      # segundos; 0 = sin supresión
+LOG_QUEUE_SIZE = int(os.getenv("NEXUS_LOG_QUEUE_SIZE", 10_000))         # llena -> se descarta y se cuenta
+
+# Atributos estándar de LogRecord: el resto son campos `extra=` y van al JSON
+_RESERVED = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'taskName'}
+
+# Partes variables de un mensaje (primero las más específicas)
+_VARIABLE = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+"       # emails
+                       r"|\b[0-9a-f]{8,}(?:-[0-9a-f]{4,})*\b"  # ids / hashes
+                       r"|-?\d+(?:[.,]\d+)*")                 # números (precios, RSI, códigos)
+
+
+def message_key(record: logging.LogRecord) -> Tuple[str, int, str]:
+    """Tipo de mensaje: (logger, nivel, plantilla con las partes variables sustituidas)."""
+    return record.name, record.levelno, _VARIABLE.sub('#', record.getMessage())
+
+
+# ==========================================
+# 🧾 2. FORMATO Y SUPRESIÓN
+# ==========================================
+
+class JsonFormatter(logging.Formatter):
+    """Una línea JSON por registro."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        doc = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname, 'logger': record.name, 'msg': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED and key != 'dedup' and not key.startswith('_'): doc[key] = value
+        if record.exc_info: doc['exc'] = self.formatException(record.exc_info)
+        elif record.exc_text: doc['exc'] = record.exc_text
+        return json.dumps(doc, ensure_ascii=False, default=str)
+
+
+class DedupFilter(logging.Filter):
+    """
+    Deja pasar el primer registro de cada tipo por ventana y cuenta los demás.
+    Al cerrar la ventana (flush periódico desde el listener) emite un resumen con el total.
+    """
+
+    def __init__(self, window: float = LOG_DEDUP_WINDOW, max_keys: int = 10_000):
+        super().__init__()
+        self.window = window
+        self.max_keys = max_keys
+        self._seen: Dict[Tuple[str, int, str], list] = {}   # tipo -> [inicio ventana, suprimidos, último registro]
+        self._pending: List[logging.LogRecord] = []          # resúmenes de ventanas reabiertas
+        self._lock = threading.Lock()
+        self.stats = {'passed': 0, 'suppressed': 0, 'summaries': 0}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        # Resúmenes propios y registros marcados con extra={'dedup': False} (p.ej. órdenes ejecutadas) siempre salen
+        if self.window <= 0 or getattr(record, 'repeated', None) is not None or record.__dict__.get('dedup') is False:
+            return True
+        key, now = message_key(record), record.created
+        with self._lock:
+            entry = self._seen.get(key)
+            if entry is not None and now - entry[0] < self.window:
+                entry[1] += 1
+                entry[2] = record
+                self.stats['suppressed'] += 1
+                return False
+            # Una ventana anterior con suprimidos se resume en el siguiente flush
+            if entry is not None and entry[1]: self._pending.append(self._summary(entry))
+            elif len(self._seen) >= self.max_keys: self._seen.pop(next(iter(self._seen)))
+            self._seen[key] = [now, 0, None]
+            self.stats['passed'] += 1
+        return True
+
+    def _summary(self, entry: list) -> logging.LogRecord:
+        start, count, last = entry
+        elapsed = max(1, round(last.created - start))
+        summary = logging.makeLogRecord(dict(last.__dict__, exc_info=None, exc_text=None))
+        summary.msg, summary.args = f"{last.getMessage()} (repetido {count}× en los últimos {elapsed}s)", None
+        summary.repeated, summary.window_s = count, elapsed
+        return summary
+
+    def flush(self, now: Optional[float] = None, force: bool = False) -> List[logging.LogRecord]:
+        """Resúmenes de las ventanas cerradas (o de todas con `force`)."""
+        now = time.time() if now is None else now
+        with self._lock:
+            out, self._pending = self._pending, []
+            for key, entry in list(self._seen.items()):
+                if force or now - entry[0] >= self.window:
+                    del self._seen[key]
+                    if entry[1]: out.append(self._summary(entry))
+            self.stats['summaries'] += len(out)
+        return out
+
+
+class _DropCountingQueueHandler(QueueHandler):
+    """Nunca bloquea al que loguea: con la cola llena descarta y cuenta."""
+
+    def __init__(self, q, stats: Dict[str, int]):
+        super().__init__(q)
+        self.stats = stats
+
+    def prepare(self, record):
+        # Solo el mensaje final; el formato (JSON) se hace en el hilo del listener
+        record = copy.copy(record)
+        record.msg, record.args = record.getMessage(), None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.stats['dropped'] += 1
+
+
+class _FlushingListener(QueueListener):
+    """QueueListener que, cuando no llegan registros, vuelca los resúmenes de duplicados."""
+
+    def __init__(self, q, *handlers, dedup: Optional[DedupFilter] = None, flush_every: float = 5.0):
+        super().__init__(q, *handlers, respect_handler_level=True)
+        self.dedup = dedup
+        self.flush_every = flush_every
+        self._next_flush = time.monotonic() + flush_every
+
+    def dequeue(self, block):
+        while True:
+            if self.dedup is not None and time.monotonic() >= self._next_flush:
+                self._next_flush = time.monotonic() + self.flush_every
+                for summary in self.dedup.flush(): self.handle(summary)
+            try:
+                return self.queue.get(block, timeout=self.flush_every if block else None)
+            except queue.Empty:
+                if not block: raise
+
+    def stop(self):
+        super().stop()
+        if self.dedup is not None:
+            for summary in self.dedup.flush(force=True): self.handle(summary)
+        for handler in self.handlers: handler.flush()
+
+
+# ==========================================
+# 🚀 3. ARRANQUE
+# ==========================================
+
+_listener: Optional[_FlushingListener] = None
+_lock = threading.Lock()
+stats = {'dropped': 0}
+
+
+def setup_logging(level: str = LOG_LEVEL, json_format: bool = LOG_JSON, log_file: Optional[str] = LOG_FILE,
+                  dedup_window: float = LOG_DEDUP_WINDOW, stream=None, queue_size: int = LOG_QUEUE_SIZE) -> QueueListener:
+    """
+    Sustituye los handlers del logger raíz por un QueueHandler y arranca el listener en segundo plano.
+    Idempotente: una segunda llamada (p.ej. bot_executor tras importar main) reemplaza la anterior.
+    """
+    global _listener
+    with _lock:
+        if _listener is not None: _listener.stop()
+        formatter = JsonFormatter() if json_format else \
+            logging.Formatter('%(asctime)s | %(levelname)-8s | %(name)s | %(message)s')
+        handlers: List[logging.Handler] = [logging.StreamHandler(stream or sys.stdout)]
+        if log_file: handlers.append(logging.FileHandler(log_file, encoding='utf-8'))
+        for h in handlers: h.setFormatter(formatter)
+
+        q: 'queue.Queue[logging.LogRecord]' = queue.Queue(queue_size)
+        dedup = DedupFilter(dedup_window)
+        qh = _DropCountingQueueHandler(q, stats)
+        qh.addFilter(dedup)
+
+        root = logging.getLogger()
+        for h in list(root.handlers): root.removeHandler(h)
+        root.addHandler(qh)
+        root.setLevel(level)
+        _listener = _FlushingListener(q, *handlers, dedup=dedup)
+        _listener.start()
+        return _listener
+
+
+def dedup_stats() -> Dict[str, int]:
+    """Contadores de la tubería (para /metrics)."""
+    out = dict(stats)
+    if _listener is not None and _listener.dedup is not None: out.update(_listener.dedup.stats)
+    return out
+
+
+@atexit.register
+def shutdown_logging():
+    """Vacía la cola y escribe los resúmenes pendientes."""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
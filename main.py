@@ -1,21 +1,37 @@
 import uvicorn
-import ccxt
-import requests
+import ccxt.async_support as ccxt_async
+import aiohttp
 import json
 import random
+import asyncio
 import numpy as np 
 import stripe 
 import os
 import logging
 import sys
 from datetime import datetime
+from contextlib import asynccontextmanager
 from typing import Dict, Any, Optional, List
-from dataclasses import dataclass
-from enum import Enum
-from fastapi import FastAPI, HTTPException, Request, Body
+from fastapi import FastAPI, HTTPException, Request, Body, WebSocket, WebSocketDisconnect, Header, Depends
+from fastapi.responses import Response, StreamingResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from passlib.context import CryptContext
 from pydantic import BaseModel
+from nexus_core import BotConfig, TradingSignal, rsi_from_ohlcv, rsi_signal
+from market_cache import candle_cache, timeframe_to_ms
+from candles import Candles, COLUMNS as CANDLE_COLUMNS
+from candle_store import candle_store, encode_cursor, MAX_LIMIT as CANDLES_MAX_LIMIT
+from candle_archive import CandleArchive, CandleRecorder
+from scheduler import BotScheduler, PROCESSED, SKIPPED, ERROR
+from ai_analysis import AIAnalysisService
+from market_stream import MarketStream, ticker_store, BINANCE_WS_URL
+from market_push import MarketBroadcaster
+from paper_exchange import paper_exchange, paper_execution_service
+from execution_engine import OrderRequest, execution_service
+from indicators import indicator_pipeline
+from auth_service import password_hasher, session_signer, bearer_token
+from logging_setup import setup_logging, dedup_stats
+from metrics import registry as metrics_registry, cycle_metrics, scrape_allowed, CONTENT_TYPE as METRICS_CONTENT_TYPE
+import strategy
 
 # ==========================================
 # ⚙️ 1. CONFIGURACIÓN Y LOGGING
@@ -23,11 +39,30 @@ from pydantic import BaseModel
 STRIPE_SECRET_KEY = os.getenv("STRIPE_SECRET_KEYm")
 STRIPE_WEBHOOK_SECRET = os.getenv("STRIPE_WEBHOOK_SECRET")
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY") 
+GEMINI_API_BASE = os.getenv("GEMINI_API_BASE", "https://generativelanguage.googleapis.com/v1beta")
+AI_CACHE_TTL = float(os.getenv("NEXUS_AI_CACHE_TTL", 300))        # segundos por cubo (precio, variación, RSI)
+AI_RATE_PER_MIN = int(os.getenv("NEXUS_AI_RATE_PER_MIN", 30))     # llamadas máximas a Gemini por minuto
+# Pares del panel de mercado (separados por comas)
+OVERVIEW_SYMBOLS = [s.strip() for s in os.getenv("NEXUS_OVERVIEW_SYMBOLS", "BTC/USDT,ETH/USDT,SOL/USDT,BNB/USDT,XRP/USDT").split(",") if s.strip()]
+OVERVIEW_MAX_SYMBOLS = 300
+OVERVIEW_CONCURRENCY = 20
+# Streaming WebSocket (velas + tickers en memoria, sin REST en el camino de decisión)
+STREAM_ENABLED = os.getenv("NEXUS_STREAM", "0").lower() in ("1", "true", "yes")
+STREAM_URL = os.getenv("NEXUS_STREAM_URL", BINANCE_WS_URL)
+STREAM_TIMEFRAMES = [t.strip() for t in os.getenv("NEXUS_STREAM_TIMEFRAMES", "1h,5m").split(",") if t.strip()]
+PUSH_INTERVAL = float(os.getenv("NEXUS_PUSH_INTERVAL", 1.0))   # segundos entre diffs a /ws/market
+PUSH_REST_INTERVAL = float(os.getenv("NEXUS_PUSH_REST_INTERVAL", 5.0))   # tickers por REST si el stream no los tiene
+# Archivo memmap de velas cerradas (candle_archive): graba lo que la API ya descarga
+ARCHIVE_ENABLED = os.getenv("NEXUS_ARCHIVE", "0").lower() in ("1", "true", "yes")
+# Barrido del bot (/api/bot/run-cycle)
+BOT_BATCH_SIZE = int(os.getenv("NEXUS_BOT_BATCH_SIZE", 500))
+BOT_WORKERS = int(os.getenv("NEXUS_BOT_WORKERS", 16))
+BOT_CYCLE_BUDGET = float(os.getenv("NEXUS_BOT_CYCLE_BUDGET", 240))
 # 🔥 PEGA AQUÍ TU ID QUE EMPIEZA POR price_
 STRIPE_PRICE_ID = "price_1SY7cUGLbG2yglswIhW2K0qs"
 if STRIPE_SECRET_KEY: stripe.api_key = STRIPE_SECRET_KEY
 
-logging.basicConfig(level=logging.INFO)
+setup_logging() # JSON en segundo plano (QueueListener) con supresión de duplicados
 logger = logging.getLogger('NexusCore')
 
 # Conexión a Base de Datos
@@ -35,7 +70,44 @@ try:
     from database_manager import db_manager
 except ImportError: exit()
 
-app = FastAPI(title="NEXUS AI TRADING CORE")
+# Datos públicos síncronos (bot / hilos): candle_cache crea su cliente ccxt en el primer uso
+exchange_async = ccxt_async.binance({'enableRateLimit': True}) # Rutas async: no bloquea el event loop
+candle_cache.async_exchange = exchange_async
+
+# Pool HTTP compartido para Gemini (keep-alive, se crea dentro del event loop)
+_http_session: Optional[aiohttp.ClientSession] = None
+
+def get_http_session() -> aiohttp.ClientSession:
+    global _http_session
+    if _http_session is None or _http_session.closed:
+        _http_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=100, keepalive_timeout=30),
+            timeout=aiohttp.ClientTimeout(total=3),
+        )
+    return _http_session
+
+market_stream = MarketStream(OVERVIEW_SYMBOLS, STREAM_TIMEFRAMES, url=STREAM_URL) if STREAM_ENABLED else None
+candle_recorder = CandleRecorder(CandleArchive()) if ARCHIVE_ENABLED else None
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await db_manager.acrear_indices()   # email único antes del primer registro (ruta async incluida)
+    if market_stream is not None: market_stream.start()
+    if candle_recorder is not None: candle_recorder.attach(candle_cache)
+    paper_exchange.attach(candle_cache) # SL/TP simulados con cada vela descargada o del stream
+    await password_hasher.warm_up()     # procesos de hash listos antes del primer login
+    yield
+    password_hasher.close()
+    if market_stream is not None: await market_stream.stop()
+    if candle_recorder is not None: candle_recorder.detach(candle_cache)
+    candle_cache.remove_listener(paper_exchange.on_candles)
+    await broadcaster.close()
+    # Cierre ordenado de los clientes async
+    await exchange_async.close()
+    if _http_session is not None: await _http_session.close()
+    await db_manager.aclose()
+
+app = FastAPI(title="NEXUS AI TRADING CORE", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -43,46 +115,10 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Candle-Count", "X-Candle-Columns"],
 )
 
-pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
-exchange_public = ccxt.binance() # Para datos públicos
-
-# --- CLASES DEL BOT ---
-class TradingSignal(Enum):
-    STRONG_BUY = "STRONG_BUY"
-    BUY = "BUY"
-    NEUTRAL = "NEUTRAL"
-    SELL = "SELL"
-    STRONG_SELL = "STRONG_SELL"
-
-class OrderStatus(Enum):
-    SUCCESS = "SUCCESS"
-    FAILED = "FAILED"
-
-@dataclass
-class BotConfig:
-    timeframe: str = '5m'
-    limit: int = 100
-    testnet_mode: bool = True
-    paper_trading: bool = True # 🔥 MODO SIMULACIÓN ACTIVADO EN NUBE POR SEGURIDAD 🔥
-    min_trade_amount: float = 0.001
-    rsi_oversold: int = 30
-    rsi_overbought: int = 70
-
-@dataclass
-class MarketData:
-    symbol: str
-    current_price: float
-    rsi: float
-
-@dataclass
-class TradeSignal:
-    signal: TradingSignal
-    confidence: float
-    entry_price: float
-    position_size: float
-    reasoning: str
+# --- CLASES DEL BOT (nexus_core: compartidas con bot_executor) ---
 
 # --- MODELOS API ---
 class UserAuth(BaseModel):
@@ -101,74 +137,114 @@ class StrategyRequest(BaseModel):
 # 🧠 2. LÓGICA DE NEGOCIO (BOT + AI)
 # ==========================================
 
-def calculate_rsi(prices, period=14):
-    try:
-        deltas = np.diff(prices)
-        seed = deltas[:period+1]
-        up = seed[seed >= 0].sum()/period
-        down = -seed[seed < 0].sum()/period
-        rs = up/down
-        rsi = np.zeros_like(prices)
-        rsi[:period] = 100. - 100./(1. + rs)
-        for i in range(period, len(prices)):
-            delta = deltas[i-1]
-            if delta > 0: upval = delta
-            else: upval = 0.; downval = -delta
-            up = (up * (period - 1) + upval) / period
-            down = (down * (period - 1) + downval) / period
-            rs = up/down
-            rsi[i] = 100. - 100./(1. + rs)
-        return rsi[-1]
-    except: return 50.0
-
-def get_ai_analysis(price, change, rsi):
+async def _gemini_generate(price, change, rsi):
+    """Una frase de Gemini; lanza excepción si ningún modelo responde (lo cuenta el circuit breaker)."""
     modelos = ["gemini-1.5-flash", "gemini-pro"]
-    headers = {'Content-Type': 'application/json'}
     prompt = f"Bitcoin ${price} ({change}%). RSI {rsi:.2f}. 1 frase corta técnica."
     data = { "contents": [{ "parts": [{"text": prompt}] }] }
+    session = get_http_session()
 
+    error = None
     for modelo in modelos:
         try:
-            url = f"https://generativelanguage.googleapis.com/v1beta/models/{modelo}:generateContent?key={GOOGLE_API_KEY}"
-            response = requests.post(url, headers=headers, json=data, timeout=3)
-            if response.status_code == 200:
-                return response.json()['candidates'][0]['content']['parts'][0]['text'].strip()
-        except: continue
-    
-    if rsi > 70: return "Sobrecompra, posible corrección."
-    if rsi < 30: return "Sobreventa, posible rebote."
-    return "Mercado lateral."
+            url = f"{GEMINI_API_BASE}/models/{modelo}:generateContent?key={GOOGLE_API_KEY}"
+            async with session.post(url, json=data) as response:
+                if response.status == 200:
+                    body = await response.json()
+                    return body['candidates'][0]['content']['parts'][0]['text'].strip()
+                error = RuntimeError(f"{modelo}: HTTP {response.status}")
+        except Exception as e: error = e
+    raise error
+
+# Caché por cubos + coalescencia + circuit breaker: el endpoint nunca espera a Gemini
+ai_service = AIAnalysisService(_gemini_generate, ttl=AI_CACHE_TTL, rate_per_min=AI_RATE_PER_MIN)
+
+async def get_ai_analysis(price, change, rsi):
+    return await ai_service.get(price, change, rsi)
 
 # --- MOTOR DEL BOT (Integrado) ---
-def run_trading_cycle_for_user(user_email):
-    """Lógica del bot que se ejecuta en la nube"""
-    logger.info(f"🔄 Procesando {user_email}...")
+def load_market_snapshot(symbol, timeframe, limit=50):
+    """Datos de mercado compartidos por todos los usuarios del mismo (símbolo, timeframe)."""
+    with cycle_metrics.stage('market', symbol):
+        ohlcv = candle_cache.get(symbol, timeframe, limit)
+        return {"symbol": symbol, "timeframe": timeframe, "price": float(ohlcv.close[-1]),
+                "rsi": rsi_from_ohlcv(symbol, timeframe, ohlcv)}
+
+def evaluate_user_signal(user, market):
+    """Señal + ejecución para un usuario con datos ya descargados. Devuelve (estado, log)."""
+    user_email, symbol = user['email'], market['symbol']
+
+    # 1. Credenciales (paper trading: basta con saber que existen, sin desencriptar)
+    with cycle_metrics.stage('credentials', symbol, user_email):
+        has_keys = db_manager.tiene_keys(user_email)
+    if not has_keys: return SKIPPED, f"Skipped {user_email}: No keys"
+
+    # Brackets anteriores (OCO): el simulador ya cancela la otra pata, aquí se cierra el grupo
+    with cycle_metrics.stage('reconcile', symbol, user_email):
+        paper_execution.reconcile(user_email)
+
+    # 2. Señal
+    with cycle_metrics.stage('signal', symbol, user_email):
+        rsi, price = market['rsi'], market['price']
+        signal = rsi_signal(rsi, BotConfig.rsi_oversold, BotConfig.rsi_overbought)
+
+    # 3. Ejecución (Paper Trading en el simulador: entrada + SL + TP)
+    if signal != TradingSignal.NEUTRAL:
+        with cycle_metrics.stage('execution', symbol, user_email):
+            paper_exchange.update_price(symbol, price)
+            side = 'buy' if signal == TradingSignal.BUY else 'sell'
+            sl, tp = strategy.protective_levels(price, strategy.BUY if side == 'buy' else strategy.SELL)
+            result = paper_execution.submit(OrderRequest(user_email, symbol, side,
+                                                         amount=BotConfig.min_trade_amount, price=price,
+                                                         stop_loss=sl, take_profit=tp))
+        if not result.ok:
+            cycle_metrics.error('execution', symbol, 'rejected')
+            return ERROR, f"Order failed for {user_email}: {result.error}"
+        logger.info(f"✅ [NUBE] SEÑAL {signal.value} EJECUTADA para {user_email} a ${result.order.get('average')}",
+                    extra={'dedup': False})
+        return PROCESSED, f"Executed {signal.value} for {user_email}"
     
-    # 1. Credenciales
-    creds = db_manager.obtener_credenciales_usuario(user_email)
-    if not creds: return f"Skipped {user_email}: No keys"
+    return PROCESSED, f"Neutral for {user_email} (RSI: {rsi:.2f})"
 
-    # 2. Datos Mercado
+def run_trading_cycle_for_user(user_email):
+    """Lógica del bot que se ejecuta en la nube (un solo usuario)"""
+    logger.info(f"🔄 Procesando {user_email}...")
     try:
-        ohlcv = exchange_public.fetch_ohlcv('BTC/USDT', '5m', 50)
-        closes = np.array([x[4] for x in ohlcv])
-        rsi = calculate_rsi(closes)
-        price = closes[-1]
-    except: return "Error fetching data"
-
-    # 3. Señal
-    signal = TradingSignal.NEUTRAL
-    if rsi < 30: signal = TradingSignal.BUY
-    elif rsi > 70: signal = TradingSignal.SELL
-
-    # 4. Ejecución (Paper Trading)
-    if signal != TradingSignal.NEUTRAL:
-        # Aquí iría la lógica real con ccxt.binance(apiKey...)
-        # Usamos Paper Trading para el log de Render
-        logger.info(f"✅ [NUBE] SEÑAL {signal.value} EJECUTADA para {user_email} a ${price}")
-        return f"Executed {signal.value} for {user_email}"
-    
-    return f"Neutral for {user_email} (RSI: {rsi:.2f})"
+        market = load_market_snapshot('BTC/USDT', '5m')
+    except Exception as e:
+        logger.error(f"Error datos para {user_email}: {e}")   # contado en nexus_cycle_errors (etapa market)
+        return "Error fetching data"
+    return evaluate_user_signal({"email": user_email}, market)[1]
+
+# Órdenes simuladas por el mismo camino que las reales (ExecutionService + PaperClient)
+paper_execution = paper_execution_service(paper_exchange)
+
+# Barrido de todos los usuarios activos: mercado una vez por par, usuarios en paralelo
+bot_scheduler = BotScheduler(
+    evaluate=evaluate_user_signal,
+    load_market=load_market_snapshot,
+    users=lambda: db_manager.iterar_usuarios_activos(BOT_BATCH_SIZE),
+    workers=BOT_WORKERS,
+    budget=BOT_CYCLE_BUDGET,
+)
+
+# Contadores que ya llevan los componentes: se leen solo al hacer scrape de /metrics
+for _prefix, _stats in (("nexus_candle_cache", lambda: candle_cache.stats),
+                        ("nexus_candle_store", lambda: candle_store.stats),
+                        ("nexus_ai", lambda: ai_service.stats),
+                        ("nexus_indicators", lambda: indicator_pipeline.stats),
+                        ("nexus_scheduler", lambda: bot_scheduler.stats),
+                        ("nexus_execution", lambda: execution_service.stats),
+                        ("nexus_execution_pool", lambda: execution_service.pool.stats),
+                        ("nexus_paper_execution", lambda: paper_execution.stats),
+                        ("nexus_paper_exchange", lambda: paper_exchange.stats),
+                        ("nexus_push", lambda: broadcaster.stats),
+                        ("nexus_logging", dedup_stats),
+                        ("nexus_auth_hash", lambda: password_hasher.stats),
+                        ("nexus_auth_sessions", lambda: session_signer.stats),
+                        ("nexus_stream", lambda: market_stream.stats if market_stream is not None else None),
+                        ("nexus_recorder", lambda: candle_recorder.stats if candle_recorder is not None else None)):
+    metrics_registry.add_stats(_prefix, _stats)
 
 # ==========================================
 # 📡 3. RUTAS (ENDPOINTS)
@@ -177,33 +253,38 @@ def run_trading_cycle_for_user(user_email):
 @app.get("/")
 def home(): return {"status": "ONLINE", "service": "Nexus AI Trading API"}
 
+@app.get("/api/health")
+def health():
+    """Estado de dependencias (ping a Mongo con latencia)."""
+    db = db_manager.health()
+    return {"status": "ONLINE" if db["ok"] else "DEGRADED", "db": db}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics(authorization: Optional[str] = Header(None)):
+    """Exposición Prometheus: tiempos por etapa/símbolo/usuario, errores y contadores de los componentes."""
+    if not scrape_allowed(bearer_token(authorization)):
+        raise HTTPException(403, detail="Métricas protegidas: Bearer NEXUS_METRICS_TOKEN")
+    return PlainTextResponse(metrics_registry.render(), media_type=METRICS_CONTENT_TYPE)
+
 @app.get("/api/bot/run-cycle")
 async def run_bot_cycle_endpoint():
     """CRON JOB llama a esto cada 5 minutos"""
-    print("--- 🤖 CRON: Iniciando Barrido de Usuarios ---")
-    
-    # En producción, haríamos: users = db_manager.users.find({})
-    users_to_run = ["ceo@nexus.com"] 
-    logs = []
-    
-    for email in users_to_run:
-        result = run_trading_cycle_for_user(email)
-        logs.append(result)
-        
-    return {"status": "success", "logs": logs}
+    logger.info("--- 🤖 CRON: Iniciando Barrido de Usuarios ---")
+    report = await asyncio.to_thread(bot_scheduler.run_cycle)
+    return {"status": "success", **report.to_dict()}
 
 @app.get("/api/market/btc")
 async def get_btc_data():
     try:
-        ticker = exchange_public.fetch_ticker('BTC/USDT')
+        # Ticker del stream si está fresco; REST solo como respaldo
+        ticker = ticker_store.get('BTC/USDT') or await exchange_async.fetch_ticker('BTC/USDT')
         price = ticker['last']
         change = ticker['percentage']
         
-        ohlcv = exchange_public.fetch_ohlcv('BTC/USDT', '1h', 20)
-        closes = np.array([x[4] for x in ohlcv])
-        rsi = calculate_rsi(closes)
+        ohlcv = await candle_cache.aget('BTC/USDT', '1h', 20)
+        rsi = rsi_from_ohlcv('BTC/USDT', '1h', ohlcv)
         
-        ai_msg = get_ai_analysis(price, change, rsi)
+        ai_msg = await get_ai_analysis(price, change, rsi)
         
         signal = "NEUTRAL"
         if rsi > 70: signal = "VENTA"
@@ -222,55 +303,183 @@ async def get_btc_data():
     except: return {"price": 0, "status": "ERROR"}
 
 @app.get("/api/market/candles")
-async def get_candles():
+async def get_candles(symbol: str = "BTC/USDT", timeframe: str = "1h", since: Optional[int] = None,
+                      until: Optional[int] = None, limit: int = 100, cursor: Optional[str] = None,
+                      format: str = "rows"):
+    """
+    Velas de `symbol`/`timeframe`. `since`/`until` en ms; sin ellos, las últimas `limit`.
+    La página siguiente (más antigua, o más reciente si se pidió `since`) va en la
+    cabecera X-Next-Cursor -> ?cursor=...
+    format=rows (por defecto): [{time, open, high, low, close}, ...] para lightweight-charts
+    format=columnar: {"time": [...], "open": [...], ...} (tiempo en segundos)
+    format=binary: columnas crudas little-endian (ver candles.Candles.to_bytes, tiempo en ms)
+    """
+    symbol = symbol.upper()
+    limit = max(1, min(limit, CANDLES_MAX_LIMIT))
+    next_cursor = None
+    try:
+        if since is None and until is None and cursor is None and limit <= candle_cache.capacity:
+            # Camino caliente: últimas velas desde memoria
+            ohlcv = await candle_cache.aget(symbol, timeframe, limit)
+            if len(ohlcv) == limit: next_cursor = encode_cursor('desc', int(ohlcv.timestamp[0]) - timeframe_to_ms(timeframe))
+        else:
+            # Histórico: disco (SQLite) + relleno por páginas de lo que falte
+            ohlcv, next_cursor = await asyncio.to_thread(candle_store.range, symbol, timeframe, since, until, limit, cursor)
+    except ValueError as e: raise HTTPException(400, detail=str(e))
+    except: ohlcv = Candles.empty()
+
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else {}
+    if format == "columnar":
+        return Response(ohlcv.to_json_columns('s'), media_type="application/json", headers=headers)
+    if format == "binary":
+        headers.update({"X-Candle-Count": str(len(ohlcv)), "X-Candle-Columns": ",".join(CANDLE_COLUMNS)})
+        return Response(ohlcv.to_bytes(), media_type="application/octet-stream", headers=headers)
+    return Response(json.dumps(ohlcv.to_chart(), separators=(',', ':')), media_type="application/json", headers=headers)
+
+async def fetch_tickers_bulk(symbols):
+    """
+    Tickers de varios pares en UNA llamada (fetch_tickers). Si el exchange la
+    rechaza, fan-out concurrente. Devuelve {símbolo: ticker | Exception}.
+    Los pares con ticker fresco del stream no tocan REST.
+    """
+    live = ticker_store.snapshot(symbols)
+    missing = [s for s in symbols if s not in live]
+    if not missing: return live
     try:
-        ohlcv = exchange_public.fetch_ohlcv('BTC/USDT', '1h', 100)
-        return [{"time": c[0]//1000, "open":c[1], "high":c[2], "low":c[3], "close":c[4]} for c in ohlcv]
-    except: return []
+        tickers = await exchange_async.fetch_tickers(missing)
+        return {**live, **{s: tickers.get(s) or KeyError(f"{s} sin ticker") for s in missing}}
+    except Exception as e:
+        logger.warning(f"fetch_tickers falló ({e}), usando fan-out por símbolo")
+
+    sem = asyncio.Semaphore(OVERVIEW_CONCURRENCY)
+    async def one(sym):
+        async with sem: return await exchange_async.fetch_ticker(sym)
+    results = await asyncio.gather(*(one(s) for s in missing), return_exceptions=True)
+    return {**live, **dict(zip(missing, results))}
 
 @app.get("/api/market/overview")
-async def get_market_overview():
+async def get_market_overview(symbols: Optional[str] = None):
+    """Resumen de mercado. `symbols` opcional: 'BTC/USDT,ETH/USDT,...'. Resultado parcial con estado por par."""
+    wanted = [s.strip().upper() for s in symbols.split(",") if s.strip()] if symbols else OVERVIEW_SYMBOLS
+    wanted = list(dict.fromkeys(wanted))[:OVERVIEW_MAX_SYMBOLS]
+    tickers = await fetch_tickers_bulk(wanted)
+
+    res = []
+    for sym in wanted:
+        t = tickers.get(sym)
+        if isinstance(t, BaseException) or t is None:
+            res.append({"symbol": sym.replace('/USDT',''), "price": None, "change": None, "volume": None,
+                        "status": "error", "error": str(t)})
+            continue
+        res.append({"symbol": sym.replace('/USDT',''), "price": t['last'], "change": t['percentage'],
+                    "volume": t['quoteVolume'], "status": "ok"})
+    return res
+
+# --- DIFUSIÓN EN VIVO (WebSocket / SSE) ---
+# Un productor para todos los navegadores: coste por símbolo, no por espectador
+broadcaster = MarketBroadcaster(
+    load_tickers=fetch_tickers_bulk,
+    live_tickers=ticker_store.snapshot,   # con NEXUS_STREAM no hay REST
+    load_candles=candle_cache.aget,
+    compute_rsi=rsi_from_ohlcv,
+    symbols=OVERVIEW_SYMBOLS,
+    charts=[('BTC/USDT', '1h')],
+    interval=PUSH_INTERVAL,
+)
+
+@app.websocket("/ws/market")
+async def market_ws(ws: WebSocket):
+    """Snapshot al conectar y después diffs compactos (precio, RSI, señal, velas)."""
+    await ws.accept()
+    sub = broadcaster.subscribe()
     try:
-        res = []
-        for sym in ['BTC/USDT', 'ETH/USDT', 'SOL/USDT', 'BNB/USDT', 'XRP/USDT']:
-            t = exchange_public.fetch_ticker(sym)
-            res.append({"symbol": sym.replace('/USDT',''), "price": t['last'], "change": t['percentage'], "volume": t['quoteVolume']})
-        return res
-    except: return []
+        while True:
+            await ws.send_text(await broadcaster.next_message(sub))
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        broadcaster.unsubscribe(sub)
+
+@app.get("/api/market/stream")
+async def market_sse(request: Request):
+    """Mismos mensajes que /ws/market por Server-Sent Events (proxies sin WebSocket)."""
+    sub = broadcaster.subscribe()
+
+    async def events():
+        try:
+            while not await request.is_disconnected():
+                try:
+                    msg = await asyncio.wait_for(broadcaster.next_message(sub), 15)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                yield f"data: {msg}\n\n"
+        finally:
+            broadcaster.unsubscribe(sub)
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 # --- USER & AUTH ---
+def session_response(email):
+    """Token firmado para las peticiones siguientes (Authorization: Bearer ...), sin Mongo ni hash."""
+    return {"email": email, "token": session_signer.issue(email), "token_type": "bearer",
+            "expires_in": session_signer.ttl}
+
+def session_payload(authorization: Optional[str]) -> dict:
+    payload = session_signer.verify(bearer_token(authorization) or "")
+    if payload is None: raise HTTPException(401, detail="Sesión no válida o caducada")
+    return payload
+
+def current_user(authorization: Optional[str] = Header(None)) -> str:
+    """Dependencia FastAPI (Depends(current_user)): email del token de sesión o 401."""
+    return session_payload(authorization)["sub"]
+
+def require_owner(email: str, user: str):
+    """Las rutas por usuario solo actúan sobre la cuenta del token (403 si el email es de otro)."""
+    if email != user: raise HTTPException(403, detail="No autorizado para este usuario")
+
 @app.post("/api/user/save-keys")
-def save_exchange_keys(payload: KeyPayload):
-    exito = db_manager.guardar_keys_binance(payload.email, payload.apiKey, payload.secretKey)
+async def save_exchange_keys(payload: KeyPayload, user: str = Depends(current_user)):
+    require_owner(payload.email, user)
+    exito = await db_manager.aguardar_keys_binance(payload.email, payload.apiKey, payload.secretKey)
     if exito: return {"status": "success"}
     raise HTTPException(500, "Error guardando claves")
 
 @app.get("/api/user/balance/{user_email}")
-async def get_user_balance(user_email: str):
-    # Simulación para evitar error -2008 en frontend público si claves fallan
-    # En prod real: usar lógica ccxt con claves
-    return {
-        "status": "success",
-        "total_balance_usd": 96350.50, # Simulado para UI
-        "assets": {"USDT": 24500, "BTC": 0.45},
-        "free_margin": 50000
-    }
-
-def verify_password(plain, hashed): return pwd_context.verify(plain, hashed)
+async def get_user_balance(user_email: str, user: str = Depends(current_user)):
+    require_owner(user_email, user)
+    # Cuenta del simulador (paper trading) valorada con el último ticker del stream
+    for symbol in paper_exchange.symbols(user_email):
+        ticker = ticker_store.get(symbol)
+        if ticker is not None and ticker.get('last'): paper_exchange.update_price(symbol, ticker['last'])
+    return {"status": "success", "mode": "paper", **paper_exchange.balance(user_email)}
 
 @app.post("/api/auth/register")
-def register(user: UserAuth):
-    hashed = pwd_context.hash(user.password)
-    exito, msg = db_manager.crear_usuario(user.email, hashed)
+async def register(user: UserAuth):
+    # pbkdf2 en el pool de procesos: no bloquea el loop ni los hilos de las rutas de mercado
+    hashed = await password_hasher.hash(user.password)
+    exito, msg = await db_manager.acrear_usuario(user.email, hashed)
     if not exito: raise HTTPException(400, detail=msg)
-    return {"status": "success"}
+    return {"status": "success", **session_response(user.email)}
 
 @app.post("/api/auth/login")
-def login(user: UserAuth):
-    u = db_manager.users.find_one({"email": user.email})
-    if not u or not verify_password(user.password, u['password']):
+async def login(user: UserAuth):
+    u = await db_manager.abuscar_usuario(user.email, {"_id": 0, "password": 1})
+    if not u or not await password_hasher.verify(user.password, u['password']):
         raise HTTPException(401, detail="Credenciales error")
-    return {"status": "success", "email": user.email}
+    return {"status": "success", **session_response(user.email)}
+
+@app.get("/api/auth/session")
+def session_info(authorization: Optional[str] = Header(None)):
+    """Valida el token (solo HMAC, sin E/S) y devuelve su contenido."""
+    payload = session_payload(authorization)
+    return {"status": "success", "email": payload["sub"], "expires_at": payload["exp"]}
+
+@app.post("/api/auth/refresh")
+def refresh_session(authorization: Optional[str] = Header(None)):
+    """Token nuevo a partir de uno válido (sin volver a enviar la contraseña)."""
+    return {"status": "success", **session_response(current_user(authorization))}
 
 @app.post("/api/ai/generate-strategy")
 def generate_strategy(request: StrategyRequest):
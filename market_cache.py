@@ -0,0 +1,264 @@
+"""
+Nexus Market Cache - Almacén de velas OHLCV en memoria.
+Una entrada por (símbolo, timeframe) con buffer circular de las últimas N velas,
+caducidad al cierre de la vela en curso y single-flight: N peticiones simultáneas
+a una clave caducada provocan UNA sola llamada al exchange.
+Si llegan velas por WebSocket (market_stream), la entrada se mantiene viva sin REST.
+"""
+
+import time
+import asyncio
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+from candles import Candles, CandleBuffer
+from nexus_core.lazy import lazy_import
+
+ccxt = lazy_import('ccxt')   # solo si no se inyecta un exchange (main.py / tests)
+
+_UNIT_MS = {'s': 1000, 'm': 60_000, 'h': 3_600_000, 'd': 86_400_000, 'w': 604_800_000, 'M': 2_592_000_000}
+
+
+def timeframe_to_ms(timeframe: str) -> int:
+    """'5m' -> 300000. Mismo formato de timeframe que ccxt."""
+    try:
+        return int(timeframe[:-1]) * _UNIT_MS[timeframe[-1]]
+    except (KeyError, ValueError):
+        raise ValueError(f"Timeframe no válido: {timeframe}")
+
+
+def next_bar_close_ms(timeframe: str, now_ms: Optional[int] = None) -> int:
+    """Instante (ms) en que cierra la vela en curso."""
+    tf_ms = timeframe_to_ms(timeframe)
+    now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+    return (now_ms // tf_ms + 1) * tf_ms
+
+
+class _Entry:
+    __slots__ = ('rows', 'expires_at', 'depth', 'live_until')
+
+    def __init__(self, capacity: int):
+        self.rows = CandleBuffer(capacity)   # buffer circular columnar [ts, o, h, l, c, v]
+        self.expires_at = 0.0                # epoch en segundos
+        self.depth = 0                       # mayor `limit` ya servido para esta clave
+        self.live_until = 0.0                # vigente mientras el stream siga enviando velas
+
+
+class _InFlight:
+    __slots__ = ('event', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.error: Optional[BaseException] = None
+
+
+class CandleCache:
+    """Caché OHLCV compartida por la API y el bot."""
+
+    def __init__(self, exchange=None, capacity: int = 500, close_grace: float = 1.0, wait_timeout: float = 15.0,
+                 async_exchange=None, live_ttl: float = 30.0):
+        self._exchange = exchange
+        self.async_exchange = async_exchange  # ccxt.async_support para las rutas async
+        self.capacity = capacity
+        self.close_grace = close_grace      # margen para que el exchange cierre la vela
+        self.wait_timeout = wait_timeout
+        self.live_ttl = live_ttl            # sin mensajes del stream en este tiempo -> vuelta a REST
+        self._entries: Dict[Tuple[str, str], _Entry] = {}
+        self._inflight: Dict[Tuple[str, str], _InFlight] = {}
+        self._ainflight: Dict[Tuple[str, str], asyncio.Future] = {}
+        self._lock = threading.Lock()
+        self._listeners: List[Callable[[str, str, Candles], None]] = []
+        self.stats = {'hits': 0, 'misses': 0, 'fetches': 0, 'errors': 0, 'stream_updates': 0}
+
+    @property
+    def exchange(self):
+        # Cliente público creado en el primer uso (solo lectura)
+        if self._exchange is None:
+            self._exchange = ccxt.binance({'enableRateLimit': True})
+        return self._exchange
+
+    @exchange.setter
+    def exchange(self, value):
+        self._exchange = value
+
+    # --- LECTURA ---
+    def _fresh(self, key: Tuple[str, str], limit: int) -> Optional[Candles]:
+        """Velas en memoria si siguen vigentes (llamar con el lock tomado)."""
+        entry = self._entries.get(key)
+        now = time.time()
+        if entry is not None and (now < entry.expires_at or now < entry.live_until) \
+                and entry.depth >= min(limit, self.capacity):
+            self.stats['hits'] += 1
+            return self._tail(entry, limit)
+        self.stats['misses'] += 1
+        return None
+
+    def get(self, symbol: str, timeframe: str, limit: int = 100) -> Candles:
+        """Últimas `limit` velas. Desde memoria si la vela en curso no ha cerrado."""
+        key = (symbol, timeframe)
+        while True:
+            with self._lock:
+                rows = self._fresh(key, limit)
+                if rows is not None: return rows
+                call = self._inflight.get(key)
+                leader = call is None
+                if leader:
+                    call = self._inflight[key] = _InFlight()
+
+            if leader:
+                try:
+                    plan = self._plan(key, limit)
+                    self._store(key, self.exchange.fetch_ohlcv(symbol, timeframe, plan[0], plan[1]), *plan)
+                except BaseException as e:
+                    call.error = e
+                    with self._lock: self.stats['errors'] += 1
+                    raise
+                finally:
+                    with self._lock: self._inflight.pop(key, None)
+                    call.event.set()
+                with self._lock:
+                    return self._tail(self._entries[key], limit)
+
+            if not call.event.wait(self.wait_timeout):
+                raise TimeoutError(f"Timeout esperando velas de {symbol} {timeframe}")
+            if call.error is not None: raise call.error
+            with self._lock:
+                rows = self._served(key, limit)
+                if rows is not None: return rows
+            # El líder pidió menos velas de las que necesitamos: otra vuelta (como líder si nadie descarga)
+
+    async def aget(self, symbol: str, timeframe: str, limit: int = 100) -> Candles:
+        """Versión async de get(): no bloquea el event loop y comparte el mismo buffer."""
+        key = (symbol, timeframe)
+        while True:
+            with self._lock:
+                rows = self._fresh(key, limit)
+                if rows is not None: return rows
+
+            fut = self._ainflight.get(key)
+            if fut is None:
+                fut = self._ainflight[key] = asyncio.get_running_loop().create_future()
+                try:
+                    plan = self._plan(key, limit)
+                    exchange = self.async_exchange
+                    if exchange is None:
+                        rows = await asyncio.to_thread(self.exchange.fetch_ohlcv, symbol, timeframe, plan[0], plan[1])
+                    else:
+                        rows = await exchange.fetch_ohlcv(symbol, timeframe, plan[0], plan[1])
+                    self._store(key, rows, *plan)
+                    fut.set_result(None)
+                except BaseException as e:
+                    with self._lock: self.stats['errors'] += 1
+                    fut.set_exception(e)
+                    fut.exception()  # marcado como recuperado si nadie más espera
+                    raise
+                finally:
+                    self._ainflight.pop(key, None)
+                with self._lock:
+                    return self._tail(self._entries[key], limit)
+
+            await asyncio.shield(fut)
+            with self._lock:
+                rows = self._served(key, limit)
+                if rows is not None: return rows
+
+    def _served(self, key: Tuple[str, str], limit: int) -> Optional[Candles]:
+        """Tras esperar a otro líder: sus velas si cubren `limit` (llamar con el lock tomado)."""
+        entry = self._entries.get(key)
+        if entry is None or entry.depth < min(limit, self.capacity): return None
+        return self._tail(entry, limit)
+
+    def _tail(self, entry: _Entry, limit: int) -> Candles:
+        return entry.rows.tail(limit)
+
+    # --- DESCARGA ---
+    def _plan(self, key: Tuple[str, str], limit: int):
+        """(since, fetch_limit, incremental, now_ms) para la próxima descarga."""
+        tf_ms = timeframe_to_ms(key[1])
+        with self._lock:
+            entry = self._entries.get(key)
+            last_ts = entry.rows.last_ts if entry is not None else None
+            have = entry.depth if entry is not None else 0
+
+        now_ms = int(time.time() * 1000)
+        fetch_limit = min(max(limit, have), self.capacity)
+        incremental = last_ts is not None and have >= limit and (now_ms - last_ts) // tf_ms < fetch_limit
+        # Incremental: solo las velas desde la última conocida (la última se re-escribe)
+        since = last_ts if incremental else None
+        return since, fetch_limit, incremental, now_ms
+
+    def _store(self, key: Tuple[str, str], rows, since, fetch_limit: int, incremental: bool, now_ms: int):
+        candles = Candles.from_rows(rows)   # conversión a columnas fuera del lock
+        with self._lock:
+            self.stats['fetches'] += 1
+            entry = self._entries.get(key)
+            if entry is None or not incremental:
+                live_until = entry.live_until if entry is not None else 0.0
+                entry = self._entries[key] = _Entry(self.capacity)
+                entry.live_until = live_until
+            if len(candles):
+                entry.rows.truncate_from(int(candles.timestamp[0]))
+                entry.rows.extend(candles)
+            entry.depth = len(entry.rows)   # lo que hay de verdad, no lo pedido
+            entry.expires_at = next_bar_close_ms(key[1], now_ms) / 1000 + self.close_grace
+        self.publish(key[0], key[1], candles)
+
+    # --- OYENTES (p.ej. candle_archive.CandleRecorder) ---
+    def add_listener(self, fn: Callable[[str, str, Candles], None]):
+        """fn(symbol, timeframe, candles) tras cada descarga del exchange o vela del stream. Debe ser rápido."""
+        if fn not in self._listeners: self._listeners.append(fn)
+
+    def remove_listener(self, fn: Callable[[str, str, Candles], None]):
+        if fn in self._listeners: self._listeners.remove(fn)
+
+    def publish(self, symbol: str, timeframe: str, candles: Candles):
+        if not len(candles): return
+        for fn in list(self._listeners):
+            try:
+                fn(symbol, timeframe, candles)
+            except Exception:
+                pass   # un oyente roto no debe romper la descarga
+
+    # --- STREAM ---
+    def apply_candle(self, symbol: str, timeframe: str, row: list) -> bool:
+        """
+        Vela [ts, o, h, l, c, v] recibida por WebSocket: re-escribe la vela en curso o
+        añade la nueva. Si detecta un hueco, deja la entrada caducada para que el
+        próximo get() lo rellene por REST (incremental). Devuelve False si la descarta.
+        """
+        key = (symbol, timeframe)
+        with self._lock:
+            self.stats['stream_updates'] += 1
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _Entry(self.capacity)
+            rows = entry.rows
+            ts, last_ts = row[0], rows.last_ts
+            if ts == last_ts:
+                rows.replace_last(row)
+            elif last_ts is None or ts > last_ts:
+                if last_ts is not None and ts - last_ts > timeframe_to_ms(timeframe):
+                    entry.live_until = entry.expires_at = 0.0   # hueco: REST incremental desde la última
+                    return False
+                rows.append(row)
+            else:
+                return False                                     # vela antigua fuera de orden
+            entry.live_until = time.time() + self.live_ttl
+        if self._listeners: self.publish(symbol, timeframe, Candles.from_rows([row]))
+        return True
+
+    def is_live(self, symbol: str, timeframe: str) -> bool:
+        entry = self._entries.get((symbol, timeframe))
+        return entry is not None and time.time() < entry.live_until
+
+    # --- MANTENIMIENTO ---
+    def invalidate(self, symbol: Optional[str] = None, timeframe: Optional[str] = None):
+        with self._lock:
+            if symbol is None:
+                self._entries.clear()
+            else:
+                self._entries.pop((symbol, timeframe), None)
+
+
+# Instancia compartida (main.py y bot_executor.py)
+candle_cache = CandleCache()
@@ -0,0 +1,206 @@
+"""
+Nexus Market Push - Difusión en vivo para el dashboard (WebSocket / SSE).
+UN productor compartido lee cada `interval` segundos de las cachés (ticker_store,
+candle_cache) y publica solo lo que cambió; cada mensaje se serializa una vez y se
+reparte a todas las colas. La carga crece con los símbolos, no con los espectadores.
+Solo corre con suscriptores; los tickers que el stream no tiene frescos van a REST
+como mucho cada `rest_interval` segundos.
+
+Mensajes (JSON compacto):
+  {"type": "snapshot", "seq": n, "tickers": {...}, "signals": {...}, "candles": {"BTC/USDT|1h": [[t,o,h,l,c], ...]}}
+  {"type": "diff", "seq": n, "tickers": {"BTC/USDT": {"p": 65010.5}}, "candles": {"BTC/USDT|1h": [[t,o,h,l,c]]}}
+  tickers: p=precio, c=variación 24h %, v=volumen  ·  signals: r=RSI, s=señal
+"""
+
+import json
+import time
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from candles import Candles
+
+logger = logging.getLogger('NexusPush')
+
+CandleKey = Tuple[str, str]
+
+
+def signal_label(rsi: float) -> str:
+    """Mismo texto que /api/market/btc."""
+    if rsi > 70: return "VENTA"
+    if rsi < 30: return "COMPRA"
+    return "NEUTRAL"
+
+
+def _dumps(msg: dict) -> str:
+    return json.dumps(msg, separators=(',', ':'))
+
+
+class Subscriber:
+    """Cola acotada por cliente. Si se llena (cliente lento) se vacía y se le reenvía un snapshot."""
+    __slots__ = ('queue', 'resync')
+
+    def __init__(self, maxsize: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self.resync = False
+
+
+class MarketBroadcaster:
+    """
+    load_tickers(symbols) -> {símbolo: ticker ccxt | Exception}   (REST)
+    live_tickers(symbols) -> {símbolo: ticker} solo los frescos en memoria (ticker_store.snapshot)
+    load_candles(symbol, timeframe, limit) -> Candles (columnas)
+    compute_rsi(symbol, timeframe, ohlcv) -> float
+    """
+
+    def __init__(self, load_tickers: Callable[[List[str]], Awaitable[Dict[str, Any]]],
+                 load_candles: Callable[[str, str, int], Awaitable[Candles]],
+                 compute_rsi: Callable[[str, str, Candles], float],
+                 symbols: Iterable[str], charts: Iterable[CandleKey] = (('BTC/USDT', '1h'),),
+                 interval: float = 1.0, candle_limit: int = 100, queue_size: int = 64,
+                 live_tickers: Optional[Callable[[List[str]], Dict[str, Any]]] = None, rest_interval: float = 5.0):
+        self.load_tickers = load_tickers
+        self.live_tickers = live_tickers
+        self.rest_interval = rest_interval
+        self._next_rest = 0.0
+        self.load_candles = load_candles
+        self.compute_rsi = compute_rsi
+        self.symbols = list(dict.fromkeys(symbols))
+        self.charts = list(dict.fromkeys(charts))
+        self.interval = interval
+        self.candle_limit = candle_limit
+        self.queue_size = queue_size
+        self._subs: Set[Subscriber] = set()
+        self._task: Optional[asyncio.Task] = None
+        self.seq = 0
+        # Último estado publicado (base de los diffs)
+        self.tickers: Dict[str, Dict[str, Any]] = {}
+        self.signals: Dict[str, Dict[str, Any]] = {}
+        self.candles: Dict[str, List[list]] = {}
+        self.stats = {'ticks': 0, 'messages': 0, 'deliveries': 0, 'resyncs': 0, 'errors': 0, 'rest_polls': 0}
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._subs)
+
+    # --- SUSCRIPCIÓN ---
+    def subscribe(self) -> Subscriber:
+        sub = Subscriber(self.queue_size)
+        sub.queue.put_nowait(self.snapshot())
+        self._subs.add(sub)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._produce())
+        return sub
+
+    def unsubscribe(self, sub: Subscriber):
+        self._subs.discard(sub)
+
+    async def next_message(self, sub: Subscriber) -> str:
+        msg = await sub.queue.get()
+        if sub.resync:
+            # Cola desbordada: descartamos lo pendiente y mandamos el estado completo
+            while not sub.queue.empty(): sub.queue.get_nowait()
+            sub.resync = False
+            self.stats['resyncs'] += 1
+            return self.snapshot()
+        return msg
+
+    def snapshot(self) -> str:
+        return _dumps({'type': 'snapshot', 'seq': self.seq, 'tickers': self.tickers,
+                       'signals': self.signals, 'candles': self.candles})
+
+    def _publish(self, msg: dict):
+        data = _dumps(msg)   # una serialización para todos
+        self.stats['messages'] += 1
+        for sub in self._subs:
+            try:
+                sub.queue.put_nowait(data)
+                self.stats['deliveries'] += 1
+            except asyncio.QueueFull:
+                sub.resync = True
+
+    # --- PRODUCTOR ---
+    async def _produce(self):
+        logger.info("📣 Productor de mercado en vivo iniciado")
+        try:
+            while self._subs:
+                try:
+                    diff = await self.tick()
+                    if diff: self._publish(diff)
+                except Exception as e:
+                    self.stats['errors'] += 1
+                    logger.warning(f"Tick de difusión fallido: {e}")
+                await asyncio.sleep(self.interval)
+        finally:
+            logger.info("📣 Productor de mercado en vivo detenido (sin suscriptores)")
+
+    async def tick(self) -> Optional[dict]:
+        """Lee las fuentes una vez y devuelve el diff frente al último estado (o None)."""
+        self.stats['ticks'] += 1
+        tickers, signals, candles = {}, {}, {}
+
+        loaded = await self._tickers()
+        for sym in self.symbols:
+            t = loaded.get(sym)
+            if t is None or isinstance(t, BaseException): continue
+            new = {'p': t.get('last'), 'c': t.get('percentage'), 'v': t.get('quoteVolume')}
+            changed = _changed(self.tickers.get(sym), new)
+            if changed:
+                self.tickers.setdefault(sym, {}).update(changed)
+                tickers[sym] = changed
+
+        results = await asyncio.gather(*(self.load_candles(s, tf, self.candle_limit) for s, tf in self.charts),
+                                       return_exceptions=True)
+        for (sym, tf), ohlcv in zip(self.charts, results):
+            if isinstance(ohlcv, BaseException) or not len(ohlcv): continue
+            key = f"{sym}|{tf}"
+            delta = self._candle_delta(key, ohlcv)
+            if delta: candles[key] = delta
+
+            rsi = round(float(self.compute_rsi(sym, tf, ohlcv)), 2)
+            new = {'r': rsi, 's': signal_label(rsi)}
+            changed = _changed(self.signals.get(sym), new)
+            if changed:
+                self.signals.setdefault(sym, {}).update(changed)
+                signals[sym] = changed
+
+        if not (tickers or signals or candles): return None
+        self.seq += 1
+        msg = {'type': 'diff', 'seq': self.seq}
+        if tickers: msg['tickers'] = tickers
+        if signals: msg['signals'] = signals
+        if candles: msg['candles'] = candles
+        return msg
+
+    async def _tickers(self) -> Dict[str, Any]:
+        """Tickers del stream en memoria; REST solo para los que faltan y sin bajar de `rest_interval`."""
+        loaded = dict(self.live_tickers(self.symbols)) if self.live_tickers is not None else {}
+        missing = [s for s in self.symbols if s not in loaded]
+        now = time.monotonic()
+        if missing and now >= self._next_rest:
+            self._next_rest = now + self.rest_interval
+            self.stats['rest_polls'] += 1
+            loaded.update(await self.load_tickers(missing))
+        return loaded
+
+    def _candle_delta(self, key: str, ohlcv: Candles) -> List[list]:
+        """Velas nuevas o modificadas desde el último envío ([t(s), o, h, l, c])."""
+        rows = [list(r) for r in zip((ohlcv.timestamp // 1000).tolist(), ohlcv.open.tolist(), ohlcv.high.tolist(),
+                                     ohlcv.low.tolist(), ohlcv.close.tolist())]
+        prev = self.candles.get(key)
+        self.candles[key] = rows
+        if not prev: return rows
+        last_t = prev[-1][0]
+        known = {r[0]: r for r in prev[-3:]}
+        return [r for r in rows if r[0] > last_t or (r[0] in known and known[r[0]] != r)]
+
+    async def close(self):
+        self._subs.clear()
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+
+def _changed(old: Optional[dict], new: dict) -> dict:
+    if old is None: return {k: v for k, v in new.items() if v is not None}
+    return {k: v for k, v in new.items() if v is not None and old.get(k) != v}
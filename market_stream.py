@@ -0,0 +1,233 @@
+"""
+Nexus Market Stream - Ingesta de mercado por WebSocket (streams combinados de Binance).
+Se suscribe a velas (kline) y tickers de cada par y los vuelca en memoria:
+  - velas -> market_cache.candle_cache (buffer circular por símbolo/timeframe)
+  - ticker / último trade -> ticker_store
+Las rutas, el scheduler y el bot leen de ahí: sin REST en el camino de decisión
+mientras el stream esté vivo (si se corta, la caché vuelve sola a REST).
+"""
+
+import json
+import time
+import random
+import asyncio
+import logging
+import threading
+from typing import Dict, Iterable, List, Optional
+
+from market_cache import candle_cache, CandleCache
+from nexus_core.lazy import lazy_import
+
+aiohttp = lazy_import('aiohttp')   # se carga al abrir la conexión
+
+logger = logging.getLogger('NexusStream')
+
+BINANCE_WS_URL = "wss://stream.binance.com:9443/stream"
+STREAMS_PER_CONNECTION = 200   # Binance admite hasta 1024 por conexión
+SEED_CONCURRENCY = 10
+
+
+def stream_symbol(symbol: str) -> str:
+    """'BTC/USDT' -> 'btcusdt' (formato de los nombres de stream)."""
+    return symbol.replace('/', '').lower()
+
+
+class TickerStore:
+    """Último ticker y último trade por símbolo, con la forma de ccxt (last, percentage, quoteVolume...)."""
+
+    def __init__(self, max_age: float = 30.0):
+        self.max_age = max_age
+        self._tickers: Dict[str, dict] = {}
+        self._trades: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def update(self, symbol: str, ticker: dict):
+        ticker['received'] = time.time()
+        with self._lock: self._tickers[symbol] = ticker
+
+    def update_trade(self, symbol: str, trade: dict):
+        trade['received'] = time.time()
+        with self._lock:
+            self._trades[symbol] = trade
+            t = self._tickers.get(symbol)
+            if t is not None: t['last'] = trade['price']
+
+    def get(self, symbol: str, max_age: Optional[float] = None) -> Optional[dict]:
+        """Ticker si es reciente (None si no hay o está viejo: toca REST)."""
+        t = self._tickers.get(symbol)
+        max_age = self.max_age if max_age is None else max_age
+        if t is None or time.time() - t['received'] > max_age: return None
+        return t
+
+    def last_trade(self, symbol: str) -> Optional[dict]:
+        return self._trades.get(symbol)
+
+    def snapshot(self, symbols: Iterable[str], max_age: Optional[float] = None) -> Dict[str, dict]:
+        """{símbolo: ticker} solo de los que están frescos."""
+        out = {}
+        for s in symbols:
+            t = self.get(s, max_age)
+            if t is not None: out[s] = t
+        return out
+
+    def clear(self):
+        with self._lock:
+            self._tickers.clear()
+            self._trades.clear()
+
+
+class MarketStream:
+    """
+    Suscripción a `symbols` x `timeframes` (+ ticker por símbolo, + aggTrade opcional).
+    Reparte los streams en varias conexiones y reconecta con backoff exponencial.
+    """
+
+    def __init__(self, symbols: Iterable[str], timeframes: Iterable[str] = ('5m',), url: str = BINANCE_WS_URL,
+                 cache: CandleCache = candle_cache, tickers: Optional[TickerStore] = None,
+                 trades: bool = False, seed_limit: Optional[int] = 100,
+                 streams_per_connection: int = STREAMS_PER_CONNECTION, max_backoff: float = 30.0):
+        self.symbols = list(dict.fromkeys(symbols))
+        self.timeframes = list(dict.fromkeys(timeframes))
+        self.url = url
+        self.cache = cache
+        self.tickers = tickers if tickers is not None else ticker_store
+        self.trades = trades
+        self.seed_limit = seed_limit
+        self.streams_per_connection = streams_per_connection
+        self.max_backoff = max_backoff
+        self._by_stream = {stream_symbol(s): s for s in self.symbols}
+        self._tasks: List[asyncio.Task] = []
+        self._thread: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.stats = {'messages': 0, 'candles': 0, 'tickers': 0, 'trades': 0, 'reconnects': 0, 'errors': 0}
+
+    def streams(self) -> List[str]:
+        names = []
+        for sym in self.symbols:
+            s = stream_symbol(sym)
+            names += [f"{s}@kline_{tf}" for tf in self.timeframes]
+            names.append(f"{s}@ticker")
+            if self.trades: names.append(f"{s}@aggTrade")
+        return names
+
+    # --- MENSAJES ---
+    def handle(self, payload: dict):
+        """Un mensaje del stream combinado: {"stream": ..., "data": {...}}."""
+        data = payload.get('data', payload)
+        event = data.get('e')
+        symbol = self._by_stream.get(str(data.get('s', '')).lower())
+        if symbol is None: return
+        self.stats['messages'] += 1
+
+        if event == 'kline':
+            k = data['k']
+            row = [int(k['t']), float(k['o']), float(k['h']), float(k['l']), float(k['c']), float(k['v'])]
+            self.cache.apply_candle(symbol, k['i'], row)
+            self.stats['candles'] += 1
+        elif event == '24hrTicker':
+            self.tickers.update(symbol, {
+                'symbol': symbol, 'last': float(data['c']), 'percentage': float(data['P']),
+                'quoteVolume': float(data['q']), 'bid': float(data.get('b') or 0) or None,
+                'ask': float(data.get('a') or 0) or None, 'timestamp': int(data['E']),
+            })
+            self.stats['tickers'] += 1
+        elif event == 'aggTrade':
+            self.tickers.update_trade(symbol, {'price': float(data['p']), 'amount': float(data['q']),
+                                               'timestamp': int(data['T'])})
+            self.stats['trades'] += 1
+
+    # --- CONEXIONES ---
+    async def _seed(self):
+        """Histórico inicial por REST (una vez) para que los buffers tengan profundidad."""
+        if not self.seed_limit: return
+        sem = asyncio.Semaphore(SEED_CONCURRENCY)
+
+        async def one(sym, tf):
+            async with sem:
+                try:
+                    await self.cache.aget(sym, tf, self.seed_limit)
+                except Exception as e:
+                    logger.warning(f"Sin histórico inicial para {sym} {tf}: {e}")
+
+        await asyncio.gather(*(one(s, tf) for s in self.symbols for tf in self.timeframes))
+
+    async def _connection(self, session: 'aiohttp.ClientSession', streams: List[str]):
+        url = f"{self.url}?streams={'/'.join(streams)}"
+        backoff = 1.0
+        while True:
+            try:
+                async with session.ws_connect(url, heartbeat=20) as ws:
+                    backoff = 1.0
+                    async for msg in ws:
+                        if msg.type == aiohttp.WSMsgType.TEXT:
+                            try:
+                                self.handle(json.loads(msg.data))
+                            except (KeyError, ValueError, TypeError) as e:
+                                self.stats['errors'] += 1
+                                logger.debug(f"Mensaje no válido: {e}")
+                        elif msg.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                            break
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"WebSocket caído ({len(streams)} streams): {e}")
+            self.stats['reconnects'] += 1
+            await asyncio.sleep(backoff * (0.5 + random.random()))
+            backoff = min(backoff * 2, self.max_backoff)
+
+    async def run(self):
+        """Siembra el histórico y mantiene las conexiones hasta que se cancele."""
+        streams = self.streams()
+        chunks = [streams[i:i + self.streams_per_connection]
+                  for i in range(0, len(streams), self.streams_per_connection)]
+        logger.info(f"📡 Stream de mercado: {len(self.symbols)} pares, {len(streams)} streams, {len(chunks)} conexiones")
+        async with aiohttp.ClientSession() as session:
+            # Conectar antes de sembrar: las velas que lleguen mientras tanto no se pierden
+            tasks = [asyncio.create_task(self._connection(session, c)) for c in chunks]
+            try:
+                await self._seed()
+                await asyncio.gather(*tasks)
+            finally:
+                for t in tasks: t.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+    # --- CICLO DE VIDA ---
+    def start(self) -> asyncio.Task:
+        """Dentro de un event loop (lifespan de FastAPI)."""
+        task = asyncio.create_task(self.run())
+        self._tasks.append(task)
+        return task
+
+    async def stop(self):
+        for t in self._tasks: t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    def start_in_thread(self) -> threading.Thread:
+        """Para procesos sin event loop (bot_executor): loop propio en un hilo daemon."""
+        def runner():
+            self._loop = asyncio.new_event_loop()
+            try:
+                self._loop.run_until_complete(self._run_until_stopped())
+            finally:
+                self._loop.close()
+
+        self._thread = threading.Thread(target=runner, name='nexus-market-stream', daemon=True)
+        self._thread.start()
+        return self._thread
+
+    async def _run_until_stopped(self):
+        task = self.start()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    def stop_thread(self, timeout: float = 5.0):
+        if self._loop is not None and self._thread is not None:
+            for t in list(self._tasks): self._loop.call_soon_threadsafe(t.cancel)
+            self._thread.join(timeout)
+
+
+# Último ticker por símbolo compartido (API y bot)
+ticker_store = TickerStore()
@@ -0,0 +1,276 @@
+"""
+Nexus Metrics - Instrumentación siempre activa del ciclo de trading y exportación Prometheus.
+  - histogramas de tiempo por etapa (credenciales, mercado, señal, ejecución) y símbolo
+  - resumen por usuario (suma/cuenta/máximo) acotado por LRU para no disparar la cardinalidad;
+    la etiqueta `user` es un seudónimo (HMAC con clave propia), nunca el email
+  - errores por etapa y los `stats` que ya llevan la caché, el pool de órdenes, la IA, etc.
+Registrar una observación es un bisect y unas sumas bajo un lock: barato para cada usuario y ciclo.
+Los contadores de los componentes se leen solo al hacer scrape de /metrics (coste cero al registrar).
+"""
+
+import hashlib
+import hmac
+import os
+import secrets
+import time
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+
+# ==========================================
+# ⚙️ 1. CONFIGURACIÓN
+# ==========================================
+METRICS_ENABLED = os.getenv("NEXUS_METRICS", "1").lower() in ("1", "true", "yes")
+METRICS_MAX_USERS = int(os.getenv("NEXUS_METRICS_MAX_USERS", 1000))   # usuarios con resumen propio (LRU)
+# Segundos: de lecturas en memoria (<1 ms) a llamadas REST lentas
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STAGES = ('credentials', 'market', 'reconcile', 'signal', 'execution')
+# Clave de los seudónimos de usuario: fijarla para que sean estables entre reinicios y workers
+METRICS_USER_KEY = os.getenv("NEXUS_METRICS_USER_KEY", "").encode() or secrets.token_bytes(32)
+# Bearer exigido en /metrics; sin él el endpoint queda cerrado
+METRICS_TOKEN = os.getenv("NEXUS_METRICS_TOKEN")
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _fmt(value: float) -> str:
+    if value == float('inf'): return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def pseudonym(user: str, key: bytes = METRICS_USER_KEY) -> str:
+    """Etiqueta `user` exportada: HMAC-SHA256 truncado (correlacionable con la clave, no reversible)."""
+    return hmac.new(key, user.encode(), hashlib.sha256).hexdigest()[:16]
+
+
+def scrape_allowed(token: Optional[str], expected: Optional[str] = METRICS_TOKEN) -> bool:
+    """¿Puede este Bearer leer /metrics? Sin NEXUS_METRICS_TOKEN configurado, nadie."""
+    return bool(expected) and token is not None and hmac.compare_digest(token.encode(), expected.encode())
+
+
+def _labels(names: Iterable[str], values: Iterable, extra: str = '') -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra: parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+# ==========================================
+# 📊 2. MÉTRICAS
+# ==========================================
+
+class Counter:
+    """Contador monótono con etiquetas."""
+    kind = 'counter'
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name, self.help, self.label_names = name, help, labels
+        self._values: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, value: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + value
+
+    def value(self, *labels) -> float:
+        return self._values.get(labels, 0)
+
+    def render(self) -> List[str]:
+        with self._lock: items = list(self._values.items())
+        return [f'{self.name}_total{_labels(self.label_names, k)} {_fmt(v)}' for k, v in items]
+
+
+class Histogram:
+    """Histograma acumulativo al estilo Prometheus (cubos fijos, suma y cuenta por etiquetas)."""
+    kind = 'histogram'
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name, self.help, self.label_names = name, help, labels
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Labels, list] = {}   # etiquetas -> [cuentas por cubo (+Inf al final), suma]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][i] += 1
+            series[1] += value
+
+    def count(self, *labels) -> int:
+        series = self._series.get(labels)
+        return sum(series[0]) if series else 0
+
+    def render(self) -> List[str]:
+        with self._lock: items = [(k, list(v[0]), v[1]) for k, v in self._series.items()]
+        lines = []
+        for key, counts, total in items:
+            acc = 0
+            for le, n in zip(self.buckets + (float('inf'),), counts):
+                acc += n
+                bound = 'le="%s"' % _fmt(le)
+                lines.append(f'{self.name}_bucket{_labels(self.label_names, key, bound)} {acc}')
+            lines.append(f'{self.name}_sum{_labels(self.label_names, key)} {_fmt(total)}')
+            lines.append(f'{self.name}_count{_labels(self.label_names, key)} {acc}')
+        return lines
+
+
+class UserSummary:
+    """Suma/cuenta/máximo por (usuario, etapa). Solo los `max_users` más recientes (LRU)."""
+    kind = 'summary'
+
+    def __init__(self, name: str, help: str, max_users: int = METRICS_MAX_USERS, user_key: bytes = METRICS_USER_KEY):
+        self.name, self.help = name, help
+        self.max_users = max_users
+        self.user_key = user_key
+        self._users: 'OrderedDict[str, Dict[str, list]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.evicted = 0
+
+    def observe(self, user: str, stage: str, value: float):
+        if self.max_users <= 0: return
+        with self._lock:
+            stages = self._users.get(user)
+            if stages is None:
+                if len(self._users) >= self.max_users:
+                    self._users.popitem(last=False)
+                    self.evicted += 1
+                stages = self._users[user] = {}
+            else:
+                self._users.move_to_end(user)
+            s = stages.get(stage)
+            if s is None: stages[stage] = [1, value, value]
+            else:
+                s[0] += 1
+                s[1] += value
+                if value > s[2]: s[2] = value
+
+    def get(self, user: str) -> Dict[str, Dict[str, float]]:
+        with self._lock: stages = dict(self._users.get(user, {}))
+        return {st: {'count': c, 'sum': s, 'max': m} for st, (c, s, m) in stages.items()}
+
+    def render(self) -> List[str]:
+        with self._lock: items = [(u, {st: list(v) for st, v in stages.items()}) for u, stages in self._users.items()]
+        lines, peaks = [], []
+        for user, stages in items:
+            for stage, (count, total, peak) in stages.items():
+                lbl = _labels(('user', 'stage'), (pseudonym(user, self.user_key), stage))
+                lines.append(f'{self.name}_sum{lbl} {_fmt(total)}')
+                lines.append(f'{self.name}_count{lbl} {count}')
+                peaks.append(f'{self.name}_max{lbl} {_fmt(peak)}')
+        # El máximo va como gauge aparte (un summary solo admite _sum/_count/cuantiles)
+        return lines + [f'# HELP {self.name}_max Máximo por usuario y etapa', f'# TYPE {self.name}_max gauge'] + peaks
+
+
+class Registry:
+    """Métricas propias + fuentes de `stats` externas (dicts de contadores leídos en el scrape)."""
+
+    def __init__(self):
+        self._metrics: List = []
+        self._sources: 'OrderedDict[str, Tuple[Callable[[], Mapping], str]]' = OrderedDict()
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help: str, labels: Tuple[str, ...] = ()) -> Counter:
+        return self.register(Counter(name, help, labels))
+
+    def histogram(self, name: str, help: str, labels: Tuple[str, ...] = (), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labels, buckets))
+
+    def add_stats(self, prefix: str, source: Callable[[], Mapping], help: str = ''):
+        """`source()` devuelve un dict {nombre: número}; se exporta como `<prefix>{stat="<nombre>"}`."""
+        self._sources[prefix] = (source, help)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for m in self._metrics:
+            lines.append(f'# HELP {m.name} {m.help}')
+            lines.append(f'# TYPE {m.name} {m.kind}')
+            lines.extend(m.render())
+        for prefix, (source, help) in self._sources.items():
+            try:
+                stats = source()
+            except Exception:
+                continue
+            if not stats: continue
+            # Los dicts de stats mezclan contadores y niveles: se exportan sin tipo
+            lines.append(f'# HELP {prefix} {help or prefix}')
+            lines.append(f'# TYPE {prefix} untyped')
+            for key, value in stats.items():
+                if isinstance(value, bool) or not isinstance(value, (int, float)): continue
+                lines.append(f'{prefix}{_labels(("stat",), (key,))} {_fmt(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+# ==========================================
+# ⏱️ 3. CICLO DE TRADING
+# ==========================================
+
+class _StageTimer:
+    __slots__ = ('metrics', 'stage', 'symbol', 'user', 't0')
+
+    def __init__(self, metrics: 'CycleMetrics', stage: str, symbol: str, user: Optional[str]):
+        self.metrics, self.stage, self.symbol, self.user = metrics, stage, symbol, user
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.observe(self.stage, time.perf_counter() - self.t0, self.symbol, self.user)
+        if exc_type is not None: self.metrics.error(self.stage, self.symbol, exc_type.__name__)
+        return False
+
+
+class CycleMetrics:
+    """
+    Uso:  with cycle_metrics.stage('market', symbol, user): ...
+    Las excepciones se cuentan como error de la etapa y se propagan igual.
+    """
+
+    def __init__(self, registry: Registry, max_users: int = METRICS_MAX_USERS, enabled: bool = METRICS_ENABLED):
+        self.enabled = enabled
+        self.stage_seconds = registry.histogram(
+            'nexus_cycle_stage_seconds', 'Tiempo por etapa del ciclo de trading', ('stage', 'symbol'))
+        self.errors = registry.counter(
+            'nexus_cycle_errors', 'Errores por etapa del ciclo de trading', ('stage', 'symbol', 'kind'))
+        self.users = registry.register(UserSummary(
+            'nexus_user_stage_seconds', 'Tiempo por usuario y etapa (últimos usuarios activos)', max_users))
+
+    def stage(self, stage: str, symbol: str = '', user: Optional[str] = None) -> _StageTimer:
+        return _StageTimer(self, stage, symbol, user)
+
+    def observe(self, stage: str, seconds: float, symbol: str = '', user: Optional[str] = None):
+        if not self.enabled: return
+        self.stage_seconds.observe(seconds, stage, symbol)
+        if user is not None: self.users.observe(user, stage, seconds)
+
+    def error(self, stage: str, symbol: str = '', kind: str = 'error'):
+        if self.enabled: self.errors.inc(stage, symbol, kind)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Cuenta y media (ms) por etapa, sumando todos los símbolos."""
+        out: Dict[str, Dict[str, float]] = {}
+        with self.stage_seconds._lock:
+            series = [(k, sum(v[0]), v[1]) for k, v in self.stage_seconds._series.items()]
+        for (stage, _), count, total in series:
+            s = out.setdefault(stage, {'count': 0, 'sum': 0.0})
+            s['count'] += count
+            s['sum'] += total
+        return {st: {'count': s['count'], 'mean_ms': round(s['sum'] / s['count'] * 1000, 3) if s['count'] else 0.0}
+                for st, s in out.items()}
+
+
+# Instancias compartidas por la API y el bot
+registry = Registry()
+cycle_metrics = CycleMetrics(registry)
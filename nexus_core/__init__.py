@@ -0,0 +1,14 @@
+"""
+Nexus Core - Núcleo ligero de trading compartido por main.py (API) y bot_executor.py (workers).
+Solo NumPy y la librería estándar al importar: configuración, señales e indicadores.
+Los clientes pesados (ccxt, pymongo, aiohttp) se importan y crean en el primer uso (nexus_core.lazy),
+así un worker del bot arranca sin cargar FastAPI, uvicorn, stripe ni passlib.
+"""
+
+from nexus_core.config import BotConfig, MarketData, OrderStatus, TradeSignal, TradingSignal
+from nexus_core.signals import calculate_rsi, rsi_from_ohlcv, rsi_signal
+
+__all__ = [
+    'BotConfig', 'MarketData', 'OrderStatus', 'TradeSignal', 'TradingSignal',
+    'calculate_rsi', 'rsi_from_ohlcv', 'rsi_signal',
+]
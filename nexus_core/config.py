@@ -0,0 +1,64 @@
+"""Configuración del bot y tipos de datos del ciclo (sin dependencias)."""
+
+from dataclasses import dataclass, field
+from datetime import datetime
+from enum import Enum
+from typing import Dict
+
+
+class TradingSignal(Enum):
+    STRONG_BUY = "STRONG_BUY"
+    BUY = "BUY"
+    NEUTRAL = "NEUTRAL"
+    SELL = "SELL"
+    STRONG_SELL = "STRONG_SELL"
+
+
+class OrderStatus(Enum):
+    SUCCESS = "SUCCESS"
+    FAILED = "FAILED"
+
+
+@dataclass
+class BotConfig:
+    timeframe: str = '5m'
+    limit: int = 100
+    cycle_interval: int = 60
+    cycle_budget: float = 45.0   # segundos máximos por barrido
+    workers: int = 16
+    user_batch_size: int = 500
+    # 🔥 ACTIVAMOS MODO PAPER TRADING (Simulación)
+    # Esto hará que el bot funcione SIN necesitar permisos de escritura en Binance
+    paper_trading: bool = True
+
+    rsi_oversold: int = 30
+    rsi_overbought: int = 70
+    rsi_strong_oversold: int = 20
+    rsi_strong_overbought: int = 80
+    min_trade_amount: float = 0.001
+    # Velas por WebSocket en vez de REST (market_stream); vacío = solo BTC/USDT
+    stream_market_data: bool = False
+    stream_symbols: tuple = ()
+    # Indicadores de la estrategia: el pipeline los calcula una vez por vela para todos los usuarios
+    indicators: tuple = ('ema:20', 'ema:50', 'macd', 'bb', 'atr', 'vwap')
+
+
+@dataclass
+class MarketData:
+    symbol: str
+    current_price: float
+    rsi: float
+    timestamp: datetime = datetime.now()
+    indicators: Dict[str, float] = field(default_factory=dict)  # Compartidos (indicators.indicator_pipeline)
+
+
+@dataclass
+class TradeSignal:
+    signal: TradingSignal
+    confidence: float
+    entry_price: float
+    stop_loss: float
+    take_profit: float
+    position_size: float
+    reasoning: str
+    indicators: Dict[str, float]
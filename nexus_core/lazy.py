@@ -0,0 +1,24 @@
+"""Importación diferida de dependencias pesadas (ccxt, pymongo, aiohttp)."""
+
+import sys
+import importlib
+import importlib.util
+from types import ModuleType
+
+
+def lazy_import(name: str) -> ModuleType:
+    """
+    Módulo que se carga de verdad en el primer acceso a un atributo (importlib LazyLoader).
+    `ccxt = lazy_import('ccxt')` al principio del módulo; `ccxt.binance(...)` lo importa cuando hace falta.
+    Si ya está importado (p.ej. por main.py) devuelve el módulo real.
+    """
+    module = sys.modules.get(name)
+    if module is not None: return module
+    spec = importlib.util.find_spec(name)
+    if spec is None: raise ModuleNotFoundError(f"No module named '{name}'", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
@@ -0,0 +1,37 @@
+"""RSI y reglas de señal compartidas por la API y el bot (mismas reglas que el backtester)."""
+
+import numpy as np
+
+import strategy
+from candles import Candles
+from indicators import rsi_last, rsi_engine
+from nexus_core.config import TradingSignal
+
+_SIGNALS = {strategy.BUY: TradingSignal.BUY, strategy.SELL: TradingSignal.SELL, strategy.NEUTRAL: TradingSignal.NEUTRAL}
+
+
+def calculate_rsi(prices, period=14):
+    """RSI de Wilder (último valor). Vectorizado en indicators.rsi_batch."""
+    try:
+        rsi = float(rsi_last(prices, period))
+        return rsi if np.isfinite(rsi) else 50.0
+    except: return 50.0
+
+
+def rsi_from_ohlcv(symbol, timeframe, ohlcv):
+    """RSI incremental: solo procesa las velas nuevas desde la última llamada."""
+    try:
+        ohlcv = Candles.from_rows(ohlcv)   # columnas: sin reconstruir arrays por fila
+        return rsi_engine.sync(symbol, timeframe, ohlcv.timestamp, ohlcv.close)
+    except Exception:
+        # Respaldo sin motor incremental; filas crudas que Candles no acepta (p.ej. sin volumen)
+        closes = getattr(ohlcv, 'close', None)
+        if closes is None:
+            try: closes = [row[4] for row in ohlcv]
+            except (TypeError, IndexError, KeyError): return 50.0
+        return calculate_rsi(closes)
+
+
+def rsi_signal(rsi, oversold=30, overbought=70) -> TradingSignal:
+    """BUY bajo `oversold`, SELL sobre `overbought`, NEUTRAL entre medias."""
+    return _SIGNALS[int(strategy.rsi_signal_codes(rsi, oversold, overbought))]
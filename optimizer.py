@@ -0,0 +1,246 @@
+"""
+Nexus Optimizer - Barrido de parámetros de BotConfig sobre velas históricas.
+Búsqueda en rejilla o aleatoria repartida en un pool de procesos. Las velas y el RSI
+de cada timeframe se calculan UNA vez y se comparten por memoria compartida: cada
+worker se engancha al arrancar y las tareas solo llevan los parámetros.
+
+Uso: python optimizer.py datos/BTCUSDT_1m.csv --timeframes 1m 5m 15m --workers 32
+"""
+
+import os
+import sys
+import math
+import time
+import random
+import argparse
+import itertools
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+from types import SimpleNamespace
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from backtester import load_candles, resample, run_backtest
+from candles import Candles
+from indicators import rsi_batch
+
+# Filas del bloque compartido por timeframe
+_FIELDS = ('open', 'high', 'low', 'close', 'rsi')
+
+# Espacio de búsqueda por defecto (campos de BotConfig)
+DEFAULT_SPACE: Dict[str, Sequence[Any]] = {
+    'rsi_oversold': range(20, 41, 5),        # entre los umbrales fuertes: _valid no descarta ninguna
+    'rsi_overbought': range(60, 81, 5),
+    'rsi_strong_oversold': [20],
+    'rsi_strong_overbought': [80],
+    'timeframe': ['5m'],
+    'min_trade_amount': [0.001],
+}
+
+
+# ==========================================
+# 🧮 1. GENERACIÓN DE CONFIGURACIONES
+# ==========================================
+
+def _valid(params: Dict[str, Any]) -> bool:
+    """Descarta combinaciones sin sentido (umbrales cruzados)."""
+    return (params['rsi_strong_oversold'] <= params['rsi_oversold'] < params['rsi_overbought']
+            <= params['rsi_strong_overbought'])
+
+
+def grid_configs(space: Dict[str, Sequence[Any]] = DEFAULT_SPACE) -> List[Dict[str, Any]]:
+    """Producto cartesiano del espacio de búsqueda."""
+    keys = list(space)
+    combos = (dict(zip(keys, values)) for values in itertools.product(*(space[k] for k in keys)))
+    return [p for p in combos if _valid(p)]
+
+
+def random_configs(space: Dict[str, Sequence[Any]] = DEFAULT_SPACE, n: int = 1000,
+                   seed: Optional[int] = None) -> List[Dict[str, Any]]:
+    """`n` configuraciones distintas muestreadas al azar del espacio."""
+    rng = random.Random(seed)
+    pools = {k: list(v) for k, v in space.items()}
+    seen, out = set(), []
+    total = math.prod(len(v) for v in pools.values())
+    for _ in range(n * 20):
+        if len(out) >= min(n, total): break
+        params = {k: rng.choice(v) for k, v in pools.items()}
+        key = tuple(params.values())
+        if key in seen or not _valid(params): continue
+        seen.add(key)
+        out.append(params)
+    return out
+
+
+# ==========================================
+# 🧠 2. MEMORIA COMPARTIDA
+# ==========================================
+
+class SharedSeries:
+    """Velas + RSI por timeframe en bloques de memoria compartida (matriz 5 x n)."""
+
+    def __init__(self, candles: Candles, timeframes: Iterable[str], rsi_period: int = 14):
+        self._blocks: Dict[str, shared_memory.SharedMemory] = {}
+        self.layout: Dict[str, tuple] = {}   # timeframe -> (nombre shm, n)
+        try:
+            for tf in timeframes:
+                series = resample(candles, tf)
+                n = len(series['close'])
+                shm = shared_memory.SharedMemory(create=True, size=max(1, len(_FIELDS) * n * 8))
+                self._blocks[tf] = shm
+                block = np.ndarray((len(_FIELDS), n), dtype=np.float64, buffer=shm.buf)
+                for row, name in enumerate(_FIELDS[:-1]): block[row] = series[name]
+                block[-1] = rsi_batch(series['close'], rsi_period)
+                self.layout[tf] = (shm.name, n)
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self):
+        for shm in self._blocks.values():
+            shm.close()
+            shm.unlink()
+        self._blocks.clear()
+
+    def __enter__(self): return self
+    def __exit__(self, *exc): self.close()
+
+
+# Estado por proceso worker (se rellena en _init_worker)
+_WORKER: Dict[str, Any] = {}
+
+
+def _attach(layout: Dict[str, tuple]) -> Dict[str, Dict[str, np.ndarray]]:
+    views = {}
+    for tf, (name, n) in layout.items():
+        shm = shared_memory.SharedMemory(name=name)
+        _WORKER.setdefault('handles', []).append(shm)   # mantener vivo el mapeo
+        block = np.ndarray((len(_FIELDS), n), dtype=np.float64, buffer=shm.buf)
+        views[tf] = {name_: block[row] for row, name_ in enumerate(_FIELDS)}
+    return views
+
+
+def _init_worker(layout: Dict[str, tuple], options: Dict[str, Any]):
+    _WORKER['series'] = _attach(layout)
+    _WORKER['options'] = options
+
+
+def _evaluate(series: Dict[str, Dict[str, np.ndarray]], params: Dict[str, Any], options: Dict[str, Any]) -> Dict[str, Any]:
+    data = series[params['timeframe']]
+    result = run_backtest(data, SimpleNamespace(**params), rsi=data['rsi'], keep_details=False, **options)
+    row = dict(params)
+    row.update(result.summary())
+    return row
+
+
+def _run_chunk(chunk: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    series, options = _WORKER['series'], _WORKER['options']
+    return [_evaluate(series, params, options) for params in chunk]
+
+
+# ==========================================
+# 🚀 3. BARRIDO
+# ==========================================
+
+def sweep(candles: Candles, configs: List[Dict[str, Any]], workers: Optional[int] = None,
+          rank_by: str = 'pnl', chunks_per_worker: int = 4, **options) -> List[Dict[str, Any]]:
+    """
+    Evalúa `configs` (dicts con campos de BotConfig) y devuelve las filas ordenadas
+    por `rank_by` (desc; max_drawdown asc). `options` se pasa a run_backtest (fee_rate, ...).
+    """
+    if not configs: return []
+    workers = workers or os.cpu_count() or 1
+    timeframes = sorted({p['timeframe'] for p in configs})
+    with SharedSeries(candles, timeframes) as shared:
+        if workers == 1:
+            series = _attach(shared.layout)
+            try:
+                rows = [_evaluate(series, p, options) for p in configs]
+            finally:
+                series.clear()
+                for shm in _WORKER.pop('handles', []): shm.close()
+        else:
+            # Lotes medianos: poco IPC y reparto equilibrado entre núcleos
+            size = max(1, math.ceil(len(configs) / (workers * chunks_per_worker)))
+            chunks = [configs[i:i + size] for i in range(0, len(configs), size)]
+            rows = []
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(shared.layout, options)) as pool:
+                for fut in as_completed([pool.submit(_run_chunk, c) for c in chunks]):
+                    rows.extend(fut.result())
+
+    reverse = rank_by not in ('max_drawdown', 'max_drawdown_pct')
+    rows.sort(key=lambda r: r[rank_by], reverse=reverse)
+    for rank, row in enumerate(rows, 1): row['rank'] = rank
+    return rows
+
+
+def format_table(rows: List[Dict[str, Any]], top: int = 20) -> str:
+    cols = ['rank', 'timeframe', 'rsi_oversold', 'rsi_overbought', 'min_trade_amount',
+            'trades', 'win_rate', 'pnl', 'return_pct', 'max_drawdown_pct', 'profit_factor']
+    lines = [' '.join(f"{c:>16}" for c in cols)]
+    for row in rows[:top]:
+        lines.append(' '.join(f"{row[c]:>16}" for c in cols))
+    return '\n'.join(lines)
+
+
+def _parse_range(text: str) -> List[float]:
+    """'20:40:5' -> [20, 25, ..., 40]; '0.001,0.01' -> lista."""
+    if ':' in text:
+        start, stop, step = (float(x) for x in text.split(':'))
+        values = np.arange(start, stop + step / 2, step).tolist()
+    else:
+        values = [float(x) for x in text.split(',')]
+    return [int(v) if float(v).is_integer() else v for v in values]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Optimización de parámetros RSI de BotConfig")
+    parser.add_argument("path", help="CSV, Parquet (timestamp,open,high,low,close,volume) o archivo .ncnd")
+    parser.add_argument("--timeframes", nargs='+', default=['5m'])
+    parser.add_argument("--oversold", default="20:40:5")
+    parser.add_argument("--overbought", default="60:80:5")
+    parser.add_argument("--strong-oversold", default="20")
+    parser.add_argument("--strong-overbought", default="80")
+    parser.add_argument("--amounts", default="0.001")
+    parser.add_argument("--random", type=int, help="muestrear N configuraciones en vez de la rejilla completa")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--rank-by", default="pnl")
+    parser.add_argument("--fee", type=float, default=0.001)
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--csv", help="guardar la tabla completa en CSV")
+    args = parser.parse_args(argv)
+
+    space = {
+        'rsi_oversold': _parse_range(args.oversold),
+        'rsi_overbought': _parse_range(args.overbought),
+        'rsi_strong_oversold': _parse_range(args.strong_oversold),
+        'rsi_strong_overbought': _parse_range(args.strong_overbought),
+        'timeframe': args.timeframes,
+        'min_trade_amount': _parse_range(args.amounts),
+    }
+    configs = random_configs(space, args.random, args.seed) if args.random else grid_configs(space)
+
+    t0 = time.perf_counter()
+    candles = load_candles(args.path)
+    rows = sweep(candles, configs, workers=args.workers, rank_by=args.rank_by, fee_rate=args.fee)
+    elapsed = time.perf_counter() - t0
+
+    print(f"🔎 {len(rows)} configuraciones evaluadas en {elapsed:.2f}s")
+    if not rows:
+        print("⚠️ Ninguna configuración pasa los filtros (umbrales cruzados): nada que mostrar ni guardar")
+        return rows
+    print(format_table(rows, args.top))
+    if args.csv:
+        import csv
+        with open(args.csv, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=[k for k in rows[0] if k != 'exits'], extrasaction='ignore')
+            writer.writeheader()
+            writer.writerows(rows)
+    return rows
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,432 @@
+"""
+Nexus Paper Exchange - Simulador de exchange en proceso para paper trading.
+  - órdenes market / limit / STOP_MARKET / TAKE_PROFIT_MARKET (closePosition, reduceOnly)
+  - ejecución al último precio con deslizamiento y comisión configurables
+  - saldo en USDT y posiciones netas (modo one-way de futuros) por usuario, PnL realizado y latente
+  - órdenes en espera en dos montículos por símbolo (disparo al subir / al bajar):
+    cada vela nueva solo toca las órdenes que cruza, O(k log n)
+  - sin mirar al pasado: una orden colocada a mitad de vela solo se dispara con precios
+    posteriores (la vela en curso se procesa por incrementos desde la última lectura)
+Sin red ni ccxt: millones de órdenes por minuto en un portátil. PaperClient expone la
+interfaz de cliente ccxt para usar el simulador desde execution_engine (brackets incluidos).
+"""
+
+import os
+import heapq
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from candles import Candles
+from nexus_core.lazy import lazy_import
+
+ccxt = lazy_import('ccxt')   # solo para las clases de error (se carga al primer error)
+
+PAPER_INITIAL_BALANCE = float(os.getenv("NEXUS_PAPER_BALANCE", 10_000))
+PAPER_FEE_RATE = float(os.getenv("NEXUS_PAPER_FEE", 0.0004))        # taker de Binance futuros
+PAPER_SLIPPAGE = float(os.getenv("NEXUS_PAPER_SLIPPAGE", 0.0005))   # fracción del precio en órdenes a mercado
+PAPER_LEVERAGE = float(os.getenv("NEXUS_PAPER_LEVERAGE", 1))
+PAPER_TIMEFRAME = os.getenv("NEXUS_PAPER_TIMEFRAME", "5m")          # velas que disparan las órdenes en espera
+
+# Tipos de orden que se disparan por precio (se ejecutan a mercado)
+_STOP_TYPES = ('STOP_MARKET', 'stop_market', 'stop')
+_TP_TYPES = ('TAKE_PROFIT_MARKET', 'take_profit_market', 'take_profit')
+
+
+class Position:
+    __slots__ = ('qty', 'entry')
+
+    def __init__(self):
+        self.qty = 0.0       # >0 largo, <0 corto
+        self.entry = 0.0     # precio medio de entrada
+
+
+class PaperAccount:
+    __slots__ = ('email', 'cash', 'positions', 'realized_pnl', 'fees', 'trades')
+
+    def __init__(self, email: str, cash: float):
+        self.email = email
+        self.cash = cash                       # saldo de la cartera en USDT (incluye PnL realizado)
+        self.positions: Dict[str, Position] = {}
+        self.realized_pnl = 0.0
+        self.fees = 0.0
+        self.trades = 0
+
+
+class PaperExchange:
+    """
+    create_order(email, symbol, type, side, amount, price=None, params=None) -> orden (dict estilo ccxt)
+    on_candle(symbol, ts, open, high, low, close) -> procesa disparos de la vela
+    balance(email) -> saldo, margen libre y posiciones valoradas al último precio
+    """
+
+    def __init__(self, initial_balance: float = PAPER_INITIAL_BALANCE, fee_rate: float = PAPER_FEE_RATE,
+                 slippage: float = PAPER_SLIPPAGE, leverage: float = PAPER_LEVERAGE,
+                 price: Optional[Callable[[str], float]] = None, timeframe: str = PAPER_TIMEFRAME,
+                 history: int = 10_000):
+        self.initial_balance = initial_balance
+        self.fee_rate = fee_rate
+        self.slippage = slippage
+        self.leverage = leverage
+        self.price_source = price              # respaldo si aún no hay precio del símbolo
+        self.timeframe = timeframe
+        self.accounts: Dict[str, PaperAccount] = {}
+        self.prices: Dict[str, float] = {}
+        self._orders: Dict[str, dict] = {}     # órdenes en espera por id
+        self._up: Dict[str, List[Tuple[float, int, str]]] = {}    # se disparan si precio >= nivel
+        self._down: Dict[str, List[Tuple[float, int, str]]] = {}  # se disparan si precio <= -nivel
+        self._closers: Dict[Tuple[str, str], Set[str]] = {}   # (email, símbolo) -> ids closePosition en espera
+        self._stale = 0                        # entradas canceladas que siguen en los montículos
+        self._bars: Dict[str, Tuple[int, float, float, float]] = {}   # última vela leída: (ts, high, low, close)
+        self._current: Dict[str, int] = {}     # ts de la vela en curso por símbolo
+        self._placed: Dict[str, Tuple[Optional[int], float]] = {}    # id -> (vela en curso, precio) al colocarla
+        self._ids = itertools.count(1)
+        self._history: "OrderedDict[str, dict]" = OrderedDict()   # últimas órdenes terminadas
+        self.history = history
+        self._lock = threading.RLock()
+        self.stats = {'orders': 0, 'fills': 0, 'triggered': 0, 'rejected': 0, 'canceled': 0, 'candles': 0}
+
+    # --- CUENTAS Y PRECIOS ---
+    def account(self, email: str) -> PaperAccount:
+        acc = self.accounts.get(email)
+        if acc is None:
+            acc = self.accounts[email] = PaperAccount(email, self.initial_balance)
+        return acc
+
+    def update_price(self, symbol: str, price: float):
+        self.prices[symbol] = float(price)
+
+    def last_price(self, symbol: str) -> float:
+        price = self.prices.get(symbol)
+        if price is None:
+            if self.price_source is None: raise ccxt.ExchangeError(f"Sin precio para {symbol}")
+            price = self.prices[symbol] = float(self.price_source(symbol))
+        return price
+
+    # --- ÓRDENES ---
+    def create_order(self, email: str, symbol: str, type: str, side: str, amount: Optional[float],
+                     price: Optional[float] = None, params: Optional[dict] = None) -> dict:
+        params = params or {}
+        with self._lock:
+            self.stats['orders'] += 1
+            acc = self.account(email)
+            order_id = str(next(self._ids))
+            order = {'id': order_id, 'clientOrderId': params.get('clientOrderId'), 'email': email,
+                     'symbol': symbol, 'type': type, 'side': side, 'amount': amount, 'price': price,
+                     'stopPrice': params.get('stopPrice'), 'reduceOnly': bool(params.get('reduceOnly')),
+                     'closePosition': bool(params.get('closePosition')), 'status': 'open',
+                     'filled': 0.0, 'average': None, 'fee': None, 'timestamp': int(time.time() * 1000)}
+
+            if type == 'market':
+                return self._fill(acc, order, self._slipped(self.last_price(symbol), side))
+
+            if type == 'limit':
+                if price is None: raise ccxt.InvalidOrder("Orden limit sin precio")
+                last = self.last_price(symbol)
+                if (side == 'buy' and last <= price) or (side == 'sell' and last >= price):
+                    return self._fill(acc, order, last)          # cruza: se ejecuta ya
+                up = side == 'sell'
+                level = price
+            elif type in _STOP_TYPES or type in _TP_TYPES:
+                level = params.get('stopPrice')
+                if level is None: raise ccxt.InvalidOrder(f"{type} sin stopPrice")
+                # Stop de compra y TP de venta se disparan subiendo; el resto bajando
+                up = (side == 'buy') == (type in _STOP_TYPES)
+            else:
+                raise ccxt.InvalidOrder(f"Tipo de orden no soportado: {type}")
+
+            self._check_margin(acc, order, level)
+            self._orders[order_id] = order
+            self._placed[order_id] = (self._current.get(symbol), self.prices.get(symbol, level))
+            if order['closePosition']: self._closers.setdefault((email, symbol), set()).add(order_id)
+            if up:
+                heapq.heappush(self._up.setdefault(symbol, []), (level, int(order_id), order_id))
+            else:
+                heapq.heappush(self._down.setdefault(symbol, []), (-level, int(order_id), order_id))
+            return dict(order)
+
+    def cancel_order(self, order_id: str, symbol: Optional[str] = None) -> dict:
+        with self._lock:
+            order = self._orders.pop(order_id, None)   # el montículo se limpia al llegar a ella
+            if order is None: raise ccxt.OrderNotFound(f"Orden {order_id} no encontrada")
+            self._finish(order, 'canceled')
+            self._discarded(1)
+            return dict(order)
+
+    def fetch_order(self, order_id: str, symbol: Optional[str] = None) -> dict:
+        with self._lock:
+            order = self._orders.get(order_id) or self._history.get(order_id)
+            if order is not None: return dict(order)
+        raise ccxt.OrderNotFound(f"Orden {order_id} no encontrada")
+
+    def open_orders(self, email: str, symbol: Optional[str] = None) -> List[dict]:
+        with self._lock:
+            return [dict(o) for o in self._orders.values()
+                    if o['email'] == email and (symbol is None or o['symbol'] == symbol)]
+
+    def _finish(self, order: dict, status: str):
+        """Saca la orden de los índices de espera y la guarda en el histórico acotado."""
+        order['status'] = status
+        self._placed.pop(order['id'], None)
+        if status == 'canceled': self.stats['canceled'] += 1
+        if order['closePosition']:
+            ids = self._closers.get((order['email'], order['symbol']))
+            if ids is not None: ids.discard(order['id'])
+        self._history[order['id']] = order
+        if len(self._history) > self.history: self._history.popitem(last=False)
+
+    def _slipped(self, price: float, side: str) -> float:
+        return price * (1 + self.slippage) if side == 'buy' else price * (1 - self.slippage)
+
+    def _check_margin(self, acc: PaperAccount, order: dict, price: float):
+        """Rechaza órdenes que abren o amplían posición sin margen libre (las de cierre pasan)."""
+        if order['reduceOnly'] or order['closePosition'] or not order['amount']: return
+        pos = acc.positions.get(order['symbol'])
+        signed = order['amount'] if order['side'] == 'buy' else -order['amount']
+        if pos is not None and pos.qty * signed < 0 and abs(signed) <= abs(pos.qty): return
+        if abs(signed) * price / self.leverage > self._free_margin(acc):
+            self.stats['rejected'] += 1
+            raise ccxt.InsufficientFunds(f"Margen insuficiente para {order['amount']} {order['symbol']}")
+
+    def _fill(self, acc: PaperAccount, order: dict, price: float) -> dict:
+        """Ejecuta `order` completa a `price`: posición neta, PnL realizado y comisión."""
+        symbol, side = order['symbol'], order['side']
+        pos = acc.positions.get(symbol)
+        amount = order['amount']
+        if order['closePosition'] or order['reduceOnly']:
+            held = pos.qty if pos is not None else 0.0
+            # Solo reduce: nada que cerrar en ese sentido -> se cancela
+            if held == 0.0 or (held > 0) == (side == 'buy'):
+                self._finish(order, 'canceled')
+                return dict(order)
+            amount = abs(held) if order['closePosition'] or amount is None else min(amount, abs(held))
+        else:
+            self._check_margin(acc, order, price)
+        if pos is None: pos = acc.positions[symbol] = Position()
+
+        signed = amount if side == 'buy' else -amount
+        qty = pos.qty
+        if qty == 0.0 or (qty > 0) == (signed > 0):
+            # Abre o amplía: precio medio ponderado
+            new_qty = qty + signed
+            pos.entry = (pos.entry * abs(qty) + price * amount) / abs(new_qty)
+            pos.qty = new_qty
+        else:
+            closed = min(amount, abs(qty))
+            pnl = closed * (price - pos.entry) * (1 if qty > 0 else -1)
+            acc.cash += pnl
+            acc.realized_pnl += pnl
+            pos.qty = qty + signed
+            if abs(pos.qty) < 1e-12:
+                pos.qty, pos.entry = 0.0, 0.0
+                self._cancel_closers(acc.email, symbol)   # OCO: sin posición sobran SL/TP
+            elif (pos.qty > 0) != (qty > 0):
+                pos.entry = price                          # giro: el resto abre al precio de la orden
+
+        fee = amount * price * self.fee_rate
+        acc.cash -= fee
+        acc.fees += fee
+        acc.trades += 1
+        order.update(filled=amount, average=price, fee={'cost': fee, 'currency': 'USDT'})
+        self._finish(order, 'closed')
+        self.stats['fills'] += 1
+        return dict(order)
+
+    def _cancel_closers(self, email: str, symbol: str):
+        ids = self._closers.pop((email, symbol), ())
+        for order_id in ids:
+            order = self._orders.pop(order_id, None)
+            if order is not None: self._finish(order, 'canceled')
+        self._discarded(len(ids))
+
+    def _discarded(self, n: int):
+        """Reconstruye los montículos cuando las entradas canceladas superan a las vivas."""
+        self._stale += n
+        if self._stale <= len(self._orders) + 1024: return
+        for heaps in (self._up, self._down):
+            for symbol, heap in heaps.items():
+                heaps[symbol] = [e for e in heap if e[2] in self._orders]
+                heapq.heapify(heaps[symbol])
+        self._stale = 0
+
+    # --- VELAS: DISPAROS ---
+    def _window(self, order_id: str, ts: int, open: float, high: float, low: float, close: float,
+                partial: bool) -> Tuple[float, float, float]:
+        """
+        (apertura, mínimo, máximo) que puede ver la orden en esta vela. Si se colocó dentro de
+        ella y la vela llega entera, los extremos pueden ser anteriores a la orden: solo cuenta
+        el recorrido desde su precio de colocación hasta el cierre.
+        """
+        bar, ref = self._placed.get(order_id, (None, open))
+        if partial or bar is None or ts > bar: return open, low, high
+        return ref, min(ref, close), max(ref, close)
+
+    def on_candle(self, symbol: str, ts: int, open: float, high: float, low: float, close: float,
+                  partial: bool = False):
+        """
+        Dispara las órdenes en espera que la vela cruza. Con huecos, se ejecutan a la
+        apertura. Si en la misma vela saltan stop y objetivo, primero los stops (como el backtester).
+        `partial`: high/low/open son solo lo impreso desde la lectura anterior de la misma vela.
+        """
+        with self._lock:
+            self.stats['candles'] += 1
+            if ts > self._current.get(symbol, ts - 1): self._current[symbol] = ts
+            fired: List[Tuple[dict, float]] = []
+            waiting: List[Tuple[bool, Tuple[float, int, str]]] = []   # cruzadas antes de colocarse: vuelven
+            up, down = self._up.get(symbol), self._down.get(symbol)
+            while up and up[0][0] <= high:
+                entry = heapq.heappop(up)
+                level, order_id = entry[0], entry[2]
+                if order_id not in self._orders: continue
+                start, _, hi = self._window(order_id, ts, open, high, low, close, partial)
+                if level > hi:
+                    waiting.append((True, entry))
+                    continue
+                fired.append((self._orders.pop(order_id), max(level, start)))
+            while down and -down[0][0] >= low:
+                entry = heapq.heappop(down)
+                level, order_id = -entry[0], entry[2]
+                if order_id not in self._orders: continue
+                start, lo, _ = self._window(order_id, ts, open, high, low, close, partial)
+                if level < lo:
+                    waiting.append((False, entry))
+                    continue
+                fired.append((self._orders.pop(order_id), min(level, start)))
+            for is_up, entry in waiting: heapq.heappush(up if is_up else down, entry)
+            fired.sort(key=lambda f: f[0]['type'] not in _STOP_TYPES)
+            for order, trigger in fired:
+                self.stats['triggered'] += 1
+                price = trigger if order['type'] == 'limit' else self._slipped(trigger, order['side'])
+                acc = self.account(order['email'])
+                try:
+                    self._fill(acc, order, price)
+                except ccxt.InsufficientFunds:
+                    self._finish(order, 'rejected')
+            self.prices[symbol] = close
+
+    def on_candles(self, symbol: str, timeframe: str, candles: Candles):
+        """
+        Oyente de CandleCache: procesa las velas desde la última vista. La vela en curso solo
+        aporta lo nuevo desde la lectura anterior: del último cierre visto al cierre actual y
+        los máximos/mínimos que superan a los ya vistos.
+        """
+        if timeframe != self.timeframe or not len(candles): return
+        last = self._bars.get(symbol)
+        for ts, o, h, l, c, _ in candles.between(last[0] if last else None):
+            ts = int(ts)
+            if last is not None and ts == last[0]:
+                _, seen_high, seen_low, seen_close = last
+                if (h, l, c) != (seen_high, seen_low, seen_close):
+                    hi = max(seen_close, c, h if h > seen_high else c)
+                    lo = min(seen_close, c, l if l < seen_low else c)
+                    self.on_candle(symbol, ts, seen_close, hi, lo, c, partial=True)
+            else:
+                self.on_candle(symbol, ts, o, h, l, c)
+            last = self._bars[symbol] = (ts, h, l, c)
+
+    def attach(self, cache) -> 'PaperExchange':
+        cache.add_listener(self.on_candles)
+        return self
+
+    # --- SALDOS ---
+    def _unrealized(self, acc: PaperAccount) -> float:
+        return sum(p.qty * (self.prices.get(s, p.entry) - p.entry) for s, p in acc.positions.items() if p.qty)
+
+    def _free_margin(self, acc: PaperAccount) -> float:
+        used = sum(abs(p.qty) * self.prices.get(s, p.entry) for s, p in acc.positions.items() if p.qty)
+        return acc.cash + self._unrealized(acc) - used / self.leverage
+
+    def symbols(self, email: str) -> List[str]:
+        """Símbolos con posición abierta del usuario."""
+        acc = self.accounts.get(email)
+        return [s for s, p in acc.positions.items() if p.qty] if acc is not None else []
+
+    def balance(self, email: str) -> Dict[str, Any]:
+        with self._lock:
+            acc = self.accounts.get(email) or PaperAccount(email, self.initial_balance)   # sin crear cuenta
+            equity = acc.cash + self._unrealized(acc)
+            assets = {'USDT': round(acc.cash, 2)}
+            positions = []
+            for symbol, p in acc.positions.items():
+                if not p.qty: continue
+                mark = self.prices.get(symbol, p.entry)
+                assets[symbol.split('/')[0]] = round(p.qty, 8)
+                positions.append({'symbol': symbol, 'side': 'long' if p.qty > 0 else 'short', 'amount': round(abs(p.qty), 8),
+                                  'entry_price': p.entry, 'mark_price': mark,
+                                  'unrealized_pnl': round(p.qty * (mark - p.entry), 2)})
+            return {'total_balance_usd': round(equity, 2), 'assets': assets,
+                    'free_margin': round(self._free_margin(acc), 2), 'positions': positions,
+                    'realized_pnl': round(acc.realized_pnl, 2), 'fees_paid': round(acc.fees, 2),
+                    'trades': acc.trades}
+
+    def reset(self, email: Optional[str] = None):
+        with self._lock:
+            if email is None:
+                self.accounts.clear()
+                self._orders.clear()
+                self._up.clear()
+                self._down.clear()
+                self._closers.clear()
+                self._placed.clear()
+                return
+            self.accounts.pop(email, None)
+            for order_id in [i for i, o in self._orders.items() if o['email'] == email]:
+                self._finish(self._orders.pop(order_id), 'canceled')
+
+
+class PaperClient:
+    """Interfaz de cliente ccxt sobre una cuenta del simulador (para ExecutionService)."""
+
+    def __init__(self, exchange: PaperExchange, email: str):
+        self.exchange = exchange
+        self.email = email
+        self.has = {'createOrders': True}
+        self.markets = None
+
+    def load_markets(self, reload=False, params=None):
+        self.markets = {}
+        return self.markets
+
+    def set_markets(self, markets, currencies=None):
+        self.markets = markets
+
+    def create_order(self, symbol, type, side, amount, price=None, params=None):
+        return self.exchange.create_order(self.email, symbol, type, side, amount, price, params)
+
+    def create_orders(self, orders, params=None):
+        out = []
+        for o in orders:
+            try:
+                out.append(self.create_order(o['symbol'], o['type'], o['side'], o.get('amount'), o.get('price'),
+                                             o.get('params')))
+            except ccxt.BaseError as e:
+                out.append({'id': None, 'status': 'rejected', 'info': {'msg': str(e)}})
+        return out
+
+    def cancel_order(self, id, symbol=None, params=None):
+        return self.exchange.cancel_order(id, symbol)
+
+    def fetch_order(self, id, symbol=None, params=None):
+        return self.exchange.fetch_order(id, symbol)
+
+    def fetch_balance(self, params=None):
+        return self.exchange.balance(self.email)
+
+
+def paper_execution_service(exchange: 'PaperExchange', **kwargs):
+    """ExecutionService cuyo pool crea PaperClient por usuario (mismo camino que la operativa real)."""
+    from execution_engine import ClientPool, ExecutionService
+    pool = ClientPool(factory=lambda creds: PaperClient(exchange, creds['apiKey']),
+                      credentials=lambda email: {'apiKey': email, 'secret': ''})
+    return ExecutionService(pool, price=exchange.last_price, **kwargs)
+
+
+def _default_price(symbol: str) -> float:
+    from execution_engine import cached_price
+    return cached_price(symbol)
+
+
+# Instancia compartida (bot en paper trading y /api/user/balance)
+paper_exchange = PaperExchange(price=_default_price)
@@ -0,0 +1,142 @@
+"""
+Nexus Scheduler - Barrido multiusuario del bot.
+Lee los usuarios activos de Mongo por lotes, descarga los datos de mercado UNA vez
+por (símbolo, timeframe) y evalúa a cada usuario en un pool de hilos con un
+presupuesto de tiempo por ciclo. Coste de red: O(símbolos), no O(usuarios).
+"""
+
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import dataclass, field, asdict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger('NexusScheduler')
+
+# Estados que devuelve la función de evaluación por usuario
+PROCESSED = "processed"
+SKIPPED = "skipped"
+ERROR = "error"
+
+
+@dataclass
+class CycleReport:
+    processed: int = 0
+    skipped: int = 0
+    errors: int = 0
+    overran: int = 0          # usuarios que no cupieron en el presupuesto
+    truncated: bool = False   # el cursor no se recorrió entero
+    markets: int = 0          # (símbolo, timeframe) distintos descargados
+    elapsed: float = 0.0
+    logs: List[str] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class BotScheduler:
+    """
+    evaluate(user_doc, market) -> (estado, mensaje)
+    load_market(symbol, timeframe) -> datos de mercado compartidos (o None si falla)
+    users() -> iterable de LOTES de documentos de usuario
+    prepare_batch(lote) -> opcional, p.ej. precargar credenciales del lote en 1 consulta
+    """
+
+    def __init__(self, evaluate: Callable[[dict, Any], Tuple[str, str]],
+                 load_market: Callable[[str, str], Any],
+                 users: Callable[[], Iterable[List[dict]]],
+                 default_symbol: str = 'BTC/USDT', default_timeframe: str = '5m',
+                 workers: int = 16, budget: float = 240.0, max_logs: int = 100,
+                 prepare_batch: Optional[Callable[[List[dict]], Any]] = None):
+        self.evaluate = evaluate
+        self.prepare_batch = prepare_batch
+        self.load_market = load_market
+        self.users = users
+        self.default_symbol = default_symbol
+        self.default_timeframe = default_timeframe
+        self.workers = workers
+        self.budget = budget
+        self.max_logs = max_logs
+        # Totales acumulados entre ciclos (se exportan en /metrics)
+        self.stats = {'cycles': 0, 'processed': 0, 'skipped': 0, 'errors': 0, 'overran': 0, 'truncated': 0}
+
+    def _market_key(self, user: dict) -> Tuple[str, str]:
+        return user.get('symbol') or self.default_symbol, user.get('timeframe') or self.default_timeframe
+
+    def _log(self, report: CycleReport, msg: str):
+        if len(report.logs) < self.max_logs: report.logs.append(msg)
+
+    def run_cycle(self, users: Optional[Iterable[List[dict]]] = None) -> CycleReport:
+        """Un barrido completo (o hasta agotar el presupuesto)."""
+        report = CycleReport()
+        start = time.monotonic()
+        deadline = start + self.budget
+        markets: Dict[Tuple[str, str], Any] = {}
+        batches = users if users is not None else self.users()
+
+        pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='nexus-cycle')
+        try:
+            for batch in batches:
+                if time.monotonic() >= deadline:
+                    report.truncated = True
+                    report.overran += len(batch)
+                    break
+
+                # 1. Datos de mercado: solo las claves nuevas de este lote, en paralelo
+                new_keys = {self._market_key(u) for u in batch} - markets.keys()
+                for key, fut in [(k, pool.submit(self.load_market, *k)) for k in new_keys]:
+                    try:
+                        markets[key] = fut.result(timeout=max(0.0, deadline - time.monotonic()))
+                    except Exception as e:
+                        logger.error(f"Mercado {key} no disponible: {e}")
+                        markets[key] = None
+
+                if self.prepare_batch is not None:
+                    try:
+                        self.prepare_batch(batch)
+                    except Exception as e:
+                        logger.error(f"Error preparando lote: {e}")
+
+                # 2. Evaluación por usuario (CPU barata, datos compartidos)
+                pending = {}
+                for user in batch:
+                    market = markets.get(self._market_key(user))
+                    if market is None:
+                        report.errors += 1
+                        self._log(report, f"Error fetching data for {user.get('email')}")
+                        continue
+                    pending[pool.submit(self.evaluate, user, market)] = user
+
+                while pending:
+                    remaining = deadline - time.monotonic()
+                    done, _ = wait(pending, timeout=max(0.0, remaining), return_when=FIRST_COMPLETED)
+                    if not done:
+                        # Presupuesto agotado: cancelamos lo que aún no empezó
+                        for fut in pending: fut.cancel()
+                        report.overran += len(pending)
+                        report.truncated = True
+                        break
+                    for fut in done:
+                        user = pending.pop(fut)
+                        try:
+                            status, msg = fut.result()
+                        except Exception as e:
+                            status, msg = ERROR, f"Error {user.get('email')}: {e}"
+                        if status == PROCESSED: report.processed += 1
+                        elif status == SKIPPED: report.skipped += 1
+                        else: report.errors += 1
+                        self._log(report, msg)
+
+                if report.truncated: break
+        finally:
+            # Sin esperar a las tareas rezagadas: el ciclo respeta su presupuesto
+            pool.shutdown(wait=False, cancel_futures=True)
+
+        report.markets = len(markets)
+        report.elapsed = round(time.monotonic() - start, 3)
+        self.stats['cycles'] += 1
+        for key in ('processed', 'skipped', 'errors', 'overran'): self.stats[key] += getattr(report, key)
+        self.stats['truncated'] += report.truncated
+        logger.info(f"⏱️ Ciclo: {report.processed} ok / {report.skipped} skip / {report.errors} err / "
+                    f"{report.overran} fuera de presupuesto ({report.markets} mercados, {report.elapsed}s)")
+        return report
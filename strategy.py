@@ -0,0 +1,29 @@
+"""
+Nexus Strategy - Reglas de la estrategia RSI compartidas por el bot y el backtester.
+Funcionan igual con un escalar (bot en vivo) que con arrays NumPy (backtest).
+"""
+
+import numpy as np
+
+# Códigos numéricos de señal (vectorizables)
+BUY = 1
+NEUTRAL = 0
+SELL = -1
+
+# Niveles de protección sobre el precio de entrada (los del AIAnalyzer)
+STOP_LOSS_PCT = 0.02
+TAKE_PROFIT_PCT = 0.02
+
+
+def rsi_signal_codes(rsi, oversold: float = 30, overbought: float = 70):
+    """RSI < oversold -> BUY, RSI > overbought -> SELL, resto NEUTRAL (NaN -> NEUTRAL)."""
+    rsi = np.asarray(rsi, dtype=np.float64)
+    codes = np.where(rsi < oversold, BUY, np.where(rsi > overbought, SELL, NEUTRAL))
+    return codes.astype(np.int8) if codes.ndim else int(codes)
+
+
+def protective_levels(entry_price, side: int, sl_pct: float = STOP_LOSS_PCT, tp_pct: float = TAKE_PROFIT_PCT):
+    """(stop_loss, take_profit) según el lado: largo (BUY) o corto (SELL)."""
+    if side >= 0:
+        return entry_price * (1 - sl_pct), entry_price * (1 + tp_pct)
+    return entry_price * (1 + sl_pct), entry_price * (1 - tp_pct)
@@ -0,0 +1,30 @@
+"""Fixtures comunes: todo en memoria, sin red ni Mongo."""
+
+import os
+
+import numpy as np
+import pytest
+
+# Antes de importar database_manager: un Mongo inexistente falla rápido si algo intentara conectar
+os.environ.setdefault("MONGO_URI", "mongodb://127.0.0.1:1/?serverSelectionTimeoutMS=100")
+
+
+@pytest.fixture
+def closes():
+    """Paseo aleatorio determinista de 300 cierres."""
+    rng = np.random.default_rng(7)
+    return 100 + np.cumsum(rng.normal(0, 1, 300))
+
+
+@pytest.fixture
+def ohlcv_rows(closes):
+    """Filas ccxt [ts, o, h, l, c, v] de 1 minuto con los cierres de `closes`."""
+    return [[i * 60_000, c, c + 1, c - 1, c, 10.0] for i, c in enumerate(closes.tolist())]
+
+
+@pytest.fixture(autouse=True, scope='session')
+def _stop_logging_listener():
+    """main/bot_executor arrancan el listener de logs sobre el stdout capturado: se para antes de que pytest lo cierre."""
+    yield
+    import logging_setup
+    logging_setup.shutdown_logging()
@@ -0,0 +1,102 @@
+"""AIAnalysisService: caché por cubos, coalescencia, limitador y circuit breaker (sin llamar a Gemini)."""
+
+import asyncio
+
+import pytest
+
+from ai_analysis import AIAnalysisService, CircuitBreaker, RateLimiter, rule_based_analysis
+
+
+class FakeLLM:
+    def __init__(self, latency=0.02, fail=False):
+        self.latency, self.fail, self.calls = latency, fail, 0
+
+    async def __call__(self, price, change, rsi):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        if self.fail: raise ConnectionError("Gemini caído")
+        return f"análisis {self.calls}"
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_miss_answers_with_rules_and_refreshes_in_background():
+    llm = FakeLLM()
+    service = AIAnalysisService(llm)
+
+    async def scenario():
+        first = await service.get(65000, 1.2, 75)
+        await asyncio.sleep(0.05)
+        return first, await service.get(65010, 1.1, 76)   # mismo cubo
+
+    first, second = run(scenario())
+    assert first == rule_based_analysis(75)
+    assert second == "análisis 1" and llm.calls == 1
+    assert service.stats['hits'] == 1
+
+
+def test_simultaneous_requests_share_one_call():
+    llm = FakeLLM(latency=0.05)
+    service = AIAnalysisService(llm)
+
+    async def scenario():
+        return await asyncio.gather(*(service.get(65000, 1.2, 50, max_wait=1.0) for _ in range(20)))
+
+    texts = run(scenario())
+    assert set(texts) == {"análisis 1"} and llm.calls == 1
+    assert service.stats['coalesced'] == 19
+
+
+def test_different_buckets_call_separately():
+    service = AIAnalysisService(FakeLLM())
+    assert service.bucket(65000, 1.2, 50) == service.bucket(65100, 1.1, 52)
+    assert service.bucket(65000, 1.2, 50) != service.bucket(67000, 1.2, 50)
+    assert service.bucket(65000, 1.2, 50) != service.bucket(65000, 1.2, 71)
+
+
+def test_stale_text_is_served_while_refreshing():
+    llm = FakeLLM()
+    service = AIAnalysisService(llm, ttl=0.0, stale_ttl=60)
+
+    async def scenario():
+        await service.get(65000, 1.2, 50, max_wait=1.0)
+        stale = await service.get(65000, 1.2, 50)
+        await asyncio.sleep(0.05)
+        return stale
+
+    assert run(scenario()) == "análisis 1"
+    assert service.stats['stale'] == 1 and llm.calls == 2
+
+
+def test_breaker_opens_after_consecutive_failures():
+    llm = FakeLLM(latency=0, fail=True)
+    service = AIAnalysisService(llm, breaker=CircuitBreaker(threshold=3, reset_timeout=60))
+
+    async def scenario():
+        # Cubos distintos: sin caché ni coalescencia
+        return [await service.get(65000, 0, rsi, max_wait=1.0) for rsi in (10, 40, 60, 80, 95)]
+
+    texts = run(scenario())
+    assert llm.calls == 3 and service.breaker.state == "open"
+    assert texts == [rule_based_analysis(rsi) for rsi in (10, 40, 60, 80, 95)]
+
+
+def test_half_open_allows_a_single_probe():
+    breaker = CircuitBreaker(threshold=1, reset_timeout=0.0)
+    breaker.failure()
+    assert breaker.state == "half-open"
+    assert breaker.allow() and not breaker.allow()
+    breaker.success()
+    assert breaker.state == "closed"
+
+
+def test_rate_limiter_refuses_without_waiting():
+    limiter = RateLimiter(rate=2, per=60)
+    assert [limiter.acquire() for _ in range(3)] == [True, True, False]
+
+
+@pytest.mark.parametrize("rsi,text", [(75, "Sobrecompra"), (25, "Sobreventa"), (50, "lateral")])
+def test_rule_based_fallback(rsi, text):
+    assert text in rule_based_analysis(rsi)
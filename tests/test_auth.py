@@ -0,0 +1,164 @@
+"""Auth: tokens de sesión firmados (caducidad, manipulación, rotación de claves), hash de contraseñas y registro."""
+
+import asyncio
+
+import pytest
+
+from auth_service import PasswordHasher, SessionSigner, bearer_token
+from benchmarks.fakes import FakeCollection, install_fake_mongo
+from database_manager import NexusDB
+
+EMAIL = 'alice@nexus.ai'
+
+
+def test_issued_token_verifies_without_io():
+    signer = SessionSigner('secret-a', ttl=3600)
+    payload = signer.verify(signer.issue(EMAIL, now=1_000), now=1_500)
+    assert payload == {'sub': EMAIL, 'iat': 1_000, 'exp': 4_600, 'v': 1}
+    assert signer.stats == {'issued': 1, 'valid': 1, 'invalid': 0, 'expired': 0}
+
+
+def test_expired_token_is_rejected():
+    signer = SessionSigner('secret-a', ttl=3600)
+    token = signer.issue(EMAIL, now=1_000)
+    assert signer.verify(token, now=4_600) is not None
+    assert signer.verify(token, now=4_601) is None and signer.stats['expired'] == 1
+    assert signer.verify(signer.issue(EMAIL, ttl=10, now=1_000), now=1_011) is None
+
+
+@pytest.mark.parametrize("tamper", [
+    lambda t: t[:-2] + ('AA' if t[-2:] != 'AA' else 'BB'),                        # firma
+    lambda t: SessionSigner('secret-a').issue('mallory@nexus.ai').split('.')[0] + '.' + t.split('.')[1],   # payload
+    lambda t: t.replace('.', ''),                                                  # sin separador
+    lambda t: 'not-a-token',
+    lambda t: None,
+])
+def test_tampered_tokens_are_invalid(tamper):
+    signer = SessionSigner('secret-a')
+    assert signer.verify(tamper(signer.issue(EMAIL))) is None
+    assert signer.stats['invalid'] == 1
+
+
+def test_other_secret_does_not_validate():
+    assert SessionSigner('secret-b').verify(SessionSigner('secret-a').issue(EMAIL)) is None
+
+
+def test_rotation_keeps_old_tokens_valid_and_signs_with_the_new_secret():
+    old = SessionSigner('secret-a')
+    old_token = old.issue(EMAIL)
+    rotated = SessionSigner('secret-b', old_secrets=['secret-a'])
+
+    assert rotated.verify(old_token)['sub'] == EMAIL
+    new_token = rotated.issue(EMAIL)
+    assert SessionSigner('secret-b').verify(new_token)['sub'] == EMAIL
+    assert old.verify(new_token) is None   # la nueva clave firma, la antigua solo valida
+
+    # Retirada la clave antigua de la lista, sus tokens dejan de valer
+    assert SessionSigner('secret-b').verify(old_token) is None
+
+
+@pytest.mark.parametrize("header, token", [
+    ("Bearer abc.def", "abc.def"), ("bearer  abc.def ", "abc.def"), ("Basic abc", None),
+    ("Bearer", None), ("Bearer   ", None), ("", None), (None, None),
+])
+def test_bearer_token(header, token):
+    assert bearer_token(header) == token
+
+
+@pytest.mark.parametrize("processes", [0, 1])
+def test_password_hasher(processes):
+    hasher = PasswordHasher(processes=processes)
+
+    async def scenario():
+        await hasher.warm_up()
+        hashed = await hasher.hash("s3cret")
+        return hashed, await hasher.verify("s3cret", hashed), await hasher.verify("wrong", hashed), \
+            await hasher.verify("s3cret", "not-a-hash")
+
+    try:
+        hashed, ok, wrong, corrupt = asyncio.run(scenario())
+    finally:
+        hasher.close()
+    assert hashed.startswith('$pbkdf2-sha256$') and ok and not wrong and not corrupt
+    assert hasher.stats == {'hashed': 1, 'verified': 1, 'rejected': 2}
+
+
+def test_missing_secret_falls_back_to_a_random_key_not_the_encryption_key(caplog):
+    from database_manager import ENCRYPTION_KEY
+
+    with caplog.at_level('WARNING', logger='NexusAuth'):
+        a, b = SessionSigner(None), SessionSigner('')
+    assert 'NEXUS_SESSION_SECRET' in caplog.text
+    token = a.issue(EMAIL)
+    assert a.verify(token)['sub'] == EMAIL
+    assert b.verify(token) is None   # cada proceso genera la suya
+    assert SessionSigner(ENCRYPTION_KEY).verify(token) is None   # no se deriva de la clave por defecto pública
+
+
+def test_per_user_routes_require_the_token_owner(monkeypatch):
+    import httpx
+    import main
+
+    saved = []
+
+    async def save_keys(email, key, secret):
+        saved.append(email)
+        return True
+
+    monkeypatch.setattr(main.db_manager, 'aguardar_keys_binance', save_keys)
+    bearer = {'Authorization': f'Bearer {main.session_signer.issue(EMAIL)}'}
+    keys = {'email': EMAIL, 'apiKey': 'k', 'secretKey': 's'}
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return [r.status_code for r in await asyncio.gather(
+                client.get(f"/api/user/balance/{EMAIL}"),
+                client.get("/api/user/balance/mallory@nexus.ai", headers=bearer),
+                client.get(f"/api/user/balance/{EMAIL}", headers=bearer),
+                client.post("/api/user/save-keys", json=keys),
+                client.post("/api/user/save-keys", json=dict(keys, email='mallory@nexus.ai'), headers=bearer),
+                client.post("/api/user/save-keys", json=keys, headers=bearer),
+            )]
+
+    assert asyncio.run(scenario()) == [401, 403, 200, 401, 403, 200]
+    assert saved == [EMAIL]
+
+
+def test_concurrent_signups_create_a_single_user():
+    db = NexusDB()
+    install_fake_mongo(db, [], latency=0.01)
+
+    async def signups():
+        return await asyncio.gather(*(db.acrear_usuario("new@nexus.ai", "hash") for _ in range(10)))
+
+    results = asyncio.run(signups())
+    assert sorted(ok for ok, _ in results) == [False] * 9 + [True]
+    assert {msg for ok, msg in results if not ok} == {"El usuario ya existe"}
+
+    assert db.crear_usuario("sync@nexus.ai", "hash") == (True, "Usuario creado exitosamente")
+    assert db.crear_usuario("sync@nexus.ai", "hash") == (False, "El usuario ya existe")
+    assert db.users.calls.get('find_one', 0) == 0   # sin comprobación previa: decide el índice único
+
+
+class UnindexedCollection(FakeCollection):
+    """Colección que acepta duplicados y donde el índice único no se puede crear."""
+
+    def insert_one(self, doc, _sleep=True):
+        self._op('insert_one', _sleep)
+        self._by_email.setdefault(doc['email'], dict(doc))
+
+    def create_index(self, keys, **kwargs):
+        raise RuntimeError("E11000 duplicate key error building index")
+
+
+def test_signup_checks_first_when_the_unique_index_is_not_confirmed():
+    db = NexusDB()
+    install_fake_mongo(db, [])
+    db.users = UnindexedCollection()
+    db.async_users.sync = db.users
+
+    assert asyncio.run(db.acrear_usuario(EMAIL, "hash")) == (True, "Usuario creado exitosamente")
+    assert asyncio.run(db.acrear_usuario(EMAIL, "hash")) == (False, "El usuario ya existe")
+    assert db.crear_usuario(EMAIL, "hash") == (False, "El usuario ya existe")
+    assert db.users.calls['find_one'] == 3 and db.users.calls['insert_one'] == 1 and not db._indexed
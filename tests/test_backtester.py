@@ -0,0 +1,107 @@
+"""Backtester: entradas a la apertura siguiente, orden SL/TP intravela, huecos y paridad con el paper trading."""
+
+import numpy as np
+import pytest
+
+from backtester import EXIT_END, EXIT_SIGNAL, EXIT_STOP, EXIT_TARGET, resample, run_backtest
+from candles import Candles
+from nexus_core import BotConfig
+from paper_exchange import PaperExchange
+
+CONFIG = BotConfig(min_trade_amount=1.0)
+NEUTRAL_RSI, BUY_RSI, SELL_RSI = 50.0, 10.0, 90.0
+
+
+def series(bars):
+    """Velas de 1m a partir de (open, high, low, close)."""
+    bars = np.asarray(bars, dtype=np.float64)
+    return Candles(timestamp=np.arange(len(bars), dtype=np.int64) * 60_000, open=bars[:, 0], high=bars[:, 1],
+                   low=bars[:, 2], close=bars[:, 3], volume=np.ones(len(bars)))
+
+
+def signals(n, **at):
+    """RSI neutral salvo en las velas indicadas: signals(6, buy=[0], sell=[3])."""
+    rsi = np.full(n, NEUTRAL_RSI)
+    rsi[at.get('buy', [])] = BUY_RSI
+    rsi[at.get('sell', [])] = SELL_RSI
+    return rsi
+
+
+def backtest(bars, fee_rate=0.0, allow_short=True, **at):
+    return run_backtest(series(bars), CONFIG, rsi=signals(len(bars), **at), fee_rate=fee_rate,
+                        allow_short=allow_short)
+
+
+# Escenarios de un largo con entrada a 100 (SL 98 / TP 102); la señal sale en la vela 0
+SCENARIOS = {
+    'target': ([(100, 100, 100, 100), (100, 101, 99, 100.5), (100.5, 103, 100, 102.5), (102.5, 103, 102, 103)],
+               EXIT_TARGET, 2, 102.0),
+    'stop': ([(100, 100, 100, 100), (100, 101, 99, 99.5), (99.5, 99.8, 97, 97.5), (97.5, 98, 97, 97.5)],
+             EXIT_STOP, 2, 98.0),
+    'both_in_one_bar': ([(100, 100, 100, 100), (100, 103, 97, 101), (101, 101, 100, 100), (100, 100, 100, 100)],
+                        EXIT_STOP, 1, 98.0),
+    'gap_below_stop': ([(100, 100, 100, 100), (100, 100.5, 99.5, 100), (96, 96.5, 95, 95.5), (95, 96, 95, 95.5)],
+                       EXIT_STOP, 2, 96.0),
+    'gap_above_target': ([(100, 100, 100, 100), (100, 100.5, 99.5, 100), (104, 105, 103.5, 104.5),
+                          (104.5, 105, 104, 104.5)], EXIT_TARGET, 2, 104.0),
+}
+
+
+@pytest.mark.parametrize("name", SCENARIOS)
+def test_protective_exits(name):
+    bars, reason, exit_idx, exit_price = SCENARIOS[name]
+    trade, = backtest(bars, buy=[0]).trade_log
+    assert (trade['entry_idx'], trade['side'], trade['entry_price']) == (1, 1, 100.0)
+    assert (trade['reason'], trade['exit_idx']) == (reason, exit_idx)
+    assert trade['exit_price'] == pytest.approx(exit_price) and trade['pnl'] == pytest.approx(exit_price - 100.0)
+
+
+def test_short_mirrors_the_long_rules():
+    bars = [(100, 100, 100, 100), (100, 101, 99, 100), (100, 100.5, 97.5, 98), (98, 98, 98, 98)]
+    trade, = backtest(bars, sell=[0]).trade_log
+    assert (trade['side'], trade['reason'], trade['exit_idx']) == (-1, EXIT_TARGET, 2)
+    assert trade['exit_price'] == pytest.approx(98.0) and trade['pnl'] == pytest.approx(2.0)
+
+
+def test_opposite_signal_exits_at_next_open_and_reverses():
+    bars = [(100, 100, 100, 100), (100, 100.5, 99.5, 100), (100, 101, 99.5, 100.5), (101, 101.5, 100.5, 101),
+            (101, 101.2, 100.8, 101)]
+    first, second = backtest(bars, buy=[0], sell=[2]).trade_log
+    assert (first['reason'], first['exit_idx'], first['exit_price']) == (EXIT_SIGNAL, 3, 101.0)
+    assert (second['side'], second['entry_idx'], second['entry_price']) == (-1, 3, 101.0)
+    assert second['reason'] == EXIT_END and second['exit_price'] == 101.0
+
+
+def test_long_only_ignores_sell_entries_and_fees_are_charged_per_side():
+    bars = SCENARIOS['target'][0]
+    assert backtest(bars, allow_short=False, sell=[0]).trades == 0
+    result = backtest(bars, fee_rate=0.001, buy=[0])
+    assert result.fees == pytest.approx((100.0 + 102.0) * 0.001)
+    assert result.pnl == pytest.approx(2.0 - result.fees) and result.exits['take_profit'] == 1
+
+
+def test_signal_on_the_last_bar_is_not_traded():
+    assert backtest(SCENARIOS['target'][0], buy=[3]).trades == 0
+
+
+def test_resample_aggregates_ohlcv():
+    candles = series([(1, 2, 0.5, 1.5), (1.5, 3, 1, 2), (2, 2.5, 1.8, 2.2), (2.2, 2.4, 2, 2.1)])
+    two = resample(candles, '2m')
+    assert list(two.open) == [1, 2] and list(two.high) == [3, 2.5] and list(two.low) == [0.5, 1.8]
+    assert list(two.close) == [2, 2.1] and list(two.volume) == [2, 2]
+
+
+@pytest.mark.parametrize("name", SCENARIOS)
+def test_paper_exchange_applies_the_same_rules(name):
+    bars = SCENARIOS[name][0]
+    trade, = backtest(bars, buy=[0]).trade_log
+
+    paper = PaperExchange(fee_rate=0.0, slippage=0.0, timeframe='1m')
+    paper.update_price('BTC/USDT', bars[1][0])   # entrada a la apertura de la vela siguiente a la señal
+    paper.create_order('t@nexus.ai', 'BTC/USDT', 'market', 'buy', 1.0)
+    for kind, level in (('STOP_MARKET', trade['entry_price'] * 0.98), ('TAKE_PROFIT_MARKET', trade['entry_price'] * 1.02)):
+        paper.create_order('t@nexus.ai', 'BTC/USDT', kind, 'sell', 1.0, params={'stopPrice': level, 'closePosition': True})
+    for k, bar in enumerate(bars[1:], 1): paper.on_candle('BTC/USDT', k * 60_000, *bar)
+
+    assert paper.balance('t@nexus.ai')['realized_pnl'] == pytest.approx(round(trade['pnl'], 2))
+    assert paper.symbols('t@nexus.ai') == []
@@ -0,0 +1,124 @@
+"""Brackets (entrada + SL + TP): batch, fallos parciales, cierre de emergencia, OCO y caducidad."""
+
+import time
+
+import ccxt
+import pytest
+
+from benchmarks.fakes import FakeTradingExchange
+from execution_engine import BracketBook, ClientPool, ExecutionService, OrderRequest
+
+EMAIL = 'alice@nexus.ai'
+
+
+class FlakyStopExchange(FakeTradingExchange):
+    """Rechaza el primer STOP_MARKET (el del batch) y acepta el reintento."""
+
+    def _new_order(self, symbol, type, side, amount, price=None, params=None):
+        if type == 'STOP_MARKET' and not self.calls.get('create_order'):
+            raise ccxt.InvalidOrder("binance STOP_MARKET rejected")
+        return super()._new_order(symbol, type, side, amount, price, params)
+
+
+def make_service(exchange, **book):
+    pool = ClientPool(factory=lambda creds: exchange, credentials=lambda email: {'apiKey': 'k', 'secret': 's'})
+    return ExecutionService(pool, price=lambda symbol: 50_000.0, brackets=BracketBook(**book))
+
+
+def bracket(side='buy'):
+    sl, tp = (49_000.0, 52_000.0) if side == 'buy' else (51_000.0, 48_000.0)
+    return OrderRequest(EMAIL, 'BTC/USDT', side, amount=0.01, stop_loss=sl, take_profit=tp)
+
+
+def order_types(exchange):
+    return [(o['type'], o['status']) for o in exchange.orders.values()]
+
+
+def test_bracket_is_placed_in_one_batch():
+    exchange = FakeTradingExchange()
+    service = make_service(exchange)
+    result = service.submit(bracket())
+
+    assert result.ok and result.group.status == 'open'
+    assert exchange.calls.get('create_orders') == 1 and 'create_order' not in exchange.calls
+    assert order_types(exchange) == [('market', 'closed'), ('STOP_MARKET', 'open'), ('TAKE_PROFIT_MARKET', 'open')]
+    sl = exchange.orders[result.group.order_id('stop_loss')]
+    assert sl['side'] == 'sell' and sl['stopPrice'] == 49_000.0
+    assert service.brackets.by_user(EMAIL, 'open') == [result.group]
+
+
+def test_without_batch_support_legs_go_one_by_one():
+    exchange = FakeTradingExchange()
+    exchange.has = {}
+    result = make_service(exchange).submit(bracket('sell'))
+    assert result.ok and exchange.calls.get('create_order') == 3 and 'create_orders' not in exchange.calls
+
+
+def test_rejected_entry_cancels_the_protections():
+    exchange = FakeTradingExchange()
+    exchange.reject_types = {'market'}
+    service = make_service(exchange)
+    result = service.submit(bracket())
+
+    assert not result.ok and result.group.status == 'failed' and 'Entrada' in result.error
+    assert order_types(exchange) == [('STOP_MARKET', 'canceled'), ('TAKE_PROFIT_MARKET', 'canceled')]
+    assert service.brackets.by_user(EMAIL, 'open') == []
+
+
+def test_rejected_protective_leg_is_retried_once():
+    exchange = FlakyStopExchange()
+    service = make_service(exchange)
+    result = service.submit(bracket())
+
+    assert result.ok and result.group.status == 'open'
+    assert service.stats['leg_retries'] == 1 and service.stats['flattened'] == 0
+    assert exchange.orders[result.group.order_id('stop_loss')]['status'] == 'open'
+
+
+def test_unprotected_position_is_flattened():
+    exchange = FakeTradingExchange()
+    exchange.reject_types = {'STOP_MARKET'}   # batch y reintento
+    service = make_service(exchange)
+    result = service.submit(bracket())
+
+    assert not result.ok and result.group.status == 'flattened'
+    assert service.stats['leg_retries'] == 1 and service.stats['flattened'] == 1
+    exit_order = result.group.orders['exit']
+    assert exit_order['side'] == 'sell' and exit_order['reduceOnly'] and exit_order['amount'] == 0.01
+    assert exchange.orders[result.group.order_id('take_profit')]['status'] == 'canceled'
+
+
+@pytest.mark.parametrize("leg, other", [('stop_loss', 'take_profit'), ('take_profit', 'stop_loss')])
+def test_reconcile_cancels_the_other_leg(leg, other):
+    exchange = FakeTradingExchange()
+    service = make_service(exchange)
+    group = service.submit(bracket()).group
+    assert service.reconcile(EMAIL) == []   # nada disparado todavía
+
+    exchange.trigger(group.order_id(leg))
+    assert service.reconcile(EMAIL) == [group]
+    assert group.status == 'closed' and group.exit == leg
+    assert exchange.orders[group.order_id(other)]['status'] == 'canceled'
+    assert service.brackets.by_user(EMAIL, 'open') == []
+
+
+def test_old_brackets_expire():
+    exchange = FakeTradingExchange()
+    service = make_service(exchange, max_age=3600)
+    group = service.submit(bracket()).group
+
+    assert service.expire_stale() == 0
+    assert service.expire_stale(now=time.time() + 7200) == 1
+    assert group.status == 'expired' and service.stats['expired'] == 1
+    assert all(exchange.orders[group.order_id(leg)]['status'] == 'canceled' for leg in ('stop_loss', 'take_profit'))
+
+
+def test_open_brackets_are_capped_per_user():
+    exchange = FakeTradingExchange()
+    service = make_service(exchange, max_open=2)
+    groups = [service.submit(bracket()).group for _ in range(3)]
+    for i, g in enumerate(groups): g.created_at = 1_000.0 + i
+
+    closed = service.reconcile(EMAIL, now=1_010.0)
+    assert closed == [groups[0]] and groups[0].status == 'expired'
+    assert service.brackets.by_user(EMAIL, 'open') == groups[1:]
@@ -0,0 +1,105 @@
+"""Archivo de velas: formato en disco, escritura concurrente entre procesos, grabador y backfill."""
+
+import multiprocessing
+import os
+import time
+
+import numpy as np
+import pytest
+
+from benchmarks.fakes import FakeExchange
+from candle_archive import HEADER_SIZE, RECORD, CandleArchive, CandleRecorder, backfill, open_file
+from candles import Candles
+from market_cache import CandleCache
+
+M = 60_000
+
+
+def minutes(start, stop):
+    ts = np.arange(start, stop, dtype=np.int64) * M
+    close = 100.0 + ts / M
+    return Candles(timestamp=ts, open=close, high=close + 1, low=close - 1, close=close, volume=np.ones(len(ts)))
+
+
+def test_append_keeps_only_newer_candles_and_reads_by_range(tmp_path):
+    archive = CandleArchive(str(tmp_path))
+    assert archive.last_ts('BTC/USDT', '1m') is None
+    assert archive.append('BTC/USDT', '1m', minutes(0, 10)) == 10
+    assert archive.append('BTC/USDT', '1m', minutes(5, 15)) == 5
+    assert archive.append('BTC/USDT', '1m', minutes(0, 15)) == 0
+    assert archive.last_ts('BTC/USDT', '1m') == 14 * M
+
+    window = archive.read('BTC/USDT', '1m', since=3 * M, until=6 * M)
+    assert list(window.timestamp) == [3 * M, 4 * M, 5 * M, 6 * M] and list(window.close) == [103, 104, 105, 106]
+    assert len(archive.read('ETH/USDT', '1m')) == 0
+
+
+def test_partial_record_is_ignored_and_truncated_on_next_append(tmp_path):
+    archive = CandleArchive(str(tmp_path))
+    archive.append('BTC/USDT', '1m', minutes(0, 3))
+    path = archive.path('BTC/USDT', '1m')
+    with open(path, 'ab') as f: f.write(b'\x00' * 20)   # escritura interrumpida
+
+    assert len(open_file(path)) == 3
+    assert archive.append('BTC/USDT', '1m', minutes(3, 5)) == 2
+    assert os.path.getsize(path) == HEADER_SIZE + 5 * RECORD.itemsize
+    assert list(open_file(path).timestamp) == [i * M for i in range(5)]
+
+
+def test_two_writers_do_not_duplicate_candles(tmp_path):
+    api, recorder = CandleArchive(str(tmp_path)), CandleArchive(str(tmp_path))   # un objeto por proceso
+    recorder.append('BTC/USDT', '1m', minutes(0, 5))
+    api.append('BTC/USDT', '1m', minutes(5, 10))
+    assert recorder.append('BTC/USDT', '1m', minutes(3, 12)) == 2   # la cola en disco ya va por 9
+    assert list(api.read('BTC/USDT', '1m').timestamp) == [i * M for i in range(12)]
+
+
+def _writer(root, offset, rounds):
+    archive = CandleArchive(root)
+    for i in range(rounds):
+        archive.append('BTC/USDT', '1m', minutes(i * 3 + offset, i * 3 + offset + 6))
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason="requiere fork")
+def test_concurrent_processes_keep_the_file_strictly_ordered(tmp_path):
+    ctx = multiprocessing.get_context('fork')
+    procs = [ctx.Process(target=_writer, args=(str(tmp_path), offset, 200)) for offset in (0, 1)]
+    for p in procs: p.start()
+    for p in procs: p.join(60)
+    assert all(p.exitcode == 0 for p in procs)
+
+    ts = CandleArchive(str(tmp_path)).read('BTC/USDT', '1m').timestamp
+    assert len(ts) and np.all(np.diff(ts) == M) and ts[0] == 0
+
+
+def test_catalog_lists_archive_files_only(tmp_path):
+    archive = CandleArchive(str(tmp_path))
+    archive.append('BTC/USDT', '1m', minutes(0, 4))
+    archive.append('ETH/USDT', '5m', minutes(0, 2))
+    assert [(s, tf, n) for s, tf, n, _ in archive.catalog()] == [('BTC/USDT', '1m', 4), ('ETH/USDT', '5m', 2)]
+    assert list(CandleArchive(str(tmp_path / 'missing')).catalog()) == []
+
+
+def test_recorder_writes_only_closed_candles(tmp_path):
+    archive = CandleArchive(str(tmp_path))
+    cache = CandleCache(FakeExchange())
+    recorder = CandleRecorder(archive).attach(cache)
+    try:
+        cache.get('BTC/USDT', '1m', 20)
+    finally:
+        recorder.detach(cache)
+
+    live = int(time.time() * 1000) // M * M
+    stored = archive.read('BTC/USDT', '1m').timestamp
+    assert recorder.stats['received'] == 1 and recorder.stats['errors'] == 0
+    assert recorder.stats['written'] == len(stored) == 19 and stored[-1] < live
+
+
+def test_backfill_pages_from_the_last_stored_candle(tmp_path):
+    archive = CandleArchive(str(tmp_path))
+    live = int(time.time() * 1000) // M * M
+    since = live - 30 * M
+    assert backfill(archive, FakeExchange(), 'BTC/USDT', '1m', since, page=7) == 30
+    assert backfill(archive, FakeExchange(), 'BTC/USDT', '1m', since, page=7) == 0
+    ts = archive.read('BTC/USDT', '1m').timestamp
+    assert ts[0] == since and ts[-1] == live - M and np.all(np.diff(ts) == M)
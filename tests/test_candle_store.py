@@ -0,0 +1,97 @@
+"""CandleStore: fusión de rangos descargados, huecos y paginación por cursor."""
+
+import time
+
+import pytest
+
+from benchmarks.fakes import FakeExchange
+from candle_store import CandleStore, decode_cursor, encode_cursor
+from market_cache import CandleCache
+
+M = 60_000
+H = 3_600_000
+
+
+@pytest.fixture
+def store(tmp_path):
+    exchange = FakeExchange()
+    s = CandleStore(str(tmp_path / 'candles.sqlite3'), cache=CandleCache(exchange), exchange=exchange, page_size=4)
+    yield s
+    s.close()
+
+
+def cover(store, *ranges, timeframe='1m'):
+    conn = store._conn()
+    with conn:
+        for a, b in ranges: store._add_coverage(conn, 'BTC/USDT', timeframe, a, b)
+    return store._coverage('BTC/USDT', timeframe)
+
+
+@pytest.mark.parametrize("ranges, merged", [
+    ([(0, 10 * M), (5 * M, 20 * M)], [(0, 20 * M)]),                              # solapados
+    ([(5 * M, 20 * M), (0, 10 * M)], [(0, 20 * M)]),                              # en otro orden
+    ([(0, 10 * M), (11 * M, 20 * M)], [(0, 20 * M)]),                             # contiguos
+    ([(11 * M, 20 * M), (0, 10 * M)], [(0, 20 * M)]),
+    ([(0, 10 * M), (2 * M, 5 * M)], [(0, 10 * M)]),                               # contenido
+    ([(0, 2 * M), (10 * M, 12 * M), (20 * M, 22 * M), (1 * M, 21 * M)], [(0, 22 * M)]),   # une varios
+    ([(0, 10 * M), (12 * M, 20 * M)], [(0, 10 * M), (12 * M, 20 * M)]),          # hueco de una vela
+])
+def test_coverage_merges_overlapping_and_adjacent_ranges(store, ranges, merged):
+    assert cover(store, *ranges) == merged
+
+
+def test_missing_ranges_are_the_gaps_inside_the_request(store):
+    cover(store, (10 * M, 20 * M), (30 * M, 40 * M))
+    assert store.missing_ranges('BTC/USDT', '1m', 0, 50 * M) == [(0, 9 * M), (21 * M, 29 * M), (41 * M, 50 * M)]
+    assert store.missing_ranges('BTC/USDT', '1m', 12 * M, 18 * M) == []
+    assert store.missing_ranges('BTC/USDT', '1m', 15 * M, 35 * M) == [(21 * M, 29 * M)]
+    assert cover(store, (21 * M, 29 * M)) == [(10 * M, 40 * M)]
+    assert store.missing_ranges('BTC/USDT', '1m', 5 * M, 5 * M) == [(5 * M, 5 * M)]
+
+
+def test_backfill_pages_and_only_fetches_the_gaps(store):
+    end = int(time.time() * 1000) // H * H - 2 * H
+    start = end - 19 * H
+    assert store.backfill('BTC/USDT', '1h', start, end) == 20
+    assert store.stats['pages'] == 5   # páginas de 4 velas
+    assert store.backfill('BTC/USDT', '1h', start + 5 * H, end) == 0 and store.stats['pages'] == 5
+    assert store.backfill('BTC/USDT', '1h', start - 2 * H, end) == 2
+    assert store._coverage('BTC/USDT', '1h') == [(start - 2 * H, end)]
+
+
+def test_backward_pages_are_contiguous_and_served_from_disk(store):
+    first, cursor = store.range('BTC/USDT', '1h', limit=10)
+    live_ts = int(time.time() * 1000) // H * H
+    assert len(first) == 10 and first.timestamp[-1] == live_ts
+    assert decode_cursor(cursor) == ('desc', int(first.timestamp[0]) - H)
+
+    second, cursor2 = store.range('BTC/USDT', '1h', limit=10, cursor=cursor)
+    assert len(second) == 10 and second.timestamp[-1] == first.timestamp[0] - H
+    assert list(second.timestamp) == [second.timestamp[0] + i * H for i in range(10)]
+
+    pages = store.stats['pages']
+    again, _ = store.range('BTC/USDT', '1h', limit=10, cursor=cursor)
+    assert list(again.close) == list(second.close) and store.stats['pages'] == pages
+    assert store.stats['disk_hits'] == 1
+
+
+def test_forward_pages_stop_at_the_live_candle(store):
+    live_ts = int(time.time() * 1000) // H * H
+    since = live_ts - 24 * H + 1   # se redondea a la vela siguiente
+    seen, cursor, pages = [], None, 0
+    while True:
+        candles, cursor = store.range('BTC/USDT', '1h', since=None if cursor else since, limit=10, cursor=cursor)
+        seen += candles.timestamp.tolist()
+        pages += 1
+        if cursor is None: break
+        assert decode_cursor(cursor) == ('asc', seen[-1] + H)
+    assert pages == 3 and seen == [live_ts - 23 * H + i * H for i in range(24)]
+
+
+def test_limit_and_cursor_validation(store):
+    with pytest.raises(ValueError):
+        decode_cursor('bm9wZToxMjM')   # "nope:123"
+    with pytest.raises(ValueError):
+        decode_cursor('%%%')
+    assert decode_cursor(encode_cursor('asc', 123)) == ('asc', 123)
+    assert len(store.range('BTC/USDT', '1h', limit=0)[0]) == 1   # limit se acota a [1, MAX_LIMIT]
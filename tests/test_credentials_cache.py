@@ -0,0 +1,91 @@
+"""Caché de credenciales desencriptadas: aciertos, invalidación al guardar y rotación de la clave Fernet."""
+
+import pytest
+from cryptography.fernet import Fernet, MultiFernet
+
+from benchmarks.fakes import fake_users, install_fake_mongo
+from database_manager import CredentialCache, NexusDB
+
+EMAIL = "user00000@nexus.test"
+
+
+@pytest.fixture
+def db():
+    db = NexusDB()
+    install_fake_mongo(db, fake_users(3, with_keys=False))
+    db.decrypts = 0
+    decrypt = db._desencriptar
+
+    def counting(token):
+        db.decrypts += 1
+        return decrypt(token)
+
+    db._desencriptar = counting
+    assert db.guardar_keys_binance(EMAIL, "api-1", "secret-1")
+    return db
+
+
+def test_cached_credentials_skip_mongo_and_decryption(db):
+    assert db.obtener_credenciales_usuario(EMAIL) == {"apiKey": "api-1", "secret": "secret-1"}
+    finds, decrypts = db.users.calls.get('find_one', 0), db.decrypts
+    for _ in range(5): db.obtener_credenciales_usuario(EMAIL)
+    assert db.users.calls.get('find_one', 0) == finds and db.decrypts == decrypts
+    assert db.tiene_keys(EMAIL)
+
+
+def test_saving_keys_invalidates_the_cache(db):
+    db.obtener_credenciales_usuario(EMAIL)
+    assert db.guardar_keys_binance(EMAIL, "api-2", "secret-2")
+    assert db.obtener_credenciales_usuario(EMAIL) == {"apiKey": "api-2", "secret": "secret-2"}
+
+
+def test_expired_ttl_with_same_ciphertext_does_not_decrypt_again(db):
+    db.creds_cache.ttl = 0.0
+    db.obtener_credenciales_usuario(EMAIL)
+    decrypts = db.decrypts
+    assert db.obtener_credenciales_usuario(EMAIL)["apiKey"] == "api-1"
+    assert db.decrypts == decrypts          # misma cifra en Mongo: se renueva sin desencriptar
+
+
+def test_ciphertext_changed_behind_the_cache_is_detected(db):
+    db.creds_cache.ttl = 0.0
+    db.obtener_credenciales_usuario(EMAIL)
+    # Otro proceso guarda claves nuevas (esta instancia no invalida su caché)
+    new = {"api_key": db._encriptar("api-3"), "secret_key": db._encriptar("secret-3")}
+    db.users.update_one({"email": EMAIL}, {"$set": {"exchange_keys": new}})
+    assert db.obtener_credenciales_usuario(EMAIL)["apiKey"] == "api-3"
+
+
+def test_key_rotation_keeps_credentials_readable(db):
+    old_key, new_key = Fernet.generate_key(), Fernet.generate_key()
+    db.cipher = MultiFernet([Fernet(old_key)])
+    db.guardar_keys_binance(EMAIL, "api-r", "secret-r")
+    before = db.users.find_one({"email": EMAIL})["exchange_keys"]
+
+    # FERNET_KEY nueva + la antigua en FERNET_OLD_KEYS
+    db.cipher = MultiFernet([Fernet(new_key), Fernet(old_key)])
+    assert db.obtener_credenciales_usuario(EMAIL)["apiKey"] == "api-r"
+    assert db.rotar_cifrado_usuario(EMAIL)
+    after = db.users.find_one({"email": EMAIL})["exchange_keys"]
+    assert after != before and EMAIL not in db.creds_cache._data
+
+    # Ya solo hace falta la clave nueva
+    db.cipher = MultiFernet([Fernet(new_key)])
+    assert db.obtener_credenciales_usuario(EMAIL) == {"apiKey": "api-r", "secret": "secret-r"}
+
+
+def test_bulk_preload_fills_the_cache(db):
+    db.guardar_keys_binance("user00001@nexus.test", "api-b", "secret-b")
+    assert db.precargar_credenciales([EMAIL, "user00001@nexus.test", "user00002@nexus.test"]) == 2
+    finds = db.users.calls.get('find_one', 0)
+    assert db.obtener_credenciales_usuario("user00001@nexus.test")["apiKey"] == "api-b"
+    assert db.users.calls.get('find_one', 0) == finds
+
+
+def test_lru_evicts_the_least_recently_used():
+    cache = CredentialCache(maxsize=2, ttl=60)
+    cache.put("a", ("t",), {"k": 1})
+    cache.put("b", ("t",), {"k": 2})
+    cache.get("a")
+    cache.put("c", ("t",), {"k": 3})
+    assert cache.get("b") is None and cache.get("a") == {"k": 1} and len(cache) == 2
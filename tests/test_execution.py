@@ -0,0 +1,73 @@
+"""ExecutionService: órdenes de mercado por cuenta, límite de órdenes y señales neutrales."""
+
+import pytest
+
+from benchmarks.fakes import FakeTradingExchange
+from execution_engine import ClientPool, ExecutionService, OrderRequest
+
+KEYS = {'alice@nexus.ai': {'apiKey': 'a', 'secret': 'sa'}, 'bob@nexus.ai': {'apiKey': 'b', 'secret': 'sb'}}
+
+
+@pytest.fixture
+def exchanges():
+    return {}
+
+
+@pytest.fixture
+def service(exchanges):
+    def factory(creds):
+        exchanges[creds['apiKey']] = FakeTradingExchange(creds)
+        return exchanges[creds['apiKey']]
+
+    pool = ClientPool(factory=factory, credentials=KEYS.get, rate=3, period=60)
+    svc = ExecutionService(pool, price=lambda symbol: 50_000.0, max_wait=0.0)
+    yield svc
+    svc.close()
+
+
+def test_market_order_fills_with_quote_amount(service, exchanges):
+    result = service.submit(OrderRequest('alice@nexus.ai', 'BTC/USDT', 'buy', quote_amount=100))
+    assert result.ok and result.error is None
+    assert result.order['status'] == 'closed' and result.order['amount'] == pytest.approx(100 / 50_000)
+    assert result.order['clientOrderId'] == result.request.client_order_id
+    assert exchanges['a'].calls == {'load_markets': 1, 'create_order': 1}
+    assert set(result.timings) >= {'credentials', 'price', 'throttle', 'exchange', 'total'}
+
+
+def test_clients_are_reused_and_markets_loaded_once(service, exchanges):
+    for email in ('alice@nexus.ai', 'bob@nexus.ai', 'alice@nexus.ai'):
+        assert service.submit(OrderRequest(email, 'BTC/USDT', 'buy', amount=0.01)).ok
+    assert service.pool.stats['created'] == 2 and service.pool.stats['reused'] == 1
+    assert exchanges['a'].calls.get('load_markets') == 1 and 'load_markets' not in exchanges['b'].calls
+
+
+def test_user_without_keys_is_rejected(service):
+    result = service.submit(OrderRequest('nobody@nexus.ai', 'BTC/USDT', 'buy', amount=0.01))
+    assert not result.ok and 'API Keys' in result.error
+    assert service.stats['rejected'] == 1
+
+
+def test_account_order_limit_throttles_before_the_exchange(service, exchanges):
+    results = [service.submit(OrderRequest('alice@nexus.ai', 'BTC/USDT', 'buy', amount=0.01)) for _ in range(4)]
+    assert [r.ok for r in results] == [True, True, True, False]
+    assert 'Límite' in results[-1].error and service.stats['throttled'] == 1
+    assert exchanges['a'].calls['create_order'] == 3
+    # El límite es por cuenta: otro usuario sigue operando
+    assert service.submit(OrderRequest('bob@nexus.ai', 'BTC/USDT', 'buy', amount=0.01)).ok
+
+
+def test_submit_many_keeps_request_order(service):
+    requests = [OrderRequest(email, 'BTC/USDT', side, amount=0.01)
+                for email in KEYS for side in ('buy', 'sell')]
+    results = service.submit_many(requests)
+    assert [r.request for r in results] == requests and all(r.ok for r in results)
+
+
+@pytest.mark.parametrize("paper, expected", [(True, 'BUY'), (False, 'NEUTRAL')])
+def test_neutral_rsi_only_forces_a_buy_in_paper_trading(paper, expected):
+    from bot_executor import AIAnalyzer
+    from nexus_core import BotConfig, MarketData, TradingSignal
+
+    analyzer = AIAnalyzer(BotConfig(paper_trading=paper))
+    signal = analyzer.analyze_market(MarketData(symbol='BTC/USDT', current_price=50_000.0, rsi=50.0))
+    assert signal.signal == TradingSignal[expected]
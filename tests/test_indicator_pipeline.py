@@ -0,0 +1,71 @@
+"""Pipeline de indicadores: una vez por vela para todos los suscriptores, mismos valores que el batch."""
+
+import math
+
+import pytest
+
+from candles import Candles
+from indicators import IndicatorPipeline, bollinger_batch, ema_batch, macd_batch, rsi_batch
+
+
+@pytest.fixture
+def candles(ohlcv_rows):
+    return Candles.from_rows(ohlcv_rows)
+
+
+@pytest.fixture
+def pipeline():
+    p = IndicatorPipeline()
+    p.subscribe('rsi-bot', ['rsi', 'ema:20'])
+    p.subscribe('trend-bot', ['ema:20', 'macd', 'bb:20:2'])
+    return p
+
+
+def test_union_is_computed_once_per_candle(pipeline, candles):
+    assert pipeline.specs == ('rsi', 'ema:20', 'macd', 'bb:20:2')
+    first = pipeline.compute('BTC/USDT', '1m', candles)
+    for _ in range(5): assert pipeline.compute('BTC/USDT', '1m', candles) is first
+    assert pipeline.stats == {'hits': 5, 'computed': 1}
+
+
+def test_in_progress_candle_and_new_specs_recompute(pipeline, candles, ohlcv_rows):
+    pipeline.compute('BTC/USDT', '1m', candles)
+    revised = [list(r) for r in ohlcv_rows]
+    revised[-1][4] += 1.0   # la vela en curso cambia de cierre
+    pipeline.compute('BTC/USDT', '1m', Candles.from_rows(revised))
+    assert pipeline.stats['computed'] == 2
+
+    pipeline.subscribe('atr-bot', ['atr'])
+    assert 'atr' in pipeline.compute('BTC/USDT', '1m', Candles.from_rows(revised))
+    assert pipeline.stats['computed'] == 3
+
+
+def test_values_match_the_batch_functions(pipeline, candles, closes):
+    values = pipeline.compute('BTC/USDT', '1m', candles)
+    macd, signal, hist = macd_batch(closes)
+    mid, upper, lower = bollinger_batch(closes, 20, 2.0)
+    assert values['rsi'] == pytest.approx(rsi_batch(closes)[-1])
+    assert values['ema_20'] == pytest.approx(ema_batch(closes, 20)[-1])
+    assert (values['macd'], values['macd_signal'], values['macd_hist']) == pytest.approx((macd[-1], signal[-1], hist[-1]))
+    assert (values['bb_20_2_mid'], values['bb_20_2_upper'], values['bb_20_2_lower']) == \
+        pytest.approx((mid[-1], upper[-1], lower[-1]))
+
+
+def test_view_only_returns_the_subscriber_keys(pipeline, candles):
+    values = pipeline.compute('BTC/USDT', '1m', candles)
+    assert set(pipeline.view(values, 'rsi-bot')) == {'rsi', 'ema_20'}
+    assert set(pipeline.get('BTC/USDT', '1m', candles, 'trend-bot')) == \
+        {'ema_20', 'macd', 'macd_signal', 'macd_hist', 'bb_20_2_mid', 'bb_20_2_upper', 'bb_20_2_lower'}
+    assert pipeline.view(values, 'unknown') == {}
+
+
+def test_short_windows_drop_nan_values(candles):
+    pipeline = IndicatorPipeline()
+    pipeline.subscribe('slow', ['ema:500'])
+    values = pipeline.compute('BTC/USDT', '1m', candles)
+    assert math.isnan(values['ema_500']) and pipeline.view(values, 'slow') == {}
+
+
+def test_unknown_indicator_is_rejected():
+    with pytest.raises(ValueError):
+        IndicatorPipeline().subscribe('bot', ['ichimoku'])
@@ -0,0 +1,67 @@
+"""RSI vectorizado (rsi_batch) e incremental (RSIEngine) frente a un Wilder de referencia."""
+
+import numpy as np
+import pytest
+
+from indicators import RSIEngine, rsi_batch, rsi_last
+from nexus_core import calculate_rsi
+
+
+def wilder_reference(prices, period=14):
+    """El bucle por vela original, vela a vela."""
+    prices = list(prices)
+    deltas = np.diff(prices)
+    up = deltas[:period].clip(min=0).sum() / period
+    down = -deltas[:period].clip(max=0).sum() / period
+    out = [np.nan] * len(prices)
+    out[period] = 100. - 100. / (1. + up / down)
+    for i in range(period + 1, len(prices)):
+        delta = deltas[i - 1]
+        up = (up * (period - 1) + max(delta, 0.)) / period
+        down = (down * (period - 1) + max(-delta, 0.)) / period
+        out[i] = 100. - 100. / (1. + up / down)
+    return np.array(out)
+
+
+def test_batch_matches_reference(closes):
+    np.testing.assert_allclose(rsi_batch(closes), wilder_reference(closes), rtol=1e-9, equal_nan=True)
+
+
+def test_batch_on_matrix_matches_each_row(closes):
+    matrix = np.vstack([closes, closes[::-1], closes * 2])
+    out = rsi_batch(matrix)
+    for row, prices in zip(out, matrix):
+        np.testing.assert_allclose(row, rsi_batch(prices), equal_nan=True)
+
+
+def test_short_series_is_nan_and_calculate_rsi_is_neutral():
+    assert np.isnan(rsi_last([1.0, 2.0, 3.0]))
+    assert calculate_rsi([1.0, 2.0, 3.0]) == 50.0
+
+
+def test_incremental_sync_equals_batch(closes):
+    ts = np.arange(len(closes)) * 60_000
+    engine = RSIEngine()
+    engine.seed('BTC/USDT', '1m', closes[:100], ts[:100])
+    for end in range(101, len(closes) + 1, 7):
+        rsi = engine.sync('BTC/USDT', '1m', ts[:end], closes[:end])
+        assert rsi == pytest.approx(rsi_last(closes[:end]), rel=1e-9)
+
+
+def test_update_of_candle_in_progress_recomputes_it(closes):
+    ts = np.arange(len(closes)) * 60_000
+    engine = RSIEngine()
+    engine.seed('BTC/USDT', '1m', closes, ts)
+    revised = closes.copy()
+    revised[-1] += 5
+    rsi = engine.update('BTC/USDT', '1m', revised[-1], int(ts[-1]))
+    assert rsi == pytest.approx(rsi_last(revised), rel=1e-9)
+
+
+def test_gap_reseeds(closes):
+    ts = np.arange(len(closes)) * 60_000
+    engine = RSIEngine()
+    engine.seed('BTC/USDT', '1m', closes[:100], ts[:100])
+    # Bloque que ya no contiene la última vela vista: se re-siembra con él
+    rsi = engine.sync('BTC/USDT', '1m', ts[150:], closes[150:])
+    assert rsi == pytest.approx(rsi_last(closes[150:]), rel=1e-9)
@@ -0,0 +1,64 @@
+"""Arranque ligero: los workers no cargan dependencias pesadas al importar y nexus_core basta para operar."""
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import nexus_core
+from benchmarks.bench_startup import HEAVY, ROOT, cold_import
+from nexus_core.lazy import lazy_import
+
+
+@pytest.mark.parametrize("module", ['nexus_core', 'bot_executor'])
+def test_import_does_not_load_heavy_dependencies(module):
+    assert cold_import(module, runs=1)['heavy_loaded'] == []
+
+
+def run_python(code: str) -> dict:
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True,
+                         env=dict(os.environ, PYTHONPATH=ROOT))
+    assert out.returncode == 0, out.stderr
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def test_lazy_module_loads_on_first_attribute_access():
+    probe = run_python(
+        "import sys, json\n"
+        "from nexus_core.lazy import lazy_import\n"
+        "m = lazy_import('colorsys')\n"
+        "before = type(sys.modules['colorsys']).__name__\n"
+        "value = m.rgb_to_hsv(1.0, 0.0, 0.0)\n"
+        "print(json.dumps({'before': before, 'after': type(sys.modules['colorsys']).__name__, 'value': value}))\n")
+    assert probe['before'] != 'module' and probe['after'] == 'module'
+    assert probe['value'] == [0.0, 1.0, 1.0]
+
+
+def test_lazy_import_returns_modules_already_loaded():
+    assert lazy_import('json') is json
+    with pytest.raises(ModuleNotFoundError):
+        lazy_import('nexus_module_that_does_not_exist')
+
+
+def test_core_reexports_are_shared_with_the_bot():
+    import bot_executor
+    from nexus_core import config, signals
+
+    assert set(nexus_core.__all__) == {'BotConfig', 'MarketData', 'OrderStatus', 'TradeSignal', 'TradingSignal',
+                                       'calculate_rsi', 'rsi_from_ohlcv', 'rsi_signal'}
+    assert nexus_core.BotConfig is config.BotConfig is bot_executor.BotConfig
+    assert nexus_core.rsi_from_ohlcv is signals.rsi_from_ohlcv is bot_executor.rsi_from_ohlcv
+    assert nexus_core.rsi_signal(20) == nexus_core.TradingSignal.BUY
+    assert nexus_core.rsi_signal(80) == nexus_core.TradingSignal.SELL
+    assert nexus_core.rsi_signal(50) == nexus_core.TradingSignal.NEUTRAL
+
+
+def test_rsi_from_ohlcv_falls_back_without_the_incremental_engine(ohlcv_rows, closes):
+    expected = nexus_core.calculate_rsi(closes)
+    short_rows = [row[:5] for row in ohlcv_rows]   # sin volumen: Candles no las acepta
+    assert nexus_core.rsi_from_ohlcv('LAZY/TEST', '1m', short_rows) == pytest.approx(expected)
+    assert nexus_core.rsi_from_ohlcv('LAZY/TEST', '1m', ohlcv_rows) == pytest.approx(expected)
+    assert nexus_core.rsi_from_ohlcv('LAZY/TEST', '1m', None) == 50.0
+    assert nexus_core.rsi_from_ohlcv('LAZY/TEST', '1m', [['x']]) == 50.0
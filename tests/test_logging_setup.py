@@ -0,0 +1,92 @@
+"""Logs: supresión de duplicados con resumen, registros forzados y formato JSON."""
+
+import io
+import json
+import logging
+import sys
+
+import pytest
+
+import logging_setup
+from logging_setup import DedupFilter, JsonFormatter, message_key
+
+
+def record(msg, *args, created=1_000.0, level=logging.ERROR, name='NexusBot', **extra):
+    rec = logging.makeLogRecord({'name': name, 'levelno': level, 'levelname': logging.getLevelName(level),
+                                 'msg': msg, 'args': args or None, **extra})
+    rec.created = created
+    return rec
+
+
+def test_variable_parts_are_one_message_type():
+    a = record("❌ El usuario alice@nexus.ai no ha configurado sus API Keys (RSI 31.25, orden 1a2b3c4d5e)")
+    b = record("❌ El usuario bob.smith+x@mail.co.uk no ha configurado sus API Keys (RSI 70, orden ffee0011aa)")
+    assert message_key(a) == message_key(b)
+    assert message_key(a) != message_key(record(a.msg, level=logging.WARNING))
+
+
+def test_duplicates_are_suppressed_and_summarised():
+    dedup = DedupFilter(window=300)
+    passed = [dedup.filter(record("Error datos usuario %s", f"u{i}@nexus.ai", created=1_000.0 + i * 0.01))
+              for i in range(5000)]
+    assert passed.count(True) == 1 and dedup.stats == {'passed': 1, 'suppressed': 4999, 'summaries': 0}
+
+    assert dedup.flush(now=1_100.0) == []   # ventana aún abierta
+    summary, = dedup.flush(now=1_300.0)
+    assert summary.repeated == 4999 and "repetido 4999× en los últimos" in summary.getMessage()
+    assert summary.getMessage().startswith("Error datos usuario u4999@nexus.ai")
+    assert dedup.filter(summary)   # los resúmenes no se vuelven a filtrar
+
+
+def test_new_window_lets_the_message_through_and_queues_the_summary():
+    dedup = DedupFilter(window=10)
+    assert dedup.filter(record("Timeout 1", created=0.0))
+    assert not dedup.filter(record("Timeout 2", created=5.0))
+    assert dedup.filter(record("Timeout 3", created=12.0))
+    pending, = dedup.flush(now=13.0)
+    assert pending.repeated == 1 and pending.getMessage().startswith("Timeout 2")
+
+
+def test_dedup_false_always_passes():
+    dedup = DedupFilter(window=300)
+    assert all(dedup.filter(record("✅ [PAPER TRADE] BUY 0.01 BTC/USDT", dedup=False)) for _ in range(3))
+    assert dedup.stats['suppressed'] == 0
+
+
+def test_force_flush_summarises_open_windows():
+    dedup = DedupFilter(window=300)
+    for i in range(3): dedup.filter(record("Error %d", i, created=1_000.0))
+    assert [s.repeated for s in dedup.flush(now=1_001.0, force=True)] == [2]
+    assert dedup.flush(now=1_001.0, force=True) == []
+
+
+def test_json_formatter_fields():
+    rec = record("Precio %s", 65000.5, level=logging.INFO, symbol='BTC/USDT', dedup=False)
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        rec.exc_info = sys.exc_info()
+    doc = json.loads(JsonFormatter().format(rec))
+    assert doc['level'] == 'INFO' and doc['logger'] == 'NexusBot' and doc['msg'] == 'Precio 65000.5'
+    assert doc['symbol'] == 'BTC/USDT' and 'dedup' not in doc
+    assert 'ValueError: boom' in doc['exc'] and doc['ts'].endswith('+00:00')
+
+
+@pytest.fixture
+def pipeline():
+    out = io.StringIO()
+    logging_setup.setup_logging(level='INFO', json_format=True, log_file=None, dedup_window=300, stream=out)
+    yield out
+    logging_setup.shutdown_logging()
+
+
+def test_pipeline_writes_json_lines_and_summaries_on_shutdown(pipeline):
+    log = logging.getLogger('NexusTest')
+    for i in range(50): log.error(f"No se pudo consultar stop_loss {i}")
+    log.info("orden ejecutada", extra={'dedup': False})
+    log.info("orden ejecutada", extra={'dedup': False})
+    logging_setup.shutdown_logging()
+
+    lines = [json.loads(line) for line in pipeline.getvalue().splitlines()]
+    assert [d['msg'] for d in lines[:3]] == ["No se pudo consultar stop_loss 0", "orden ejecutada", "orden ejecutada"]
+    assert lines[-1]['repeated'] == 49 and "repetido 49×" in lines[-1]['msg']
@@ -0,0 +1,146 @@
+"""CandleCache: single-flight, aciertos hasta el cierre de la vela y errores compartidos."""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from benchmarks.fakes import FakeExchange
+from market_cache import CandleCache
+
+
+class FailingExchange(FakeExchange):
+    def __init__(self, failures: int, latency: float = 0.0):
+        super().__init__(latency)
+        self.failures = failures
+
+    def fetch_ohlcv(self, symbol, timeframe='1m', since=None, limit=None, params=None):
+        self._count('fetch_ohlcv')
+        time.sleep(self.latency)
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("exchange caído")
+        return self._ohlcv(symbol, timeframe, since, limit)
+
+
+def concurrent_gets(cache, n=20, **kwargs):
+    barrier, results, errors = threading.Barrier(n), [], []
+
+    def worker():
+        barrier.wait()
+        try:
+            results.append(cache.get('BTC/USDT', '1h', 100, **kwargs))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(n)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    return results, errors
+
+
+def test_concurrent_misses_make_one_exchange_call():
+    exchange = FakeExchange(latency=0.05)
+    cache = CandleCache(exchange)
+    results, errors = concurrent_gets(cache)
+    assert not errors and len(results) == 20
+    assert exchange.calls == {'fetch_ohlcv': 1}
+    assert all(r.timestamp[-1] == results[0].timestamp[-1] and len(r) == 100 for r in results)
+
+
+def test_second_read_before_bar_close_is_a_hit():
+    exchange = FakeExchange()
+    cache = CandleCache(exchange)
+    first = cache.get('BTC/USDT', '1h', 50)
+    again = cache.get('BTC/USDT', '1h', 50)
+    assert exchange.calls['fetch_ohlcv'] == 1
+    assert cache.stats['hits'] == 1
+    assert again.close.tolist() == first.close.tolist()
+
+
+def test_deeper_request_refetches():
+    exchange = FakeExchange()
+    cache = CandleCache(exchange)
+    cache.get('BTC/USDT', '1h', 50)
+    assert len(cache.get('BTC/USDT', '1h', 200)) == 200
+    assert exchange.calls['fetch_ohlcv'] == 2
+
+
+def test_short_response_is_not_reported_as_deeper():
+    exchange = FakeExchange()
+    fetch = exchange.fetch_ohlcv
+    exchange.fetch_ohlcv = lambda symbol, tf, since=None, limit=None: fetch(symbol, tf, since, limit)[-60:]
+    cache = CandleCache(exchange)
+    assert len(cache.get('BTC/USDT', '1h', 100)) == 60
+    assert cache._entries[('BTC/USDT', '1h')].depth == 60
+    # 100 velas no caben en lo guardado: no es un acierto
+    cache.get('BTC/USDT', '1h', 100)
+    assert exchange.calls['fetch_ohlcv'] == 2 and cache.stats['hits'] == 0
+    assert len(cache.get('BTC/USDT', '1h', 60)) == 60 and cache.stats['hits'] == 1
+
+
+def test_follower_needing_more_than_the_leader_fetches_again():
+    exchange = FakeExchange(latency=0.05)
+    cache = CandleCache(exchange)
+    results = {}
+    leader = threading.Thread(target=lambda: results.setdefault('leader', cache.get('BTC/USDT', '1h', 50)))
+    leader.start()
+    time.sleep(0.01)   # el líder ya está descargando 50
+    results['follower'] = cache.get('BTC/USDT', '1h', 200)
+    leader.join()
+    assert len(results['leader']) == 50 and len(results['follower']) == 200
+    assert exchange.calls['fetch_ohlcv'] == 2
+
+
+async def _aget_pair(cache):
+    small = asyncio.ensure_future(cache.aget('BTC/USDT', '1h', 50))
+    await asyncio.sleep(0.005)   # el líder ya está descargando 50
+    large = await cache.aget('BTC/USDT', '1h', 200)
+    return await small, large
+
+
+def test_async_follower_needing_more_than_the_leader_fetches_again():
+    exchange = FakeExchange(latency=0.02)
+    cache = CandleCache(exchange)
+    small, large = asyncio.run(_aget_pair(cache))
+    assert len(small) == 50 and len(large) == 200 and exchange.calls['fetch_ohlcv'] == 2
+
+
+def test_expired_entry_fetches_incrementally():
+    exchange = FakeExchange()
+    sinces = []
+    fetch = exchange.fetch_ohlcv
+    exchange.fetch_ohlcv = lambda symbol, tf, since=None, limit=None: sinces.append(since) or fetch(symbol, tf, since, limit)
+    cache = CandleCache(exchange)
+    last_ts = int(cache.get('BTC/USDT', '1m', 100).timestamp[-1])
+    cache._entries[('BTC/USDT', '1m')].expires_at = 0.0   # la vela en curso "ha cerrado"
+    candles = cache.get('BTC/USDT', '1m', 100)
+    # Solo se piden las velas desde la última conocida (que se re-escribe)
+    assert sinces == [None, last_ts]
+    assert len(candles) == 100 and candles.timestamp[-1] >= last_ts
+
+
+def test_leader_error_reaches_followers_and_is_not_cached():
+    exchange = FailingExchange(failures=1, latency=0.05)
+    cache = CandleCache(exchange)
+    results, errors = concurrent_gets(cache)
+    assert len(errors) == 20 and all(isinstance(e, ConnectionError) for e in errors)
+    assert exchange.calls['fetch_ohlcv'] == 1
+    # El fallo no deja la clave bloqueada: la siguiente lectura reintenta
+    assert len(cache.get('BTC/USDT', '1h', 100)) == 100
+    assert exchange.calls['fetch_ohlcv'] == 2
+
+
+def test_listeners_receive_downloaded_candles_and_errors_are_isolated():
+    cache = CandleCache(FakeExchange())
+    seen = []
+    cache.add_listener(lambda *a: 1 / 0)
+    cache.add_listener(lambda symbol, tf, candles: seen.append((symbol, tf, len(candles))))
+    cache.get('ETH/USDT', '5m', 30)
+    assert seen == [('ETH/USDT', '5m', 30)]
+
+
+def test_invalid_timeframe():
+    with pytest.raises(ValueError):
+        CandleCache(FakeExchange()).get('BTC/USDT', '7x', 10)
@@ -0,0 +1,87 @@
+"""Rutas de mercado async: una descarga para N peticiones y sin bloquear el event loop."""
+
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from benchmarks.fakes import AsyncFakeExchange, FakeExchange
+from market_cache import CandleCache
+
+
+@pytest.fixture
+def api(monkeypatch):
+    import main
+    exchange = AsyncFakeExchange(latency=0.02)
+    cache = CandleCache(FakeExchange(), async_exchange=exchange)
+
+    async def no_ai(price, change, rsi): return "sin IA en tests"
+
+    monkeypatch.setattr(main, 'candle_cache', cache)
+    monkeypatch.setattr(main, 'exchange_async', exchange)
+    monkeypatch.setattr(main, 'get_ai_analysis', no_ai)
+    return main, exchange
+
+
+async def _get_many(app, path, n):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await asyncio.gather(*(client.get(path) for _ in range(n)))
+
+
+def test_concurrent_btc_requests_share_one_candle_download(api):
+    main, exchange = api
+    responses = asyncio.run(_get_many(main.app, "/api/market/btc", 20))
+    bodies = [r.json() for r in responses]
+    assert all(b['status'] == 'LIVE' for b in bodies)
+    assert exchange.calls['fetch_ohlcv'] == 1
+    assert 0 <= bodies[0]['rsi'] <= 100
+
+
+def test_candles_route_serves_rows_and_cursor(api):
+    main, _ = api
+    response, = asyncio.run(_get_many(main.app, "/api/market/candles?limit=50", 1))
+    rows = response.json()
+    assert len(rows) == 50 and set(rows[0]) == {'time', 'open', 'high', 'low', 'close'}
+    assert response.headers['X-Next-Cursor']
+
+
+def test_sync_exchange_fallback_runs_off_the_event_loop():
+    cache = CandleCache(FakeExchange(latency=0.2))   # sin cliente async: to_thread
+
+    async def scenario():
+        ticks = 0
+
+        async def heartbeat():
+            nonlocal ticks
+            end = time.monotonic() + 0.15
+            while time.monotonic() < end:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        await asyncio.gather(cache.aget('BTC/USDT', '1h', 20), heartbeat())
+        return ticks
+
+    assert asyncio.run(scenario()) >= 8
+
+
+def test_async_single_flight_and_shared_error():
+    class Broken(AsyncFakeExchange):
+        async def fetch_ohlcv(self, *args, **kwargs):
+            self._count('fetch_ohlcv')
+            await asyncio.sleep(0.02)
+            raise ConnectionError("exchange caído")
+
+    async def scenario(exchange):
+        cache = CandleCache(FakeExchange(), async_exchange=exchange)
+        return await asyncio.gather(*(cache.aget('ETH/USDT', '5m', 30) for _ in range(10)), return_exceptions=True)
+
+    ok = AsyncFakeExchange(latency=0.02)
+    assert all(len(r) == 30 for r in asyncio.run(scenario(ok)))
+    assert ok.calls['fetch_ohlcv'] == 1
+
+    broken = Broken()
+    results = asyncio.run(scenario(broken))
+    assert all(isinstance(r, ConnectionError) for r in results)
+    assert broken.calls['fetch_ohlcv'] == 1
@@ -0,0 +1,96 @@
+"""Stream de mercado: velas en curso/nuevas/huecos sobre la caché y frescura de los tickers."""
+
+import time
+
+import pytest
+
+from benchmarks.fakes import FakeExchange
+from market_cache import CandleCache
+from market_stream import MarketStream, TickerStore, stream_symbol
+
+HOUR = 3_600_000
+
+
+@pytest.fixture
+def seeded():
+    """Caché con 100 velas de 1h descargadas por REST."""
+    exchange = FakeExchange()
+    cache = CandleCache(exchange)
+    candles = cache.get('BTC/USDT', '1h', 100)
+    return cache, exchange, int(candles.timestamp[-1])
+
+
+def kline(symbol, ts, close, interval='1h'):
+    return {'stream': f"{stream_symbol(symbol)}@kline_{interval}",
+            'data': {'e': 'kline', 's': stream_symbol(symbol).upper(),
+                     'k': {'t': ts, 'i': interval, 'o': '100', 'h': str(close + 1), 'l': '99',
+                           'c': str(close), 'v': '5'}}}
+
+
+def test_in_progress_candle_is_replaced(seeded):
+    cache, exchange, last_ts = seeded
+    assert cache.apply_candle('BTC/USDT', '1h', [last_ts, 1, 2, 0.5, 1.5, 9])
+    candles = cache.get('BTC/USDT', '1h', 100)
+    assert len(candles) == 100 and candles.timestamp[-1] == last_ts and candles.close[-1] == 1.5
+    assert exchange.calls == {'fetch_ohlcv': 1}
+
+
+def test_next_candle_is_appended_and_served_without_rest(seeded):
+    cache, exchange, last_ts = seeded
+    assert cache.apply_candle('BTC/USDT', '1h', [last_ts + HOUR, 1, 2, 0.5, 1.5, 9])
+    assert cache.is_live('BTC/USDT', '1h')
+    candles = cache.get('BTC/USDT', '1h', 100)
+    assert candles.timestamp[-1] == last_ts + HOUR and candles.timestamp[-2] == last_ts
+    assert exchange.calls == {'fetch_ohlcv': 1}
+
+
+def test_gap_is_dropped_and_refilled_incrementally(seeded):
+    cache, exchange, last_ts = seeded
+    assert not cache.apply_candle('BTC/USDT', '1h', [last_ts + 3 * HOUR, 1, 2, 0.5, 1.5, 9])
+    assert not cache.is_live('BTC/USDT', '1h')
+
+    since = []
+    fetch = exchange.fetch_ohlcv
+    exchange.fetch_ohlcv = lambda s, tf, sc=None, lim=None: since.append(sc) or fetch(s, tf, sc, lim)
+    cache.get('BTC/USDT', '1h', 100)
+    assert since == [last_ts]   # REST desde la última vela conocida, no la serie entera
+
+
+def test_out_of_order_candle_is_ignored(seeded):
+    cache, _, last_ts = seeded
+    before = cache.get('BTC/USDT', '1h', 100)
+    assert not cache.apply_candle('BTC/USDT', '1h', [last_ts - HOUR, 1, 2, 0.5, 1.5, 9])
+    after = cache.get('BTC/USDT', '1h', 100)
+    assert list(after.close) == list(before.close)
+
+
+def test_stream_messages_feed_cache_and_tickers(seeded):
+    cache, exchange, last_ts = seeded
+    tickers = TickerStore()
+    stream = MarketStream(['BTC/USDT'], timeframes=['1h'], cache=cache, tickers=tickers)
+    assert stream.streams() == ['btcusdt@kline_1h', 'btcusdt@ticker']
+
+    stream.handle(kline('BTC/USDT', last_ts, 123.0))
+    stream.handle({'data': {'e': '24hrTicker', 's': 'BTCUSDT', 'c': '123.0', 'P': '1.5', 'q': '1000',
+                            'b': '122.9', 'a': '123.1', 'E': 1}})
+    stream.handle(kline('ETH/USDT', last_ts, 5.0))   # no suscrito: se ignora
+
+    assert cache.get('BTC/USDT', '1h', 100).close[-1] == 123.0
+    assert tickers.get('BTC/USDT')['last'] == 123.0 and tickers.get('BTC/USDT')['percentage'] == 1.5
+    assert stream.stats['candles'] == 1 and stream.stats['tickers'] == 1 and stream.stats['messages'] == 2
+    assert exchange.calls == {'fetch_ohlcv': 1}
+
+
+def test_ticker_store_only_serves_fresh_tickers():
+    store = TickerStore(max_age=30)
+    store.update('BTC/USDT', {'last': 100.0})
+    store.update('ETH/USDT', {'last': 10.0})
+    store._tickers['ETH/USDT']['received'] = time.time() - 60
+
+    assert store.get('BTC/USDT')['last'] == 100.0
+    assert store.get('ETH/USDT') is None
+    assert store.get('ETH/USDT', max_age=120)['last'] == 10.0
+    assert set(store.snapshot(['BTC/USDT', 'ETH/USDT', 'SOL/USDT'])) == {'BTC/USDT'}
+
+    store.update_trade('BTC/USDT', {'price': 101.0, 'amount': 1.0, 'timestamp': 1})
+    assert store.get('BTC/USDT')['last'] == 101.0 and store.last_trade('BTC/USDT')['price'] == 101.0
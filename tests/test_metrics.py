@@ -0,0 +1,60 @@
+"""Métricas: formato Prometheus, seudónimos de usuario y acceso a /metrics."""
+
+import asyncio
+
+import httpx
+import pytest
+
+import metrics
+from metrics import CycleMetrics, Registry, pseudonym, scrape_allowed
+
+EMAIL = 'alice@nexus.ai'
+
+
+def test_cycle_metrics_render_histogram_and_errors():
+    registry = Registry()
+    cycle = CycleMetrics(registry, enabled=True)
+    with cycle.stage('market', 'BTC/USDT'): pass
+    with pytest.raises(KeyError):
+        with cycle.stage('signal', 'BTC/USDT'): raise KeyError('x')
+
+    text = registry.render()
+    assert 'nexus_cycle_stage_seconds_count{stage="market",symbol="BTC/USDT"} 1' in text
+    assert 'nexus_cycle_errors_total{stage="signal",symbol="BTC/USDT",kind="KeyError"} 1' in text
+    assert cycle.summary()['market']['count'] == 1
+
+
+def test_user_label_is_a_keyed_pseudonym():
+    registry = Registry()
+    cycle = CycleMetrics(registry, enabled=True)
+    cycle.users.user_key = b'k1'
+    cycle.observe('execution', 0.01, 'BTC/USDT', EMAIL)
+
+    text = registry.render()
+    assert EMAIL not in text
+    assert f'nexus_user_stage_seconds_count{{user="{pseudonym(EMAIL, b"k1")}",stage="execution"}} 1' in text
+    assert cycle.users.get(EMAIL)['execution']['count'] == 1   # la consulta interna sigue siendo por email
+    assert pseudonym(EMAIL, b'k1') != pseudonym(EMAIL, b'k2') and len(pseudonym(EMAIL, b'k1')) == 16
+
+
+@pytest.mark.parametrize("token, expected, allowed", [
+    ('s3cret', 's3cret', True), ('wrong', 's3cret', False), (None, 's3cret', False),
+    ('s3cret', None, False), ('', '', False),
+])
+def test_scrape_allowed(token, expected, allowed):
+    assert scrape_allowed(token, expected) is allowed
+
+
+def test_metrics_endpoint_requires_the_token(monkeypatch):
+    import main
+    monkeypatch.setattr(main, 'scrape_allowed', lambda token: scrape_allowed(token, 's3cret'))
+
+    async def scrape(headers):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get("/metrics", headers=headers)
+
+    assert asyncio.run(scrape({})).status_code == 403
+    assert asyncio.run(scrape({'Authorization': 'Bearer nope'})).status_code == 403
+    ok = asyncio.run(scrape({'Authorization': 'Bearer s3cret'}))
+    assert ok.status_code == 200 and ok.headers['content-type'] == metrics.CONTENT_TYPE
@@ -0,0 +1,83 @@
+"""Optimizador: rejilla y muestreo de configuraciones, barrido con memoria compartida y exportación CSV."""
+
+import csv
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+import optimizer
+from backtester import resample, run_backtest
+from candles import Candles
+from indicators import rsi_batch
+
+
+@pytest.fixture(scope='module')
+def candles():
+    """4.000 velas de 1m (paseo aleatorio) con recorrido intravela suficiente para SL/TP."""
+    rng = np.random.default_rng(11)
+    close = 100 + np.cumsum(rng.normal(0, 0.4, 4000))
+    open_ = np.r_[close[0], close[:-1]]
+    spread = np.abs(rng.normal(0, 0.3, 4000))
+    return Candles(timestamp=np.arange(4000, dtype=np.int64) * 60_000, open=open_,
+                   high=np.maximum(open_, close) + spread, low=np.minimum(open_, close) - spread,
+                   close=close, volume=np.ones(4000))
+
+
+SPACE = {'rsi_oversold': [25, 30, 35], 'rsi_overbought': [65, 70], 'rsi_strong_oversold': [20],
+         'rsi_strong_overbought': [80], 'timeframe': ['1m', '5m'], 'min_trade_amount': [1.0]}
+
+
+def test_default_grid_keeps_every_combination():
+    configs = optimizer.grid_configs()
+    assert len(configs) == 5 * 5
+    assert all(20 <= c['rsi_oversold'] < c['rsi_overbought'] <= 80 for c in configs)
+
+
+def test_grid_drops_crossed_thresholds():
+    space = dict(SPACE, rsi_oversold=[30, 70], rsi_overbought=[40, 85])
+    assert {(c['rsi_oversold'], c['rsi_overbought']) for c in optimizer.grid_configs(space)} == {(30, 40)}
+
+
+def test_random_configs_are_unique_valid_and_reproducible():
+    a = optimizer.random_configs(SPACE, n=8, seed=3)
+    assert a == optimizer.random_configs(SPACE, n=8, seed=3)
+    assert len(a) == 8 and len({tuple(c.values()) for c in a}) == 8
+    assert len(optimizer.random_configs(SPACE, n=100, seed=3)) == 12   # no más que la rejilla
+
+
+def test_sweep_matches_a_direct_backtest(candles):
+    configs = optimizer.grid_configs(SPACE)
+    rows = optimizer.sweep(candles, configs, workers=1, fee_rate=0.001)
+    assert [r['rank'] for r in rows] == list(range(1, len(configs) + 1))
+    assert [r['pnl'] for r in rows] == sorted((r['pnl'] for r in rows), reverse=True)
+
+    best = rows[0]
+    series = resample(candles, best['timeframe'])
+    params = {k: best[k] for k in SPACE}
+    direct = run_backtest(series, SimpleNamespace(**params), rsi=rsi_batch(series['close']), fee_rate=0.001)
+    assert best['trades'] == direct.trades and best['pnl'] == pytest.approx(direct.pnl)
+
+
+def test_process_pool_over_shared_memory_gives_the_same_rows(candles):
+    configs = optimizer.grid_configs(SPACE)
+    key = lambda r: (r['timeframe'], r['rsi_oversold'], r['rsi_overbought'])
+    serial = sorted(optimizer.sweep(candles, configs, workers=1), key=key)
+    pooled = sorted(optimizer.sweep(candles, configs, workers=2, chunks_per_worker=2), key=key)
+    assert [(key(r), r['trades'], r['pnl']) for r in serial] == [(key(r), r['trades'], r['pnl']) for r in pooled]
+
+
+def test_cli_writes_csv_and_handles_an_empty_grid(candles, tmp_path, capsys):
+    data = tmp_path / 'btc.csv'
+    np.savetxt(data, np.column_stack([candles[c] for c in ('timestamp', 'open', 'high', 'low', 'close', 'volume')]),
+               delimiter=',')
+    out = tmp_path / 'rows.csv'
+    rows = optimizer.main([str(data), '--timeframes', '5m', '--oversold', '25:35:5', '--overbought', '65',
+                           '--amounts', '1', '--workers', '1', '--csv', str(out)])
+    with open(out) as f: written = list(csv.DictReader(f))
+    assert len(written) == len(rows) == 3 and 'exits' not in written[0]
+
+    empty = tmp_path / 'empty.csv'
+    assert optimizer.main([str(data), '--oversold', '50', '--overbought', '40', '--workers', '1',
+                           '--csv', str(empty)]) == []
+    assert not empty.exists() and 'Ninguna configuración' in capsys.readouterr().out
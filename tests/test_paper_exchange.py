@@ -0,0 +1,118 @@
+"""PaperExchange: ejecuciones a mercado, disparos SL/TP por vela, OCO, huecos y sin mirar al pasado."""
+
+import ccxt
+import pytest
+
+from candles import Candles
+from execution_engine import OrderRequest
+from paper_exchange import PaperExchange, paper_execution_service
+
+EMAIL = 'alice@nexus.ai'
+
+
+@pytest.fixture
+def paper():
+    ex = PaperExchange(initial_balance=10_000, fee_rate=0.0, slippage=0.0, timeframe='1m')
+    ex.update_price('BTC/USDT', 100.0)
+    return ex
+
+
+def long_with_bracket(paper, sl=95.0, tp=110.0):
+    paper.create_order(EMAIL, 'BTC/USDT', 'market', 'buy', 1.0)
+    stop = paper.create_order(EMAIL, 'BTC/USDT', 'STOP_MARKET', 'sell', 1.0,
+                              params={'stopPrice': sl, 'closePosition': True})
+    target = paper.create_order(EMAIL, 'BTC/USDT', 'TAKE_PROFIT_MARKET', 'sell', 1.0,
+                                params={'stopPrice': tp, 'closePosition': True})
+    return stop['id'], target['id']
+
+
+def status(paper, order_id):
+    return paper.fetch_order(order_id)['status']
+
+
+def test_market_order_fills_at_last_price_with_slippage_and_fee():
+    paper = PaperExchange(initial_balance=10_000, fee_rate=0.001, slippage=0.01)
+    paper.update_price('BTC/USDT', 100.0)
+    order = paper.create_order(EMAIL, 'BTC/USDT', 'market', 'buy', 2.0)
+
+    assert order['status'] == 'closed' and order['average'] == pytest.approx(101.0)
+    assert order['fee']['cost'] == pytest.approx(2 * 101.0 * 0.001)
+    position = paper.balance(EMAIL)['positions'][0]
+    assert position['side'] == 'long' and position['amount'] == 2.0 and position['entry_price'] == pytest.approx(101.0)
+
+
+def test_stop_loss_fires_on_the_next_candle_and_cancels_the_target(paper):
+    stop, target = long_with_bracket(paper)
+    paper.on_candle('BTC/USDT', 60_000, 100.0, 101.0, 94.0, 96.0)
+
+    assert status(paper, stop) == 'closed' and status(paper, target) == 'canceled'
+    assert paper.fetch_order(stop)['average'] == 95.0
+    assert paper.balance(EMAIL)['realized_pnl'] == -5.0 and paper.symbols(EMAIL) == []
+
+
+def test_take_profit_fires_when_the_high_crosses(paper):
+    stop, target = long_with_bracket(paper)
+    paper.on_candle('BTC/USDT', 60_000, 100.0, 105.0, 99.0, 104.0)
+    assert status(paper, stop) == 'open' and status(paper, target) == 'open'
+
+    paper.on_candle('BTC/USDT', 120_000, 104.0, 111.0, 103.0, 108.0)
+    assert status(paper, target) == 'closed' and status(paper, stop) == 'canceled'
+    assert paper.balance(EMAIL)['realized_pnl'] == 10.0
+
+
+def test_gap_through_the_stop_fills_at_the_open(paper):
+    stop, _ = long_with_bracket(paper)
+    paper.on_candle('BTC/USDT', 60_000, 90.0, 91.0, 88.0, 89.0)
+    assert paper.fetch_order(stop)['average'] == 90.0
+
+
+def test_stop_wins_when_both_legs_cross_in_one_candle(paper):
+    stop, target = long_with_bracket(paper)
+    paper.on_candle('BTC/USDT', 60_000, 100.0, 112.0, 93.0, 100.0)
+    assert status(paper, stop) == 'closed' and status(paper, target) == 'canceled'
+
+
+def test_order_placed_mid_candle_ignores_earlier_extremes(paper):
+    paper.on_candle('BTC/USDT', 60_000, 100.0, 100.5, 99.5, 100.0)   # vela en curso
+    stop, _ = long_with_bracket(paper)
+
+    # Llega la vela entera con un mínimo de 90 que pudo ser anterior a la orden: no cuenta
+    paper.on_candle('BTC/USDT', 60_000, 100.0, 101.0, 90.0, 99.0)
+    assert status(paper, stop) == 'open'
+
+    paper.on_candle('BTC/USDT', 120_000, 99.0, 99.5, 94.0, 95.0)
+    assert status(paper, stop) == 'closed' and paper.fetch_order(stop)['average'] == 95.0
+
+
+def test_cache_rereads_only_process_the_new_part_of_the_candle(paper):
+    rows = lambda *bars: Candles.from_rows([[ts, o, h, l, c, 1.0] for ts, o, h, l, c in bars])
+    paper.on_candles('BTC/USDT', '1m', rows((60_000, 100.0, 101.0, 96.0, 100.0)))
+    stop, _ = long_with_bracket(paper, sl=97.0)
+
+    # Mismo mínimo ya visto (96) antes de colocar la orden: no la dispara
+    paper.on_candles('BTC/USDT', '1m', rows((60_000, 100.0, 101.0, 96.0, 99.0)))
+    assert status(paper, stop) == 'open'
+
+    # Mínimo nuevo posterior a la orden: sí
+    paper.on_candles('BTC/USDT', '1m', rows((60_000, 100.0, 101.0, 95.0, 98.0)))
+    assert status(paper, stop) == 'closed' and paper.fetch_order(stop)['average'] == 97.0
+
+
+def test_orders_without_margin_are_rejected(paper):
+    with pytest.raises(ccxt.InsufficientFunds):
+        paper.create_order(EMAIL, 'BTC/USDT', 'market', 'buy', 200.0)
+    assert paper.stats['rejected'] == 1 and paper.symbols(EMAIL) == []
+    # Cerrar o reducir no necesita margen
+    paper.create_order(EMAIL, 'BTC/USDT', 'market', 'buy', 50.0)
+    assert paper.create_order(EMAIL, 'BTC/USDT', 'market', 'sell', 50.0)['status'] == 'closed'
+
+
+def test_brackets_through_the_execution_service(paper):
+    service = paper_execution_service(paper)
+    result = service.submit(OrderRequest(EMAIL, 'BTC/USDT', 'buy', amount=1.0, stop_loss=95.0, take_profit=110.0))
+    assert result.ok and result.group.status == 'open'
+
+    paper.on_candle('BTC/USDT', 60_000, 100.0, 111.0, 99.0, 109.0)
+    assert service.reconcile(EMAIL) == [result.group]
+    assert result.group.status == 'closed' and result.group.exit == 'take_profit'
+    service.close()
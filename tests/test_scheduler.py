@@ -0,0 +1,85 @@
+"""BotScheduler: mercado una vez por (símbolo, timeframe), estados por usuario y presupuesto."""
+
+import threading
+import time
+
+from benchmarks.fakes import fake_users, install_fake_mongo
+from database_manager import NexusDB
+from scheduler import BotScheduler, ERROR, PROCESSED, SKIPPED
+
+
+def make_scheduler(evaluate=None, load_market=None, **kwargs):
+    loads, lock = [], threading.Lock()
+
+    def default_load(symbol, timeframe):
+        with lock: loads.append((symbol, timeframe))
+        return {'symbol': symbol, 'timeframe': timeframe}
+
+    scheduler = BotScheduler(evaluate=evaluate or (lambda user, market: (PROCESSED, user['email'])),
+                             load_market=load_market or default_load, users=lambda: [], **kwargs)
+    return scheduler, loads
+
+
+def test_market_loaded_once_per_symbol_and_timeframe():
+    scheduler, loads = make_scheduler(workers=4)
+    users = [{'email': f'u{i}', 'symbol': 'ETH/USDT' if i % 2 else None} for i in range(50)]
+    report = scheduler.run_cycle([users[:25], users[25:]])
+    assert report.processed == 50 and report.markets == 2
+    assert sorted(loads) == [('BTC/USDT', '5m'), ('ETH/USDT', '5m')]
+
+
+def test_statuses_and_exceptions_are_counted():
+    def evaluate(user, market):
+        if user['email'] == 'boom': raise RuntimeError("fallo")
+        return {'ok': (PROCESSED, 'ok'), 'skip': (SKIPPED, 'skip'), 'bad': (ERROR, 'bad')}[user['email']]
+
+    scheduler, _ = make_scheduler(evaluate)
+    report = scheduler.run_cycle([[{'email': e} for e in ('ok', 'skip', 'bad', 'boom')]])
+    assert (report.processed, report.skipped, report.errors) == (1, 1, 2)
+    assert any('fallo' in log for log in report.logs)
+    assert scheduler.stats['cycles'] == 1 and scheduler.stats['errors'] == 2
+
+
+def test_failed_market_marks_its_users_as_errors():
+    def load(symbol, timeframe):
+        if symbol == 'DOGE/USDT': raise ConnectionError("sin datos")
+        return {}
+
+    scheduler, _ = make_scheduler(load_market=load)
+    report = scheduler.run_cycle([[{'email': 'a'}, {'email': 'b', 'symbol': 'DOGE/USDT'}]])
+    assert (report.processed, report.errors) == (1, 1)
+
+
+def test_budget_truncates_the_cycle():
+    def slow(user, market):
+        time.sleep(0.05)
+        return PROCESSED, user['email']
+
+    scheduler, _ = make_scheduler(slow, workers=2, budget=0.12)
+    start = time.monotonic()
+    report = scheduler.run_cycle([[{'email': f'u{i}'} for i in range(40)], [{'email': 'late'}]])
+    assert report.truncated and report.overran > 0
+    assert report.processed + report.overran <= 41
+    assert time.monotonic() - start < 1.0
+
+
+def test_prepare_batch_runs_per_batch_and_failures_do_not_stop_the_cycle():
+    batches = []
+
+    def prepare(batch):
+        batches.append(len(batch))
+        raise RuntimeError("Mongo lento")
+
+    scheduler, _ = make_scheduler(prepare_batch=prepare)
+    report = scheduler.run_cycle([[{'email': 'a'}, {'email': 'b'}], [{'email': 'c'}]])
+    assert batches == [2, 1] and report.processed == 3
+
+
+def test_active_users_default_skips_inactive_subscriptions():
+    db = NexusDB()
+    docs = fake_users(4)
+    docs[1]['subscription_status'] = 'canceled'
+    docs[2]['exchange_keys'] = None
+    install_fake_mongo(db, docs)
+    emails = [u['email'] for batch in db.iterar_usuarios_activos(batch_size=2) for u in batch]
+    assert emails == [docs[0]['email'], docs[3]['email']]